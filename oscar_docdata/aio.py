@@ -0,0 +1,396 @@
+"""
+Asyncio client for Docdata.
+
+This module requires Python 3 and the ``aiohttp`` package,
+which can be installed with ``pip install django-oscar-docdata[async]``.
+
+The SOAP envelopes are constructed and parsed the same way as the synchronous client does,
+only the HTTP calls are performed by ``aiohttp``.
+Hence the request and reply handling is identical to the :class:`~oscar_docdata.gateway.DocdataClient`.
+
+The status cache, circuit breaker and rate limiter store their state in the Django cache.
+Those synchronous cache calls run in the default executor of the event loop, so they don't block it.
+"""
+import asyncio
+import functools
+import logging
+import time
+from urllib.error import URLError
+
+import aiohttp
+import suds
+import suds.transport
+from oscar_docdata import appsettings
+from oscar_docdata.circuit import get_circuit_breaker
+from oscar_docdata.exceptions import DocdataException, DocdataTimeout, DocdataUnavailable, OrderKeyMissing
+from oscar_docdata.gateway import DocdataClient, StatusManyResult, create_suds_client, get_wsdl_url
+from oscar_docdata.metrics import counters
+from oscar_docdata.retry import IDEMPOTENT_OPERATIONS, get_retry_policy
+from oscar_docdata.throttling import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+__all__ = (
+    'AsyncDocdataClient',
+)
+
+CACHED_REQUEST_CLIENT = {}
+
+
+def get_request_client(testing_mode=False):
+    """
+    Create the suds client that only constructs the SOAP envelopes, without sending them.
+
+    Note the WSDL is fetched synchronously the first time.
+    Configure ``DOCDATA_WSDL_CACHE_DIR`` to avoid this network request.
+    """
+    url = get_wsdl_url(testing_mode)
+    try:
+        return CACHED_REQUEST_CLIENT[url]
+    except KeyError:
+        pass
+
+    try:
+        client = create_suds_client(url, nosend=True)
+    except (URLError, suds.transport.TransportError) as e:
+        logger.error("Could not initialize SUDS SOAP client to connect to Docdata: {0}".format(str(e)))
+        raise
+
+    CACHED_REQUEST_CLIENT[url] = client
+    return client
+
+
+def create_session():
+    """
+    Create the HTTP session for the Docdata calls, which reuses the connections.
+    Like the pooled transport, the HTTP proxies of the environment are used.
+    """
+    connector = aiohttp.TCPConnector(
+        limit_per_host=appsettings.DOCDATA_HTTP_POOL_SIZE,
+        keepalive_timeout=appsettings.DOCDATA_HTTP_POOL_IDLE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, trust_env=True)
+
+
+async def run_sync(func, *args):
+    """
+    Run a blocking function (e.g. a Django cache call) in the default executor of the event loop.
+    """
+    return await asyncio.get_event_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+class AsyncDocdataClient(DocdataClient):
+    """
+    API Client for docdata, for use in an asyncio event loop.
+
+    The ``create``, ``cancel``, ``status`` and ``status_extended`` methods
+    are coroutines with the same arguments and results as the :class:`~oscar_docdata.gateway.DocdataClient`.
+    All calls share the connections of a single ``aiohttp`` session,
+    which is closed with :func:`close`, or by using the client as ``async with`` context manager.
+    """
+
+    def __init__(self, testing_mode=None, merchant_name=None, merchant_password=None, session=None):
+        """
+        Initialize the client.
+
+        :param session: An optional ``aiohttp.ClientSession`` to perform the calls with.
+                        By default, a session is created when the first call is made.
+        """
+        super().__init__(testing_mode=testing_mode, merchant_name=merchant_name, merchant_password=merchant_password)
+        self.session = session
+        self._own_session = session is None
+
+    def get_suds_client(self, testing_mode):
+        return get_request_client(testing_mode)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the HTTP session, when it was created by this client.
+        """
+        if self._own_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def create(
+            self,
+            order_id,
+            total_gross_amount,
+            shopper,
+            bill_to,
+            description,
+            invoice=None,
+            receiptText=None,
+            includeCosts=False,
+            profile=appsettings.DOCDATA_PROFILE,
+            days_to_pay=appsettings.DOCDATA_DAYS_TO_PAY,
+            deadline=None,
+    ):
+        """
+        Create the payment in docdata.
+        See :func:`DocdataClient.create <oscar_docdata.gateway.DocdataClient.create>` for the details.
+
+        :rtype: oscar_docdata.gateway.CreateReply
+        """
+        args = (order_id, total_gross_amount, shopper, bill_to, description, invoice, receiptText, includeCosts, profile, days_to_pay)
+        envelope = self._get_create_envelope(*args)
+
+        async def _create(timeout):
+            if envelope is not None:
+                return await self._send_envelope('create', envelope, timeout=timeout)
+            return await self._call('create', timeout=timeout, **self._get_create_args(*args))
+
+        reply = await self._guard_call('create', deadline, _create)
+        return self._parse_create_reply(order_id, reply)
+
+    async def cancel(self, order_key, deadline=None):
+        """
+        Cancel a previously created payment.
+        """
+        if not order_key:
+            raise OrderKeyMissing("Missing order_key!")
+
+        reply = await self._guard_call('cancel', deadline, lambda timeout: self._call('cancel', self.merchant, order_key, timeout=timeout))
+        return self._parse_cancel_reply(order_key, reply)
+
+    async def status(self, order_key, deadline=None):
+        """
+        Request the status of of order and it's payments.
+
+        :rtype: oscar_docdata.gateway.StatusReply
+        """
+        if not order_key:
+            raise OrderKeyMissing("Missing order_key!")
+
+        cached_reply = await run_sync(self._get_cached_status, order_key)
+        if cached_reply is not None:
+            return cached_reply
+
+        reply = await self._call_with_retry('status', deadline, self._status, order_key, deadline)
+        await run_sync(super()._cache_status, reply)
+        return reply
+
+    async def _status(self, order_key, deadline=None):
+        envelope = self._get_status_envelope('status', order_key)
+
+        async def _status(timeout):
+            if envelope is not None:
+                body = await self._send_envelope('status', envelope, parse=False, timeout=timeout)
+                return self._parse_status_body('status', order_key, body)
+
+            reply = await self._call(
+                'status',
+                self.merchant,
+                order_key,
+                integrationInfo=self.integration_info.to_xml(self.client.factory),
+                timeout=timeout,
+            )
+            return self._parse_status_reply(order_key, reply)
+
+        return await self._guard_call('status', deadline, _status)
+
+    async def status_extended(self, order_key, deadline=None):
+        """
+        Request the status with extended information.
+
+        :rtype: oscar_docdata.gateway.StatusReply
+        """
+        if not order_key:
+            raise OrderKeyMissing("Missing order_key!")
+
+        reply = await self._call_with_retry('statusExtended', deadline, self._status_extended, order_key, deadline)
+        await run_sync(super()._cache_status, reply)
+        return reply
+
+    async def _status_extended(self, order_key, deadline=None):
+        reply = await self._guard_call('statusExtended', deadline, lambda timeout: self._call(
+            'statusExtended',
+            self.merchant,
+            order_key,
+            self.integration_info.to_xml(self.client.factory),
+            timeout=timeout,
+        ))
+        return self._parse_status_reply(order_key, reply, extended=True)
+
+    def _cache_status(self, reply):
+        # The parsers call this synchronously, the reply is stored by the coroutines instead.
+        return reply
+
+    async def _guard_call(self, operation, deadline, func):
+        """
+        Apply the circuit breaker, rate limit and timeout to a Docdata call.
+        This is the asynchronous version of :func:`DocdataClient._guard_call <oscar_docdata.gateway.DocdataClient._guard_call>`.
+
+        :param func: The coroutine function that performs the call, it receives the timeout.
+        """
+        # An expired deadline is not a failure of Docdata, check it before the circuit breaker counts it.
+        self._get_timeout(operation, deadline)
+
+        breaker = get_circuit_breaker(operation, self.testing_mode)
+        if breaker is not None and not await run_sync(breaker.allow):
+            logger.warning("DocdataClient: circuit breaker is open, not performing the '%s' call.", operation)
+            raise DocdataUnavailable(operation)
+
+        try:
+            # Waiting for the rate limit can use up the deadline too.
+            await self._wait_for_rate_limit(operation)
+            timeout = self._get_timeout(operation, deadline)
+        except BaseException:
+            if breaker is not None:
+                await run_sync(breaker.release)
+            raise
+
+        try:
+            result = await func(timeout)
+        except (DocdataException, suds.WebFault):
+            if breaker is not None:
+                await run_sync(breaker.record_success)
+            raise
+        except Exception:
+            if breaker is not None:
+                await run_sync(breaker.record_failure)
+            raise
+        else:
+            if breaker is not None:
+                await run_sync(breaker.record_success)
+        return result
+
+    async def _call_with_retry(self, operation, deadline, func, *args):
+        """
+        Await the call, and retry it according to the ``DOCDATA_RETRY_*`` settings when it's idempotent.
+        """
+        policy = get_retry_policy()
+        if policy is None or operation not in IDEMPOTENT_OPERATIONS:
+            return await func(*args)
+
+        started = time.time()
+        attempt = 0
+        while True:
+            try:
+                return await func(*args)
+            except Exception as e:
+                delay = policy.get_retry_delay(operation, attempt, e, started, deadline)
+                if delay is None:
+                    raise
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _wait_for_rate_limit(self, operation):
+        """
+        Wait until the call is allowed by the ``DOCDATA_RATE_LIMIT``, without blocking the event loop.
+        """
+        bucket, name, priority = self._get_rate_limit(operation)
+        if bucket is None:
+            return
+
+        waited = 0
+        while True:
+            # The bucket is stored in the Django cache, and acquire() briefly waits for its lock.
+            taken, delay = await run_sync(bucket.acquire, name, priority)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                waited += delay
+            if taken:
+                break
+
+        if waited:
+            counters.increment('rate_limit_delayed')
+            counters.increment('rate_limit_wait_seconds', waited)
+
+    async def status_many(self, order_keys, max_workers=None, rate_limit=None):
+        """
+        Request the status of multiple orders concurrently.
+        This is an async generator, with the same behavior as
+        :func:`DocdataClient.status_many <oscar_docdata.gateway.DocdataClient.status_many>`.
+
+        :rtype: collections.AsyncIterable[oscar_docdata.gateway.StatusManyResult]
+        """
+        if max_workers is None:
+            max_workers = appsettings.DOCDATA_STATUS_MAX_WORKERS
+        if rate_limit is None:
+            rate_limit = appsettings.DOCDATA_STATUS_RATE_LIMIT
+
+        limiter = RateLimiter(rate_limit)
+
+        async def _status(order_key):
+            await asyncio.sleep(limiter.reserve())
+            return await self.status(order_key)
+
+        order_keys = iter(order_keys)
+        pending = {}
+
+        def _submit():
+            for order_key in order_keys:
+                pending[asyncio.ensure_future(_status(order_key))] = order_key
+                return
+
+        try:
+            for i in range(max_workers):
+                _submit()
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    order_key = pending.pop(task)
+                    try:
+                        result = StatusManyResult(order_key, reply=task.result())
+                    except Exception as e:
+                        result = StatusManyResult(order_key, error=e)
+                    _submit()
+                    yield result
+        finally:
+            # When the caller stops early, don't perform the remaining requests.
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, operation, *args, timeout=None, **kwargs):
+        """
+        Perform the SOAP call, and return the parsed reply.
+        """
+        context = getattr(self.client.service, operation)(*args, **kwargs)  # nosend: only constructs the envelope.
+        return await self._send_envelope(operation, context.envelope, timeout=timeout)
+
+    async def _send_envelope(self, operation, envelope, parse=True, timeout=None):
+        """
+        Send the SOAP envelope, the reply is parsed by the suds client.
+        With ``parse=False``, the body of a successful reply is returned as bytes.
+        A timeout is raised as :class:`~oscar_docdata.exceptions.DocdataTimeout`.
+        """
+        method = getattr(self.client.service, operation).method
+        action = method.soap.action
+        if isinstance(action, bytes):
+            action = action.decode('utf-8')
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': action,
+        }
+
+        if self.session is None:
+            self.session = create_session()
+
+        try:
+            url = self.client.options.location or method.location
+            async with self.session.post(url, data=envelope, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                body = await response.read()
+                status = response.status
+                reason = response.reason
+        except asyncio.TimeoutError:
+            raise DocdataTimeout(operation)
+        except aiohttp.ClientError as e:
+            # Same as the synchronous transports, so callers can handle URLError.
+            raise URLError(e)
+
+        if status >= 300:
+            # Same as suds handles the TransportError; this raises a WebFault for SOAP faults.
+            return self._process_reply(operation, body, status, reason)
+        elif status in (202, 204):
+            return None
+        elif not parse:
+            return body
+        return self._process_reply(operation, body)
@@ -67,3 +67,111 @@ DOCDATA_IDEAL_ISSUERS = getattr(settings, 'DOCDATA_IDEAL_ISSUERS', {
     '0091': 'Friesland Bank',
     '0161': 'van Lanschot Bankiers'
 })
+
+# Directory to store the parsed WSDL/XSD definitions, so new worker processes don't have to fetch and parse them.
+# The cache can be pre-built at deploy time with ``manage.py docdata_wsdl_cache``.
+# By default, suds uses a temporary directory that is removed when the process exits.
+DOCDATA_WSDL_CACHE_DIR = getattr(settings, 'DOCDATA_WSDL_CACHE_DIR', None)
+
+# The number of days before the cached WSDL definitions are fetched again.
+DOCDATA_WSDL_CACHE_DAYS = getattr(settings, 'DOCDATA_WSDL_CACHE_DAYS', 30)
+
+# The transport class the suds client uses to send the SOAP requests.
+# The default transport reuses connections (HTTP keep-alive) for all requests,
+# and uses the proxies of the environment or the suds 'proxy' option.
+# Use 'suds.transport.https.HttpAuthenticated' for the default suds transport.
+DOCDATA_TRANSPORT_CLASS = getattr(settings, 'DOCDATA_TRANSPORT_CLASS', 'oscar_docdata.transport.PooledHttpTransport')
+
+# The maximum number of connections per host, and the seconds before an idle connection is closed.
+# Keep the idle timeout below the keep-alive timeout of the server (often 5 seconds),
+# a shorter timeout in the server's "Keep-Alive" header is also respected.
+DOCDATA_HTTP_POOL_SIZE = getattr(settings, 'DOCDATA_HTTP_POOL_SIZE', 10)
+DOCDATA_HTTP_POOL_IDLE_TIMEOUT = getattr(settings, 'DOCDATA_HTTP_POOL_IDLE_TIMEOUT', 4)
+
+# The number of concurrent requests, and the maximum requests per second (None is unlimited)
+# for requesting the status of many orders at once, e.g. in the management commands.
+DOCDATA_STATUS_MAX_WORKERS = getattr(settings, 'DOCDATA_STATUS_MAX_WORKERS', 4)
+DOCDATA_STATUS_RATE_LIMIT = getattr(settings, 'DOCDATA_STATUS_RATE_LIMIT', None)
+
+# Construct the SOAP envelope of the create call directly from the value objects, which is much faster for large invoices.
+# When disabled, or when the value objects are customized, the suds client generates the envelope.
+DOCDATA_FAST_SERIALIZER = getattr(settings, 'DOCDATA_FAST_SERIALIZER', True)
+
+# Parse the reply of the status call with a streaming parser, instead of letting suds build the complete object tree.
+# When disabled, or when the suds client is customized, the suds client handles the status call.
+DOCDATA_FAST_STATUS_PARSER = getattr(settings, 'DOCDATA_FAST_STATUS_PARSER', True)
+
+# The maximum number of clients (per merchant and testing mode) that are kept for reuse.
+DOCDATA_CLIENT_REGISTRY_SIZE = getattr(settings, 'DOCDATA_CLIENT_REGISTRY_SIZE', 32)
+
+# Let the return and notification views fetch the status before locking the order,
+# the lock is only held while the result is stored. Concurrent updates are detected by the order version,
+# in which case the status is fetched again, at most DOCDATA_UPDATE_MAX_ATTEMPTS times.
+DOCDATA_FETCH_STATUS_OUTSIDE_LOCK = getattr(settings, 'DOCDATA_FETCH_STATUS_OUTSIDE_LOCK', False)
+DOCDATA_UPDATE_MAX_ATTEMPTS = getattr(settings, 'DOCDATA_UPDATE_MAX_ATTEMPTS', 3)
+
+# The cache (name from CACHES) that coordinates concurrent status requests for the same order,
+# so only one of them calls Docdata and the others reuse its result. This cache needs to be shared between processes.
+# The timeout is the maximum number of seconds to wait for the other request.
+DOCDATA_SINGLE_FLIGHT_CACHE = getattr(settings, 'DOCDATA_SINGLE_FLIGHT_CACHE', None)
+DOCDATA_SINGLE_FLIGHT_TIMEOUT = getattr(settings, 'DOCDATA_SINGLE_FLIGHT_TIMEOUT', 10)
+
+# The cache (name from CACHES) to keep the fetched status reports in, for DOCDATA_STATUS_CACHE_TTL seconds.
+# This avoids repeated status calls for the same order within a few seconds. Disabled by default.
+DOCDATA_STATUS_CACHE = getattr(settings, 'DOCDATA_STATUS_CACHE', None)
+DOCDATA_STATUS_CACHE_TTL = getattr(settings, 'DOCDATA_STATUS_CACHE_TTL', 5)
+
+# Let the status changed notification view only store the notification, and return directly.
+# The notifications are processed by the ``docdata_notifications`` management command,
+# which retries a failing notification at most DOCDATA_NOTIFICATION_MAX_ATTEMPTS times.
+DOCDATA_QUEUE_NOTIFICATIONS = getattr(settings, 'DOCDATA_QUEUE_NOTIFICATIONS', False)
+DOCDATA_NOTIFICATION_MAX_ATTEMPTS = getattr(settings, 'DOCDATA_NOTIFICATION_MAX_ATTEMPTS', 10)
+
+# The schedule of the ``docdata_reconcile`` command: the orders are checked when they are
+# DOCDATA_RECONCILE_MIN_INTERVAL seconds old, and the interval doubles until DOCDATA_RECONCILE_MAX_INTERVAL seconds.
+DOCDATA_RECONCILE_MIN_INTERVAL = getattr(settings, 'DOCDATA_RECONCILE_MIN_INTERVAL', 60)
+DOCDATA_RECONCILE_MAX_INTERVAL = getattr(settings, 'DOCDATA_RECONCILE_MAX_INTERVAL', 6 * 3600)
+
+# The seconds before the claim on an order expires, when the management command that processes it crashed.
+DOCDATA_LEASE_DURATION = getattr(settings, 'DOCDATA_LEASE_DURATION', 300)
+
+# The maximum number of Docdata calls per second for each merchant, shared by all processes via DOCDATA_RATE_LIMIT_CACHE.
+# Short bursts of DOCDATA_RATE_LIMIT_BURST calls are allowed (defaults to the rate).
+# The operations in DOCDATA_RATE_LIMIT_PRIORITIES have a 'low' priority, these leave
+# a DOCDATA_RATE_LIMIT_RESERVE fraction of the burst to the other calls, like the 'create' call of the checkout.
+DOCDATA_RATE_LIMIT = getattr(settings, 'DOCDATA_RATE_LIMIT', None)
+DOCDATA_RATE_LIMIT_BURST = getattr(settings, 'DOCDATA_RATE_LIMIT_BURST', None)
+DOCDATA_RATE_LIMIT_CACHE = getattr(settings, 'DOCDATA_RATE_LIMIT_CACHE', 'default')
+DOCDATA_RATE_LIMIT_RESERVE = getattr(settings, 'DOCDATA_RATE_LIMIT_RESERVE', 0.25)
+DOCDATA_RATE_LIMIT_PRIORITIES = getattr(settings, 'DOCDATA_RATE_LIMIT_PRIORITIES', {
+    'status': 'low',
+    'statusExtended': 'low',
+})
+
+# The cache (name from CACHES) that shares the state of the circuit breaker between the processes.
+# After DOCDATA_CIRCUIT_BREAKER_THRESHOLD failed calls in a row (or the value in DOCDATA_CIRCUIT_BREAKER_THRESHOLDS
+# for the operation), Docdata is no longer called for DOCDATA_CIRCUIT_BREAKER_RESET_TIMEOUT seconds. Disabled by default.
+DOCDATA_CIRCUIT_BREAKER_CACHE = getattr(settings, 'DOCDATA_CIRCUIT_BREAKER_CACHE', None)
+DOCDATA_CIRCUIT_BREAKER_THRESHOLD = getattr(settings, 'DOCDATA_CIRCUIT_BREAKER_THRESHOLD', 5)
+DOCDATA_CIRCUIT_BREAKER_THRESHOLDS = getattr(settings, 'DOCDATA_CIRCUIT_BREAKER_THRESHOLDS', {})
+DOCDATA_CIRCUIT_BREAKER_RESET_TIMEOUT = getattr(settings, 'DOCDATA_CIRCUIT_BREAKER_RESET_TIMEOUT', 30)
+
+# The timeout in seconds of the Docdata calls, which can be set per operation in DOCDATA_TIMEOUTS,
+# e.g. {'create': 10, 'status': 5}. The return view can have a shorter timeout in DOCDATA_RETURN_VIEW_TIMEOUT,
+# when it expires, the last known status of the order is used.
+DOCDATA_TIMEOUT = getattr(settings, 'DOCDATA_TIMEOUT', 30)
+DOCDATA_TIMEOUTS = getattr(settings, 'DOCDATA_TIMEOUTS', {})
+DOCDATA_RETURN_VIEW_TIMEOUT = getattr(settings, 'DOCDATA_RETURN_VIEW_TIMEOUT', None)
+
+# The number of attempts of the idempotent calls (status and statusExtended) when they fail with a transient error.
+# The retries wait DOCDATA_RETRY_BACKOFF seconds with random jitter, doubling up to DOCDATA_RETRY_MAX_BACKOFF,
+# and stop when the total time of the call would exceed DOCDATA_RETRY_BUDGET seconds. Set to 1 to disable.
+# Each attempt can take DOCDATA_TIMEOUT seconds, so set DOCDATA_RETURN_VIEW_TIMEOUT to limit the return view.
+DOCDATA_RETRY_ATTEMPTS = getattr(settings, 'DOCDATA_RETRY_ATTEMPTS', 3)
+DOCDATA_RETRY_BACKOFF = getattr(settings, 'DOCDATA_RETRY_BACKOFF', 0.5)
+DOCDATA_RETRY_MAX_BACKOFF = getattr(settings, 'DOCDATA_RETRY_MAX_BACKOFF', 5)
+DOCDATA_RETRY_BUDGET = getattr(settings, 'DOCDATA_RETRY_BUDGET', 10)
+
+# Keep the totals per month, currency and status in the DocdataMonthlyTotal table, which the docdata_report command reads.
+# Run the docdata_rebuild_totals command after enabling this.
+DOCDATA_MONTHLY_TOTALS = getattr(settings, 'DOCDATA_MONTHLY_TOTALS', False)
@@ -0,0 +1,114 @@
+"""
+Checkpoints of the long-running management commands.
+
+The commands iterate over the orders in primary key order (keyset pagination),
+and store the last processed key in the :class:`~oscar_docdata.models.DocdataCheckpoint` table.
+When a run is interrupted, the ``--resume`` flag continues after that key.
+The checkpoint is removed when the run is completed.
+
+The commands can run on multiple hosts at the same time, so each host keeps its own checkpoint
+(see :func:`get_checkpoint_name`). Otherwise the hosts would overwrite and clear each other's progress.
+"""
+import socket
+from collections import OrderedDict
+
+from oscar_docdata.models import DocdataCheckpoint
+
+__all__ = (
+    'get_checkpoint_name',
+    'get_checkpoint',
+    'save_checkpoint',
+    'clear_checkpoint',
+    'keyset_batches',
+    'CheckpointTracker',
+)
+
+
+def get_checkpoint_name(name):
+    """
+    Return the checkpoint name of the command for this host.
+    Unlike the lease owner, this name is stable between runs, so ``--resume`` finds the progress of a crashed run.
+    """
+    return u"{0}@{1}".format(name, socket.gethostname()[:100])
+
+
+def get_checkpoint(name):
+    """
+    Return the last processed primary key of the command, or ``0`` when there is no checkpoint.
+    """
+    return DocdataCheckpoint.objects.filter(name=name).values_list('last_pk', flat=True).first() or 0
+
+
+def save_checkpoint(name, last_pk):
+    """
+    Store the last processed primary key of the command.
+    """
+    DocdataCheckpoint.objects.update_or_create(name=name, defaults={'last_pk': last_pk})
+
+
+def clear_checkpoint(name):
+    """
+    Remove the checkpoint, after the command completed.
+    """
+    DocdataCheckpoint.objects.filter(name=name).delete()
+
+
+def keyset_batches(queryset, batch_size, last_pk=0):
+    """
+    Yield the primary keys of the queryset in batches, ordered by the key.
+    Each batch is fetched with a ``pk > last_pk`` query, which the database resolves by the primary key index.
+
+    :rtype: collections.Iterable[list]
+    """
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+class CheckpointTracker(object):
+    """
+    Track the batches that are processed concurrently, and store the checkpoint of the completed batches.
+    Batches can finish in any order, the checkpoint only moves past a batch when all earlier batches are done too.
+    """
+
+    def __init__(self, name, last_pk=0):
+        self.name = name
+        self.last_pk = last_pk
+        self._batches = OrderedDict()
+        self._stopped = False
+
+    def add(self, batch):
+        """
+        Register a batch (of primary keys) that is being processed.
+        """
+        self._batches[batch[-1]] = None
+
+    def done(self, batch, last_processed_pk=None):
+        """
+        Register that the batch is processed, up to ``last_processed_pk`` when it was interrupted.
+        The checkpoint is stored when it moves forward.
+        """
+        if last_processed_pk is None:
+            last_processed_pk = batch[-1]
+        self._batches[batch[-1]] = last_processed_pk
+
+        last_pk = self.last_pk
+        while self._batches and not self._stopped:
+            key, processed_pk = next(iter(self._batches.items()))
+            if processed_pk is None:
+                break  # still running
+
+            del self._batches[key]
+            if processed_pk:
+                last_pk = max(last_pk, processed_pk)
+            if processed_pk != key:
+                # The batch was interrupted, the orders after it have to be processed again.
+                self._stopped = True
+
+        if last_pk != self.last_pk:
+            self.last_pk = last_pk
+            save_checkpoint(self.name, last_pk)
@@ -0,0 +1,117 @@
+"""
+Circuit breaker for the Docdata calls.
+
+When Docdata is down, every call waits until the socket timeout, which blocks the web workers.
+After ``DOCDATA_CIRCUIT_BREAKER_THRESHOLD`` failed calls in a row, the circuit breaker "opens",
+and the calls fail directly with :class:`~oscar_docdata.exceptions.DocdataUnavailable`.
+After ``DOCDATA_CIRCUIT_BREAKER_RESET_TIMEOUT`` seconds, a single call is allowed to probe whether Docdata is back.
+When it succeeds, the circuit breaker "closes" again.
+
+The state is stored in a Django cache, so all processes share it.
+"""
+import time
+
+from django.core.cache import caches
+from oscar_docdata import appsettings
+from oscar_docdata.metrics import counters
+
+__all__ = (
+    'CircuitBreaker',
+    'get_circuit_breaker',
+)
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker, which stores the state in a Django cache.
+    """
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half-open'
+
+    def __init__(self, cache, name, failure_threshold=5, reset_timeout=30, prefix='oscar_docdata:circuit:'):
+        self.cache = cache
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures_key = prefix + name + ':failures'
+        self.opened_key = prefix + name + ':opened'
+        self.probe_key = prefix + name + ':probe'
+
+    @property
+    def state(self):
+        opened = self.cache.get(self.opened_key)
+        if opened is None:
+            return self.STATE_CLOSED
+        elif time.time() - opened < self.reset_timeout:
+            return self.STATE_OPEN
+        else:
+            return self.STATE_HALF_OPEN
+
+    def allow(self):
+        """
+        Tell whether a call can be made.
+        In the half-open state, only one call is allowed to probe the service.
+        """
+        opened = self.cache.get(self.opened_key)
+        if opened is None:
+            return True
+
+        if time.time() - opened >= self.reset_timeout and self.cache.add(self.probe_key, 1, self.reset_timeout):
+            counters.increment('circuit_probe')
+            return True
+
+        counters.increment('circuit_rejected')
+        return False
+
+    def release(self):
+        """
+        Register that an allowed call was not made, so another call can probe the service.
+        """
+        self.cache.delete(self.probe_key)
+
+    def record_success(self):
+        """
+        Register a successful call, this closes the circuit.
+        """
+        found = list(self.cache.get_many([self.failures_key, self.opened_key]))
+        if found:
+            self.cache.delete_many(found + [self.probe_key])
+
+    def record_failure(self):
+        """
+        Register a failed call, this opens the circuit when the threshold is reached, or when the probe failed.
+        """
+        timeout = max(self.reset_timeout * 10, 60)
+        if self.cache.add(self.failures_key, 1, timeout):
+            failures = 1
+        else:
+            try:
+                failures = self.cache.incr(self.failures_key)
+            except ValueError:
+                # Expired in the meantime
+                self.cache.set(self.failures_key, 1, timeout)
+                failures = 1
+
+        if failures >= self.failure_threshold or self.cache.get(self.probe_key) is not None:
+            if self.cache.get(self.opened_key) is None:
+                counters.increment('circuit_opened')
+            self.cache.set(self.opened_key, time.time(), timeout)
+            self.cache.delete(self.probe_key)
+
+
+def get_circuit_breaker(operation, testing_mode):
+    """
+    Return the circuit breaker for the operation, when ``DOCDATA_CIRCUIT_BREAKER_CACHE`` is configured.
+
+    :rtype: CircuitBreaker | None
+    """
+    if not appsettings.DOCDATA_CIRCUIT_BREAKER_CACHE:
+        return None
+
+    return CircuitBreaker(
+        caches[appsettings.DOCDATA_CIRCUIT_BREAKER_CACHE],
+        name=u"{0}:{1}".format(operation, int(bool(testing_mode))),
+        failure_threshold=appsettings.DOCDATA_CIRCUIT_BREAKER_THRESHOLDS.get(operation, appsettings.DOCDATA_CIRCUIT_BREAKER_THRESHOLD),
+        reset_timeout=appsettings.DOCDATA_CIRCUIT_BREAKER_RESET_TIMEOUT,
+    )
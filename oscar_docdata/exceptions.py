@@ -13,6 +13,12 @@ class InvalidMerchant(ValueError):
     """
 
 
+class OrderUpdateConflict(RuntimeError):
+    """
+    The order was updated concurrently too often, while the status was fetched.
+    """
+
+
 class DocdataException(Exception):
     """
     Base class for all exceptions from Docdata
@@ -45,3 +51,21 @@ class DocdataCancelError(DocdataException):
     """
     There was an error cancelling the order.
     """
+
+
+class DocdataUnavailable(RuntimeError):
+    """
+    Docdata is not called, because the previous calls failed (the circuit breaker is open).
+    """
+    def __init__(self, operation):
+        super(DocdataUnavailable, self).__init__("Docdata is unavailable, not performing the '{0}' call.".format(operation))
+        self.operation = operation
+
+
+class DocdataTimeout(DocdataUnavailable):
+    """
+    The Docdata call didn't finish within the timeout or deadline.
+    """
+    def __init__(self, operation):
+        RuntimeError.__init__(self, "The Docdata '{0}' call timed out.".format(operation))
+        self.operation = operation
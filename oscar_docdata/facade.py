@@ -10,7 +10,7 @@ from oscar.apps.order.exceptions import InvalidOrderStatus
 from oscar.apps.payment.exceptions import PaymentError
 from oscar.core.loading import get_model
 from oscar_docdata import appsettings
-from oscar_docdata.exceptions import DocdataCreateError
+from oscar_docdata.exceptions import DocdataCreateError, DocdataUnavailable
 from oscar_docdata.gateway import Name, Shopper, Destination, Amount, to_iso639_part1, Invoice
 from oscar_docdata.interface import Interface
 
@@ -101,6 +101,8 @@ class Facade(Interface):
             order_key = super(Facade, self).create_payment(order_number, total, user, language=language, description=description, profile=profile, merchant_name=merchant_name, **kwargs)
         except DocdataCreateError as e:
             raise PaymentError(e.value, e)
+        except DocdataUnavailable as e:
+            raise PaymentError(str(e), e)
 
         return order_key
 
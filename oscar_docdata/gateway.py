@@ -5,17 +5,39 @@ Gateway module - this module is ignorant of Oscar and could be used in a non-Osc
 All Oscar-related functionality should be in the facade.
 """
 import logging
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as futures_wait
+from contextlib import contextmanager
 from decimal import Decimal as D
+from itertools import islice
 from django.core.exceptions import ImproperlyConfigured
 from django.utils.text import Truncator
+import suds.bindings.binding
 import suds.client
 import suds.plugin
+import suds.transport
 from django.urls import reverse
 from django.utils.translation import get_language
 from suds.sax.element import Element
+from suds.sax.parser import Parser
+from suds.umx.basic import Basic as UmxBasic
 from oscar_docdata import appsettings, __version__ as oscar_docdata_version
-from oscar_docdata.exceptions import DocdataCreateError, DocdataStatusError, DocdataCancelError, OrderKeyMissing
-from six import text_type, integer_types
+from oscar_docdata.circuit import get_circuit_breaker
+from oscar_docdata.envelope import create_envelope, get_envelope_template, status_envelope
+from oscar_docdata.exceptions import (
+    DocdataCancelError, DocdataCreateError, DocdataException, DocdataStatusError, DocdataTimeout, DocdataUnavailable,
+    OrderKeyMissing)
+from oscar_docdata.metrics import counters
+from oscar_docdata.reports import StatusReport
+from oscar_docdata.retry import IDEMPOTENT_OPERATIONS, get_retry_policy
+from oscar_docdata.status_cache import get_status_cache
+from oscar_docdata.status_parser import ParseError, parse_status_response
+from oscar_docdata.throttling import PRIORITY_HIGH, RateLimiter, get_token_bucket
+from oscar_docdata.transport import ConnectionPoolTimeout, get_request_timeout, get_transport, request_timeout
+from oscar_docdata.wsdl_cache import get_wsdl_cache
+from six import get_unbound_function, integer_types, text_type
+from six.moves import http_client
 from six.moves.urllib.parse import urlencode
 from six.moves.urllib.error import URLError
 
@@ -27,6 +49,7 @@ __all__ = (
     'CreateReply',
     'StartReply',
     'StatusReply',
+    'StatusManyResult',
 
     'Name',
     'Shopper',
@@ -64,37 +87,85 @@ __all__ = (
 CACHED_CLIENT = {}
 
 
-def get_suds_client(testing_mode=False):
+def get_wsdl_url(testing_mode=False):
     """
-    Create the suds client to connect to docdata.
+    Return the URL of the WSDL file.
     """
+    # Online preview: https://secure.docdatapayments.com/ps/orderapi-1_3.wsdl
     if testing_mode:
-        url = 'https://test.docdatapayments.com/ps/services/paymentservice/1_3?wsdl'
+        return 'https://test.docdatapayments.com/ps/services/paymentservice/1_3?wsdl'
     else:
-        url = 'https://secure.docdatapayments.com/ps/services/paymentservice/1_3?wsdl'
-    # Online preview: https://secure.docdatapayments.com/ps/orderapi-1_3.wsdl
+        return 'https://secure.docdatapayments.com/ps/services/paymentservice/1_3?wsdl'
+
+
+def get_suds_client(testing_mode=False, transport=None):
+    """
+    Create the suds client to connect to docdata.
+
+    By default, the transport of the ``DOCDATA_TRANSPORT_CLASS`` setting is used,
+    and the client is shared within the process. When a custom transport is given,
+    a separate client is constructed for it.
+    """
+    url = get_wsdl_url(testing_mode)
 
     # See if the client is already fetched, if so, reuse that.
-    try:
-        return CACHED_CLIENT[url]
-    except KeyError:
-        pass
+    if transport is None:
+        try:
+            return CACHED_CLIENT[url]
+        except KeyError:
+            pass
 
     try:
-        client = suds.client.Client(url, plugins=[DocdataAPIVersionPlugin()])
-        # HACK: Fixes serialization of raw Element objects.
-        # Otherwise, the Element is appended as <tagname /> in the request.
-        # The debug output of 'suds.client' won't show this,
-        # but the debug output of 'suds' will.
-        client.options.prettyxml = True
-
-        # Cache and return
-        CACHED_CLIENT[url] = client
-        return client
-    except URLError as e:
+        client = create_suds_client(url, transport=transport)
+    except (URLError, suds.transport.TransportError) as e:
         logger.error("Could not initialize SUDS SOAP client to connect to Docdata: {0}".format(str(e)))
         raise
 
+    # Cache and return
+    if transport is None:
+        CACHED_CLIENT[url] = client
+    return client
+
+
+def get_deadline(timeout):
+    """
+    Return the deadline for calls that should complete within ``timeout`` seconds from now.
+    The deadline can be passed to the :class:`DocdataClient` methods.
+    """
+    return time.time() + timeout
+
+
+def create_suds_client(url, wsdl_cache=None, transport=None, **options):
+    """
+    Construct a new suds client for the WSDL URL.
+
+    When ``DOCDATA_WSDL_CACHE_DIR`` is configured, the parsed WSDL definitions
+    are read from (or stored in) that persistent cache.
+
+    :type wsdl_cache: oscar_docdata.wsdl_cache.WsdlCache
+    :type transport: suds.transport.Transport
+    """
+    plugins = [DocdataAPIVersionPlugin()]
+    options['transport'] = transport if transport is not None else get_transport()
+    options.setdefault('timeout', appsettings.DOCDATA_TIMEOUT)
+
+    if wsdl_cache is None:
+        wsdl_cache = get_wsdl_cache()
+    if wsdl_cache is not None:
+        plugins.append(wsdl_cache.content_hasher)
+        wsdl_cache.add_url(url)
+        options['cache'] = wsdl_cache
+        options['cachingpolicy'] = 1  # Cache the parsed definitions, not the XML documents.
+
+    client = suds.client.Client(url, plugins=plugins, **options)
+
+    # HACK: Fixes serialization of raw Element objects.
+    # Otherwise, the Element is appended as <tagname /> in the request.
+    # The debug output of 'suds.client' won't show this,
+    # but the debug output of 'suds' will.
+    client.options.prettyxml = True
+    return client
+
 
 class DocdataAPIVersionPlugin(suds.plugin.MessagePlugin):
     """
@@ -107,6 +178,63 @@ class DocdataAPIVersionPlugin(suds.plugin.MessagePlugin):
         request.set('version', '1.3')
 
 
+def _get_soap_fault(replyroot):
+    """
+    Return the unmarshalled ``<Fault>`` element of a SOAP reply, like the suds client reads it.
+    """
+    if replyroot is None:
+        return None
+    for envns in (suds.bindings.binding.envns, getattr(suds.bindings.binding, 'envns12', None)):
+        if envns is None:
+            continue
+        envelope = replyroot.getChild('Envelope', envns)
+        body = envelope and envelope.getChild('Body', envns)
+        fault = body and body.getChild('Fault', envns)
+        if fault is not None:
+            return UmxBasic().process(fault)
+    return None
+
+
+def _first_error(errors):
+    # The error element can be repeated, in which case suds returns a list.
+    return errors[0] if isinstance(errors, list) else errors
+
+
+def _has_default_xml(value, cls):
+    # Tell whether the object is serialized by the to_xml() method of the given class.
+    return get_unbound_function(type(value).to_xml) is get_unbound_function(cls.to_xml)
+
+
+def _has_subject_merchant(merchant):
+    # suds-jurko fills the subjectMerchant with an empty object, suds-community leaves it empty.
+    return bool(getattr(getattr(merchant, 'subjectMerchant', None), '_name', None))
+
+
+def _is_default_destination(destination):
+    return _has_default_xml(destination, Destination) \
+        and _has_default_xml(destination.name, Name) \
+        and _has_default_xml(destination.address, Address)
+
+
+def _is_default_invoice(invoice):
+    if not _has_default_xml(invoice, Invoice) \
+            or not _has_default_xml(invoice.total_net_amount, Amount) \
+            or not _has_default_xml(invoice.total_vat_amount, Vat) \
+            or not _is_default_destination(invoice.ship_to):
+        return False
+
+    for item in invoice.items:
+        if not _has_default_xml(item, Item) \
+                or not _has_default_xml(item.quantity, Quantity) \
+                or not _has_default_xml(item.vat, Vat) \
+                or not _has_default_xml(item.total_vat, Vat):
+            return False
+        for amount in (item.net_amount, item.gross_amount, item.total_net_amount, item.total_gross_amount):
+            if not _has_default_xml(amount, Amount):
+                return False
+    return True
+
+
 def log_docdata_error(soap_error, message, *args, **kwargs):
     logger.error(u"{0}: code={1}, error={2}".format(message, soap_error._code, soap_error.value), *args, **kwargs)
 
@@ -194,7 +322,7 @@ class DocdataClient(object):
             testing_mode = appsettings.DOCDATA_TESTING
 
         self.testing_mode = testing_mode
-        self.client = get_suds_client(testing_mode)
+        self.client = self.get_suds_client(testing_mode)
 
         # Create the merchant node to pass the username/password to.
         if merchant_name is not None:
@@ -232,6 +360,12 @@ class DocdataClient(object):
             merchant_password=password
         )
 
+    def get_suds_client(self, testing_mode):
+        """
+        Return the suds client that performs the SOAP calls.
+        """
+        return get_suds_client(testing_mode)
+
     def set_merchant(self, name, password):
         """
         Set the merchant name and password to connect to Docdata.
@@ -263,6 +397,7 @@ class DocdataClient(object):
             includeCosts=False,
             profile=appsettings.DOCDATA_PROFILE,
             days_to_pay=appsettings.DOCDATA_DAYS_TO_PAY,
+            deadline=None,
     ):
         """
         Create the payment in docdata.
@@ -291,8 +426,238 @@ class DocdataClient(object):
         :type receiptText: str
         :param profile: The profile that is used to select the payment methods that can be used to pay this order.
         :param days_to_pay: The expected number of days in which the payment should be processed, or be expired if not paid.
+        :param deadline: The time (as ``time.time()`` value) the call should be completed, see :func:`get_deadline`.
         :rtype: CreateReply
         """
+        args = (order_id, total_gross_amount, shopper, bill_to, description, invoice, receiptText, includeCosts, profile, days_to_pay)
+        envelope = self._get_create_envelope(*args)
+        with self._guard_call('create', deadline):
+            if envelope is not None:
+                reply = self._send_envelope('create', envelope)
+            else:
+                reply = self.client.service.create(**self._get_create_args(*args))
+        return self._parse_create_reply(order_id, reply)
+
+    def _get_create_envelope(self, order_id, total_gross_amount, shopper, bill_to, description, invoice, receiptText, includeCosts, profile, days_to_pay):
+        """
+        Construct the SOAP envelope of the create call without suds, when possible.
+        This returns ``None`` when the suds client needs to construct the envelope instead.
+        """
+        if not appsettings.DOCDATA_FAST_SERIALIZER \
+                or not self._is_default_client() \
+                or _has_subject_merchant(self.merchant) \
+                or not _has_default_xml(self.integration_info, TechnicalIntegrationInfo) \
+                or not _has_default_xml(total_gross_amount, Amount) \
+                or not _has_default_xml(shopper, Shopper) \
+                or not _has_default_xml(shopper.name, Name) \
+                or not _is_default_destination(bill_to) \
+                or (invoice is not None and not _is_default_invoice(invoice)):
+            # Customized objects or options, let suds generate the XML.
+            return None
+
+        return create_envelope(
+            get_envelope_template(self.client, 'create'),
+            self.merchant._name,
+            self.merchant._password,
+            order_id,
+            total_gross_amount,
+            shopper,
+            bill_to,
+            description,
+            invoice,
+            receiptText,
+            includeCosts,
+            profile,
+            days_to_pay,
+            plugin_version=oscar_docdata_version,
+        )
+
+    def _is_default_client(self):
+        """
+        Tell whether the suds client generates the envelope that :func:`create_envelope` also generates.
+        """
+        options = self.client.options
+        if not options.prettyxml:
+            return False
+        for plugin in options.plugins:
+            if isinstance(plugin, suds.plugin.MessagePlugin) and not isinstance(plugin, DocdataAPIVersionPlugin):
+                return False
+        return True
+
+    def _call_with_retry(self, operation, deadline, func, *args):
+        """
+        Perform the call, and retry it according to the ``DOCDATA_RETRY_*`` settings when it's idempotent.
+        """
+        policy = get_retry_policy()
+        if policy is None or operation not in IDEMPOTENT_OPERATIONS:
+            return func(*args)
+        return policy.call(operation, lambda: func(*args), deadline)
+
+    @contextmanager
+    def _guard_call(self, operation, deadline=None):
+        """
+        Apply the circuit breaker, rate limit and timeout to a Docdata call.
+        """
+        # An expired deadline is not a failure of Docdata, check it before the circuit breaker counts it.
+        self._get_timeout(operation, deadline)
+        breaker = self._allow_call(operation)
+        try:
+            # Waiting for the rate limit can use up the deadline too.
+            self._wait_for_rate_limit(operation)
+            timeout = self._get_timeout(operation, deadline)
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+
+        with self._circuit_breaker(operation, breaker):
+            with self._timeout(operation, timeout):
+                yield
+
+    def _get_timeout(self, operation, deadline=None):
+        """
+        Return the timeout of the call, from the ``DOCDATA_TIMEOUTS`` setting and the deadline.
+        """
+        timeout = appsettings.DOCDATA_TIMEOUTS.get(operation, appsettings.DOCDATA_TIMEOUT)
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise DocdataTimeout(operation)
+            timeout = min(timeout, remaining) if timeout else remaining
+        return timeout
+
+    @contextmanager
+    def _timeout(self, operation, timeout):
+        """
+        Apply the timeout to the call, and raise timeouts as :class:`~oscar_docdata.exceptions.DocdataTimeout`.
+        """
+        try:
+            with request_timeout(timeout):
+                yield
+        except (socket.timeout, ConnectionPoolTimeout):
+            raise DocdataTimeout(operation)
+        except URLError as e:
+            if isinstance(e.reason, socket.timeout):
+                raise DocdataTimeout(operation)
+            raise
+
+    def _allow_call(self, operation):
+        """
+        Fail directly when the circuit breaker of the operation is open.
+        Returns the circuit breaker, if it's configured.
+        """
+        breaker = get_circuit_breaker(operation, self.testing_mode)
+        if breaker is not None and not breaker.allow():
+            logger.warning("DocdataClient: circuit breaker is open, not performing the '%s' call.", operation)
+            raise DocdataUnavailable(operation)
+        return breaker
+
+    @contextmanager
+    def _circuit_breaker(self, operation, breaker):
+        """
+        Register the result of the call in the circuit breaker.
+        Replies of Docdata (including errors and SOAP faults) count as success, only failed connections count as failure.
+        """
+        if breaker is None:
+            yield
+            return
+
+        try:
+            yield
+        except (DocdataException, suds.WebFault):
+            breaker.record_success()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        else:
+            breaker.record_success()
+
+    def _get_rate_limit(self, operation):
+        """
+        Return the token bucket of the ``DOCDATA_RATE_LIMIT``, the bucket name and the priority of the operation.
+        """
+        bucket = get_token_bucket()
+        if bucket is None:
+            return None, None, None
+        name = u"{0}:{1}".format(self.merchant_name, int(bool(self.testing_mode)))
+        return bucket, name, appsettings.DOCDATA_RATE_LIMIT_PRIORITIES.get(operation, PRIORITY_HIGH)
+
+    def _wait_for_rate_limit(self, operation):
+        """
+        Wait until the call is allowed by the ``DOCDATA_RATE_LIMIT``.
+        """
+        bucket, name, priority = self._get_rate_limit(operation)
+        if bucket is not None:
+            bucket.wait(name, priority)
+
+    def _send_envelope(self, operation, envelope, parse=True):
+        """
+        Send a SOAP envelope that was constructed without suds.
+        The reply is still parsed by the suds client, unless ``parse=False`` is given.
+        In that case, the body of a successful reply is returned as bytes.
+        """
+        method = getattr(self.client.service, operation).method
+        action = method.soap.action
+        if isinstance(action, text_type):
+            action = action.encode('utf-8')  # Same as suds does.
+
+        request = suds.transport.Request(self.client.options.location or method.location, envelope)
+        timeout = get_request_timeout()
+        if timeout:
+            request.timeout = timeout
+        request.headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': action,
+        }
+        request.headers.update(self.client.options.headers)
+
+        try:
+            reply = self.client.options.transport.send(request)
+        except suds.transport.TransportError as e:
+            # Same as suds does, this raises a WebFault for SOAP faults.
+            content = e.fp.read() if e.fp else b''
+            return self._process_reply(operation, content, e.httpcode, str(e))
+
+        if reply is None:
+            return None  # 202/204 response
+        elif not parse:
+            return reply.message
+        return self._process_reply(operation, reply.message)
+
+    def _process_reply(self, operation, reply, status=None, description=None):
+        """
+        Let suds parse the reply of a SOAP call.
+        This follows the reply handling of the suds client, which has no public API for replies that suds didn't send.
+        SOAP faults are raised as :class:`suds.WebFault`, like the suds client does.
+        """
+        if status is None:
+            status = http_client.OK
+        if status in (http_client.ACCEPTED, http_client.NO_CONTENT):
+            return None
+
+        method = getattr(self.client.service, operation).method
+        plugins = suds.plugin.PluginContainer(self.client.options.plugins)
+        reply = plugins.message.received(reply=reply).reply
+
+        replyroot = None
+        if status in (http_client.OK, http_client.INTERNAL_SERVER_ERROR):
+            replyroot = Parser().parse(string=reply) if reply else None
+            plugins.message.parsed(reply=replyroot)
+            fault = _get_soap_fault(replyroot)
+            if fault:
+                raise suds.WebFault(fault, replyroot)
+        if status != http_client.OK:
+            # Same exception as suds raises, see retry.is_transient_error().
+            raise Exception((status, description))
+
+        result = replyroot and method.binding.output.get_reply(method, replyroot)
+        return plugins.message.unmarshalled(reply=result).reply
+
+    def _get_create_args(self, order_id, total_gross_amount, shopper, bill_to, description, invoice, receiptText, includeCosts, profile, days_to_pay):
+        """
+        Construct the arguments of the create call.
+        """
         # Preferences for the DocData system.
         paymentPreferences = self.client.factory.create('ns0:paymentPreferences')
         paymentPreferences.profile = profile
@@ -317,7 +682,7 @@ class DocdataClient(object):
         # This displays the results in the docdata web menu.
         #
         factory = self.client.factory
-        reply = self.client.service.create(
+        return dict(
             merchant=self.merchant,
             merchantOrderReference=order_id,
             paymentPreferences=paymentPreferences,
@@ -333,41 +698,48 @@ class DocdataClient(object):
             integrationInfo=self.integration_info.to_xml(factory)
         )
 
-        # Parse the reply
+    def _parse_create_reply(self, order_id, reply):
         if hasattr(reply, 'createSuccess'):
             order_key = str(reply['createSuccess']['key'])
             return CreateReply(order_id, order_key)
         elif hasattr(reply, 'createErrors'):
-            error = reply.createErrors.error
+            error = _first_error(reply.createErrors.error)
             log_docdata_error(error, "DocdataClient: failed to create payment for order %s", order_id)
             raise DocdataCreateError(error._code, error.value)
         else:
             raise NotImplementedError('Received unknown reply from DocData. Remote Payment not created.')
 
-    def cancel(self, order_key):
+    def cancel(self, order_key, deadline=None):
         """
         The cancel command is used for canceling a previously created payment,
         and can only be used for payments with status NEW, STARTED and AUTHORIZED.
+
+        :param deadline: The time (as ``time.time()`` value) the call should be completed, see :func:`get_deadline`.
         """
         if not order_key:
             raise OrderKeyMissing("Missing order_key!")
 
-        reply = self.client.service.cancel(self.merchant, order_key)
+        with self._guard_call('cancel', deadline):
+            reply = self.client.service.cancel(self.merchant, order_key)
+        return self._parse_cancel_reply(order_key, reply)
 
+    def _parse_cancel_reply(self, order_key, reply):
         if hasattr(reply, 'cancelSuccess'):
+            self.forget_status(order_key)
             return True
         elif hasattr(reply, 'cancelErrors'):
-            error = reply.cancelErrors.error
+            error = _first_error(reply.cancelErrors.error)
             log_docdata_error(error, "DocdataClient: failed to cancel the order %s", order_key)
             raise DocdataCancelError(error._code, error.value)
         else:
             logger.error("Unexpected response node from docdata!")
             raise NotImplementedError('Received unknown reply from DocData. Remote Payment not cancelled.')
 
-    def status(self, order_key):
+    def status(self, order_key, deadline=None):
         """
         Request the status of of order and it's payments.
 
+        :param deadline: The time (as ``time.time()`` value) the call should be completed, see :func:`get_deadline`.
         :rtype: StatusReply
         """
         # Example response:
@@ -401,44 +773,189 @@ class DocdataClient(object):
         if not order_key:
             raise OrderKeyMissing("Missing order_key!")
 
-        reply = self.client.service.status(
-            self.merchant,
+        cached_reply = self._get_cached_status(order_key)
+        if cached_reply is not None:
+            return cached_reply
+
+        return self._call_with_retry('status', deadline, self._status, order_key, deadline)
+
+    def _status(self, order_key, deadline=None):
+        """
+        Perform a single attempt of the status call.
+        """
+        envelope = self._get_status_envelope('status', order_key)
+        with self._guard_call('status', deadline):
+            if envelope is not None:
+                body = self._send_envelope('status', envelope, parse=False)
+                return self._parse_status_body('status', order_key, body)
+
+            reply = self.client.service.status(
+                self.merchant,
+                order_key,
+                integrationInfo=self.integration_info.to_xml(self.client.factory)
+            )
+        return self._parse_status_reply(order_key, reply)
+
+    def _get_status_envelope(self, operation, order_key):
+        """
+        Construct the SOAP envelope of the status call without suds, when possible.
+        This returns ``None`` when the suds client needs to construct the envelope and parse the reply instead.
+        """
+        if not appsettings.DOCDATA_FAST_STATUS_PARSER \
+                or not self._is_default_client() \
+                or _has_subject_merchant(self.merchant) \
+                or not _has_default_xml(self.integration_info, TechnicalIntegrationInfo):
+            return None
+
+        return status_envelope(
+            get_envelope_template(self.client, operation),
+            self.merchant._name,
+            self.merchant._password,
             order_key,
-            integrationInfo=self.integration_info.to_xml(self.client.factory)
+            plugin_version=oscar_docdata_version,
         )
 
-        if hasattr(reply, 'statusSuccess'):
-            return StatusReply(order_key, reply.statusSuccess.report)
-        elif hasattr(reply, 'statusErrors'):
-            error = reply.statusErrors.error
+    def _parse_status_body(self, operation, order_key, body):
+        """
+        Parse the reply of the status call, without building the suds object tree.
+        Replies that are not a status response (e.g. a SOAP fault) are still handled by suds.
+        """
+        try:
+            result = parse_status_response(body) if body else None
+        except ParseError:
+            result = None
+
+        if result is None:
+            reply = self._process_reply(operation, body) if body else None
+            return self._parse_status_reply(order_key, reply)
+        elif isinstance(result, StatusReport):
+            return self._cache_status(StatusReply(order_key, result))
+        else:
+            error = result[0]
             log_docdata_error(error, "DocdataClient: failed to get status for payment cluster %s", order_key)
             raise DocdataStatusError(error._code, error.value)
-        else:
-            logger.error("Unexpected response node from docdata!")
-            raise NotImplementedError('Received unknown reply from DocData. No status processed from Docdata.')
 
-    def status_extended(self, order_key):
+    def status_extended(self, order_key, deadline=None):
         """
         Request the status with extended information.
+        The extended payment details are available in the ``extended_report`` of the reply.
+
+        :rtype: StatusReply
         """
         if not order_key:
             raise OrderKeyMissing("Missing order_key!")
 
-        reply = self.client.service.statusExtended(
-            self.merchant,
-            order_key,
-            self.integration_info.to_xml(self.client.factory)
-        )
+        return self._call_with_retry('statusExtended', deadline, self._status_extended, order_key, deadline)
 
+    def _status_extended(self, order_key, deadline=None):
+        """
+        Perform a single attempt of the statusExtended call.
+        """
+        with self._guard_call('statusExtended', deadline):
+            reply = self.client.service.statusExtended(
+                self.merchant,
+                order_key,
+                self.integration_info.to_xml(self.client.factory)
+            )
+        return self._parse_status_reply(order_key, reply, extended=True)
+
+    def _parse_status_reply(self, order_key, reply, extended=False):
         if hasattr(reply, 'statusSuccess'):
-            return StatusReply(order_key, reply.statusSuccess.report)
+            report = reply.statusSuccess.report
+            return self._cache_status(StatusReply(order_key, StatusReport.from_suds(report), extended_report=report if extended else None))
         elif hasattr(reply, 'statusErrors'):
-            error = reply.statusErrors.error
+            error = _first_error(reply.statusErrors.error)
             log_docdata_error(error, "DocdataClient: failed to get status for payment cluster %s", order_key)
             raise DocdataStatusError(error._code, error.value)
         else:
             logger.error("Unexpected response node from docdata!")
-            raise NotImplementedError('Received unknown reply from DocData. Remote Payment not created.')
+            raise NotImplementedError('Received unknown reply from DocData. No status processed from Docdata.')
+
+    def _get_cached_status(self, order_key):
+        """
+        Return the recently fetched status from the ``DOCDATA_STATUS_CACHE``, if available.
+
+        :rtype: StatusReply | None
+        """
+        cache = get_status_cache()
+        if cache is None:
+            return None
+
+        report = cache.get(self.merchant_name, order_key, self.testing_mode)
+        if report is None:
+            counters.increment('status_cache_miss')
+            return None
+
+        counters.increment('status_cache_hit')
+        return StatusReply(order_key, report)
+
+    def _cache_status(self, reply):
+        """
+        Store the fetched status in the ``DOCDATA_STATUS_CACHE``.
+        Only the parsed report is stored, the ``extended_report`` is not cached.
+        """
+        cache = get_status_cache()
+        if cache is not None:
+            cache.set(self.merchant_name, reply.order_key, self.testing_mode, reply.report)
+        return reply
+
+    def forget_status(self, order_key):
+        """
+        Remove the status from the ``DOCDATA_STATUS_CACHE``, as it changed.
+        The next :func:`status` call fetches the status from Docdata.
+        """
+        cache = get_status_cache()
+        if cache is not None:
+            cache.delete(self.merchant_name, order_key, self.testing_mode)
+
+    def status_many(self, order_keys, max_workers=None, rate_limit=None):
+        """
+        Request the status of multiple orders concurrently.
+
+        The requests are performed by a bounded pool of worker threads.
+        The results are yielded as soon as they arrive, hence not in the order of ``order_keys``.
+        A failed request doesn't stop the others, the error is returned in the result instead.
+
+        :param order_keys: The order keys, this can also be a generator.
+        :param max_workers: The number of concurrent requests, defaults to ``DOCDATA_STATUS_MAX_WORKERS``.
+        :param rate_limit: The maximum number of requests per second, defaults to ``DOCDATA_STATUS_RATE_LIMIT``.
+        :rtype: collections.Iterable[StatusManyResult]
+        """
+        if max_workers is None:
+            max_workers = appsettings.DOCDATA_STATUS_MAX_WORKERS
+        if rate_limit is None:
+            rate_limit = appsettings.DOCDATA_STATUS_RATE_LIMIT
+
+        limiter = RateLimiter(rate_limit)
+
+        def _status(order_key):
+            limiter.wait()
+            return self.status(order_key)
+
+        # Only keep a few requests queued, so a large generator of order_keys isn't consumed at once.
+        order_keys = iter(order_keys)
+        pending = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for order_key in islice(order_keys, max_workers * 2):
+                    pending[executor.submit(_status, order_key)] = order_key
+
+                while pending:
+                    done, _ = futures_wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        order_key = pending.pop(future)
+                        try:
+                            result = StatusManyResult(order_key, reply=future.result())
+                        except Exception as e:
+                            result = StatusManyResult(order_key, error=e)
+                        yield result
+
+                    for order_key in islice(order_keys, len(done)):
+                        pending[executor.submit(_status, order_key)] = order_key
+            finally:
+                # When the caller stops early, don't perform the queued requests.
+                for future in pending:
+                    future.cancel()
 
     def get_payment_menu_url(self, request, order_key, return_url=None, client_language=None, **extra_url_args):
         """
@@ -519,15 +1036,33 @@ class StartReply(object):
 class StatusReply(object):
     """
     Docdata response for the status request.
+
+    :type report: oscar_docdata.reports.StatusReport
+    :param extended_report: The suds ``statusReport`` object of the ``statusExtended`` call.
     """
-    def __init__(self, order_key, report):
+    def __init__(self, order_key, report, extended_report=None):
         self.order_key = order_key
         self.report = report
+        self.extended_report = extended_report
 
     def __repr__(self):
         return "<StatusReply {0}>".format(repr(self.report))
 
 
+class StatusManyResult(object):
+    """
+    The outcome of a single status request of :func:`DocdataClient.status_many`.
+    Either the ``reply`` or the ``error`` is set.
+    """
+    def __init__(self, order_key, reply=None, error=None):
+        self.order_key = order_key
+        self.reply = reply
+        self.error = error
+
+    def __repr__(self):
+        return "<StatusManyResult {0} {1}>".format(self.order_key, "error" if self.error is not None else "ok")
+
+
 class Name(object):
     """
     A name for Docdata.
@@ -12,10 +12,14 @@ from django.db import transaction
 from django.utils.timezone import now
 from django.utils.translation import get_language
 from oscar_docdata import appsettings
-from oscar_docdata.exceptions import InvalidMerchant
+from oscar_docdata.exceptions import InvalidMerchant, OrderUpdateConflict
 from oscar_docdata.gateway import DocdataClient
+from oscar_docdata.metrics import counters
 from oscar_docdata.models import DocdataOrder, DocdataPayment
+from oscar_docdata.monthly_totals import track_monthly_totals
+from oscar_docdata.registry import client_registry
 from oscar_docdata.signals import order_status_changed, payment_added, payment_updated
+from oscar_docdata.singleflight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +76,17 @@ class Interface(object):
             merchant_password=password
         )
 
-    def create_payment(self, order_number, total, user, language=None, description=None, profile=appsettings.DOCDATA_PROFILE, merchant_name=None, **kwargs):
+    def get_merchant_client(self, merchant_name):
+        """
+        Return the client for a merchant, the client is reused between calls.
+        The proper account credentials are automatically selected
+        from the ``DOCDATA_MERCHANT_PASSWORDS`` setting.
+
+        :rtype: DocdataClient
+        """
+        return client_registry.get(merchant_name, testing_mode=self.testing_mode)
+
+    def create_payment(self, order_number, total, user, language=None, description=None, profile=appsettings.DOCDATA_PROFILE, merchant_name=None, deadline=None, **kwargs):
         """
         Start a new payment session / container.
 
@@ -84,13 +98,14 @@ class Interface(object):
         :type user: :class:`django.contrib.auth.models.User`
         :param language: The language to display the interface in.
         :param description
+        :param deadline: The time (as :func:`time.time` value) at which the call should be given up.
         :returns: The Docdata order reference ("order key").
         """
         if not language:
             language = get_language()
 
         if merchant_name is not None:
-            client = DocdataClient.for_merchant(merchant_name=merchant_name, testing_mode=self.testing_mode)
+            client = self.get_merchant_client(merchant_name)
         else:
             client = self.client
 
@@ -105,7 +120,7 @@ class Interface(object):
             profile=profile,
             **kwargs
         )
-        createsuccess = client.create(**call_args)
+        createsuccess = client.create(deadline=deadline, **call_args)
 
         # Track order_key for local logging
         destination = call_args.get('bill_to')
@@ -132,7 +147,7 @@ class Interface(object):
         """
         Store the order_key for local status checking.
         """
-        DocdataOrder.objects.create(
+        order = DocdataOrder(
             merchant_name=merchant_name,
             merchant_order_id=order_number,
             order_key=order_key,
@@ -141,6 +156,8 @@ class Interface(object):
             language=language,
             country=country_code
         )
+        with track_monthly_totals(order):
+            order.save(force_insert=True)
 
     def get_payment_menu_url(self, request, order_key, return_url=None, client_language=None, **extra_url_args):
         """
@@ -151,52 +168,132 @@ class Interface(object):
         """
         return self.client.get_payment_menu_url(request, order_key, return_url=return_url, client_language=client_language, **extra_url_args)
 
-    def cancel_order(self, order):
+    def cancel_order(self, order, deadline=None):
         """
         Cancel the order.
         :type order: DocdataOrder
         """
-        client = DocdataClient.for_merchant(order.merchant_name, testing_mode=self.testing_mode)
-        client.cancel(order.order_key)  # Can bail out with an exception (already logged)
+        client = self.get_merchant_client(order.merchant_name)
+        client.cancel(order.order_key, deadline=deadline)  # Can bail out with an exception (already logged)
 
         # Don't wait for server to send event back, get most recent state now.
         # Also make sure the order will be marked as cancelled.
-        statusreply = client.status(order.order_key)  # Can bail out with an exception (already logged)
+        statusreply = client.status(order.order_key, deadline=deadline)  # Can bail out with an exception (already logged)
         self._store_report(order, statusreply.report, indented_status=DocdataOrder.STATUS_CANCELLED)
 
-    def update_order(self, order):
+    def update_order(self, order, deadline=None):
         """
         :type order: DocdataOrder
+        :param deadline: The time (as :func:`time.time` value) at which the status request should be given up.
         """
         # Fetch the latest status
-        client = DocdataClient.for_merchant(order.merchant_name, testing_mode=self.testing_mode)
+        statusreply = self.fetch_status(order, deadline=deadline)  # Can bail out with an exception (already logged)
+
+        # Store the new status
+        self._store_report(order, statusreply.report)
+
+    def update_order_optimistic(self, order, max_attempts=None, deadline=None):
+        """
+        Update the order, without holding a database lock while the status is fetched.
+
+        The status is fetched first, and the order is only locked to store the result.
+        When the order was updated by another process in the meantime (detected by the ``version`` field),
+        the status is fetched again, as the other process might have stored a newer report.
+
+        :type order: DocdataOrder
+        :param max_attempts: The number of attempts, defaults to ``DOCDATA_UPDATE_MAX_ATTEMPTS``.
+        :param deadline: The time (as :func:`time.time` value) at which the status requests should be given up.
+        :returns: The updated (and locked) order object.
+        :rtype: DocdataOrder
+        :raises OrderUpdateConflict: When all attempts were interrupted by concurrent updates.
+        """
+        if max_attempts is None:
+            max_attempts = appsettings.DOCDATA_UPDATE_MAX_ATTEMPTS
+
+        for attempt in range(max_attempts):
+            statusreply = self.fetch_status(order, deadline=deadline)  # Can bail out with an exception (already logged)
+
+            with transaction.atomic():
+                locked_order = DocdataOrder.objects.select_for_update().get(pk=order.pk)
+                if locked_order.version == order.version \
+                        or locked_order.report_fingerprint == statusreply.report.fingerprint():
+                    # Not changed in the meantime, or the other process stored the same report.
+                    self._store_report(locked_order, statusreply.report)
+                    return locked_order
+
+            logger.info("Payment cluster %s was updated concurrently, fetching the status again.", order.order_key)
+            counters.increment('order_update_conflict')
+            order = locked_order
+
+        raise OrderUpdateConflict("Payment cluster {0} was updated concurrently {1} times.".format(order.order_key, max_attempts))
+
+    def forget_status(self, order):
+        """
+        Remove the cached status of the order, after Docdata notified that the status changed.
+
+        :type order: DocdataOrder
+        """
+        self.get_merchant_client(order.merchant_name).forget_status(order.order_key)
+
+    def fetch_status(self, order, deadline=None):
+        """
+        Fetch the latest status of the order.
+        This performs the remote call only, the order is not updated.
+
+        :type order: DocdataOrder
+        :rtype: oscar_docdata.gateway.StatusReply
+        """
+        client = self.get_merchant_client(order.merchant_name)
         if client.merchant_name != order.merchant_name:
             raise InvalidMerchant("Order {0} belongs to a different merchant: {1} (client uses: {2})".format(
                 order.merchant_order_id, order.merchant_name, client.merchant_name
             ))
 
-        statusreply = client.status(order.order_key)  # Can bail out with an exception (already logged)
+        flight = get_single_flight()
+        if flight is None:
+            return client.status(order.order_key, deadline=deadline)
 
-        # Store the new status
-        self._store_report(order, statusreply.report)
+        # Reuse the result when another request fetches the same status concurrently.
+        return flight.call(order.order_key, lambda: client.status(order.order_key, deadline=deadline), deadline=deadline)
+
+    def status_many(self, order_keys, max_workers=None, rate_limit=None):
+        """
+        Request the status of multiple orders of this merchant concurrently.
+
+        For more information, see :func:`DocdataClient.status_many`.
+        :rtype: collections.Iterable[oscar_docdata.gateway.StatusManyResult]
+        """
+        return self.client.status_many(order_keys, max_workers=max_workers, rate_limit=rate_limit)
 
     def _store_report(self, order, report, indented_status=None):
         """
         Store the retrieved status report in the order object.
 
         :type order: DocdataOrder
+        :type report: oscar_docdata.reports.StatusReport
         """
+        # Docdata often sends the same notification multiple times,
+        # skip all database writes and signals when the report didn't change since the last update.
+        # Without payments, the status still depends on the age of the order (it expires).
+        fingerprint = report.fingerprint()
+        if fingerprint == order.report_fingerprint \
+                and indented_status is None \
+                and (report.payments or order.status in (DocdataOrder.STATUS_EXPIRED, DocdataOrder.STATUS_CANCELLED)):
+            logger.debug("Payment cluster %s status report is unchanged, skipping update.", order.order_key)
+            counters.increment('report_unchanged')
+            return
+
         # Store totals
-        totals = report.approximateTotals
-        order.total_registered = D(totals.totalRegistered) / 100
-        order.total_shopper_pending = D(totals.totalShopperPending) / 100
-        order.total_acquirer_pending = D(totals.totalAcquirerPending) / 100
-        order.total_acquirer_approved = D(totals.totalAcquirerApproved) / 100
-        order.total_captured = D(totals.totalCaptured) / 100
-        order.total_refunded = D(totals.totalRefunded) / 100
-        order.total_charged_back = D(totals.totalChargedback) / 100
-
-        if hasattr(report, 'payment'):
+        totals = report.totals
+        order.total_registered = _to_decimal(totals.total_registered)
+        order.total_shopper_pending = _to_decimal(totals.total_shopper_pending)
+        order.total_acquirer_pending = _to_decimal(totals.total_acquirer_pending)
+        order.total_acquirer_approved = _to_decimal(totals.total_acquirer_approved)
+        order.total_captured = _to_decimal(totals.total_captured)
+        order.total_refunded = _to_decimal(totals.total_refunded)
+        order.total_charged_back = _to_decimal(totals.total_charged_back)
+
+        if report.payments:
             # Store all report lines, make an analytics of the new status
             new_status, ddpayments = self._store_report_lines(order, report)
         else:
@@ -204,12 +301,12 @@ class Interface(object):
             # doesn't actually return a global "payment cluster" status code.
             # There are only status codes for the payment (which corresponds with a payment attempts by the user).
             # Make our best efforts here, based on some heuristics of the approximateTotals field.
-            if totals.totalShopperPending == 0 \
-                    and totals.totalAcquirerPending == 0 \
-                    and totals.totalAcquirerApproved == 0 \
-                    and totals.totalCaptured == 0 \
-                    and totals.totalRefunded == 0 \
-                    and totals.totalChargedback == 0:
+            if totals.total_shopper_pending == 0 \
+                    and totals.total_acquirer_pending == 0 \
+                    and totals.total_acquirer_approved == 0 \
+                    and totals.total_captured == 0 \
+                    and totals.total_refunded == 0 \
+                    and totals.total_charged_back == 0:
                 # Everything is 0, either started, cancelled or expired
                 if order.status == DocdataOrder.STATUS_CANCELLED:
                     new_status = order.status  # Stay in cancelled, don't become expired
@@ -235,7 +332,10 @@ class Interface(object):
         # Store status
         old_status = order.status
         status_changed = self._set_status(order, new_status)
-        order.save()
+        order.report_fingerprint = fingerprint
+        order.version += 1
+        with track_monthly_totals(order):
+            order.save()
 
         if status_changed:
             self.order_status_changed(order, old_status, order.status)
@@ -267,123 +367,92 @@ class Interface(object):
         This line either indicates the payment is authorized, cancelled, refunded, etc..
 
         :type order: DocdataOrder
+        :type report: oscar_docdata.reports.StatusReport
         """
         new_status = None
         ddpayment_objects = []
-        totals = report.approximateTotals
+        totals = report.totals
 
         logger.info("Payment cluster {0} Total Registered: {1} Total Captured: {2} Total Chargedback: {3} Total Refunded: {4}".format(
-            order.order_key, totals.totalRegistered, totals.totalCaptured, totals.totalChargedback, totals.totalRefunded
+            order.order_key, totals.total_registered, totals.total_captured, totals.total_charged_back, totals.total_refunded
         ))
 
         # Webservice doesn't return payments in the correct order (or reversed).
         # So far, the payments can only be sorted by ID.
-        report_payments = list(report.payment)
-        report_payments.sort(key=lambda payments: payments.id)
-
-        for payment in report_payments:
-            # payment_report is a ns0:payment object, which contains:
-            # - id            (paymentId, a positiveInteger)
-            # - paymentMethod (string50)
-            # - authorization  (authorization)
-            #   - status      str
-            #   - amount      (amount); value + currency attribute.
-            #   - confidenceLevel  (string35)
-            #   - capture     (capture); status, amount, reason
-            #   - refund      (refund); status, amount, reason
-            #   - chargeback  (chargeback); status, amount, reason
-            # - extended      payment specific information, depends on payment method.
-
-            logger.debug("- Payment {0} with {1}: auth status: {2}".format(payment.id, payment.paymentMethod, payment.authorization.status))
+        report_payments = sorted(report.payments, key=lambda payment: payment.id)
+
+        # Saving might happen concurrently: the user returns to the OrderReturnView
+        # and Docdata calls the StatusChangedNotificationView at the same time.
+        # New payment lines can't be locked as their rows don't exist yet, so lock the order first.
+        # This serializes both requests, hence only one of them inserts the new payment lines.
+        with transaction.atomic():
+            list(DocdataOrder.objects.select_for_update().filter(pk=order.pk).values_list('pk', flat=True))
+            existing = {
+                ddpayment.payment_id: ddpayment
+                for ddpayment in DocdataPayment.objects.select_for_update().filter(payment_id__in=[p.id for p in report_payments])
+            }
+            added_objects = []
+            updated_fields = {}
+            events = []
+
+            for payment in report_payments:
+                # payment is a PaymentReport object, which contains:
+                # - id              (paymentId, a positiveInteger)
+                # - payment_method  (string50)
+                # - authorization   (Authorization)
+                #   - status            str
+                #   - amount, currency  amount in cents.
+                #   - confidence_level  (string35)
+                #   - captures          (Transaction); status, amount, currency, reason
+                #   - refunds           (Transaction); status, amount, currency, reason
+                #   - chargebacks       (Transaction); status, amount, currency, reason
+
+                logger.debug("- Payment {0} with {1}: auth status: {2}".format(payment.id, payment.payment_method, payment.authorization.status))
+
+                authorization = payment.authorization
+                auth_status = authorization.status
+
+                if auth_status == 'AUTHORIZED':
+                    # The payment was authorized, check what the contents of it is.
+                    # This validates the status, and determines which amount got paid.
+                    maybe_new_status = self._process_authorized_payment(order, report, payment)
+                    if maybe_new_status is not None:
+                        new_status = maybe_new_status
+
+                    # NOTE: currencies ignored here.
+                    # This only indicates the amount that's being dealt with.
+                    # the actual debited value is added when the value is captured.
+                    amount_allocated = _to_decimal(authorization.amount)
+                else:
+                    amount_allocated = 0
 
-            authorization = payment.authorization
-            auth_status = str(payment.authorization.status)
-
-            if auth_status == 'AUTHORIZED':
-                # The payment was authorized, check what the contents of it is.
-                # This validates the status, and determines which amount got paid.
-                maybe_new_status = self._process_authorized_payment(order, report, payment)
-                if maybe_new_status is not None:
-                    new_status = maybe_new_status
-
-                # NOTE: currencies ignored here.
-                # This only indicates the amount that's being dealt with.
-                # the actual debited value is added when the value is captured.
-                amount_allocated = _to_decimal(authorization.amount)
-            else:
-                amount_allocated = 0
+                # Now update the DocdataPayment object of the current report line.
+                ddpayment = existing.get(payment.id)
+                added = ddpayment is None
+                if added:
+                    ddpayment = DocdataPayment(payment_id=payment.id, docdata_order=order, payment_method=payment.payment_method)
+                    existing[payment.id] = ddpayment
 
-            # Now save the result into a DocdataPayment object.
-            # Find or create the correct payment object for current report.
-            updated = False
-            added = False
+                changed_fields = self._update_payment_fields(ddpayment, payment, amount_allocated)
 
-            with transaction.atomic():
-                ddpayment, added = DocdataPayment.objects.select_for_update().get_or_create(
-                    payment_id=str(payment.id),
-                    defaults={
-                        'docdata_order': order,
-                        'payment_method': str(payment.paymentMethod)
-                    }
-                )
+                if added:
+                    added_objects.append(ddpayment)
+                    events.append((payment_added, ddpayment))
+                elif changed_fields:
+                    updated_fields.setdefault(tuple(changed_fields), []).append(ddpayment)
+                    events.append((payment_updated, ddpayment))
 
-                if not payment.paymentMethod == ddpayment.payment_method:
-                    # Payment method change??
-                    logger.warn(
-                        "Payment method from Docdata doesn't match saved payment method. "
-                        "Storing the payment method received from Docdata for payment id {0}: {1}".format(
-                            ddpayment.payment_id, payment.paymentMethod
-                        )
-                    )
-                    ddpayment.payment_method = str(payment.paymentMethod)
-                    updated = True
-
-                # Store the totals
-                old_values = (ddpayment.confidence_level, ddpayment.amount_allocated, ddpayment.amount_chargeback, ddpayment.amount_refunded, ddpayment.amount_debited)
-
-                ddpayment.confidence_level = authorization.confidenceLevel
-                ddpayment.amount_allocated = amount_allocated
-                ddpayment.amount_debited = self._get_payment_sum(payment, "capture", "CAPTURED")
-                ddpayment.amount_refunded = self._get_payment_sum(payment, "refund", "CAPTURED")
-                ddpayment.amount_chargeback = self._get_payment_sum(payment, "chargeback", "CHARGED")
-
-                # Track changes
-                new_values = (ddpayment.confidence_level, ddpayment.amount_allocated, ddpayment.amount_chargeback, ddpayment.amount_refunded, ddpayment.amount_debited)
-                if old_values != new_values:
-                    updated = True
-
-                # Detect status change
-
-                if ddpayment.status != auth_status:
-                    # Status change!
-                    logger.info("Docdata payment status changed. payment={0} status: {1} -> {2}".format(
-                        payment.id, ddpayment.status, auth_status
-                    ))
-
-                    if auth_status not in DocdataClient.DOCUMENTED_STATUS_VALUES \
-                            and auth_status not in DocdataClient.SEEN_UNDOCUMENTED_STATUS_VALUES:
-                        # Note: We continue to process the payment status change on this error.
-                        logger.warn("Received unknown payment status from Docdata. payment={0}, status={1}".format(
-                            payment.id, auth_status
-                        ))
+                ddpayment_objects.append(ddpayment)
 
-                    ddpayment.status = auth_status
-                    updated = True
-
-                if added or updated:
-                    # Saving might happen concurrently, as the user returns to the OrderReturnView
-                    # and Docdata calls the StatusChangedNotificationView at the same time.
-                    # that's why we locked the ddpayment
-                    ddpayment.save()
-                    # Fire events so payment transactions can be created in Oscar.
-                    # This can be used to call source.transactions.create(..) for example.
-                    if added:
-                        payment_added.send(sender=DocdataPayment, order=order, payment=ddpayment)
-                    else:
-                        payment_updated.send(sender=DocdataPayment, order=order, payment=ddpayment)
+            if added_objects:
+                DocdataPayment.objects.bulk_create(added_objects)
+            for fields, ddpayments in updated_fields.items():
+                _bulk_update(ddpayments, fields)
 
-                ddpayment_objects.append(ddpayment)
-                setattr(ddpayment, '_source', payment)
+            # Fire events so payment transactions can be created in Oscar.
+            # This can be used to call source.transactions.create(..) for example.
+            for signal, ddpayment in events:
+                signal.send(sender=DocdataPayment, order=order, payment=ddpayment)
 
         # endor
         if new_status is None:
@@ -406,7 +475,7 @@ class Interface(object):
                 new_status = order.status
 
         # Detect a nasty error condition that needs to be manually fixed.
-        total_registered = int(totals.totalRegistered)
+        total_registered = totals.total_registered
         total_gross_cents = int(order.total_gross_amount * 100)
         if new_status != DocdataOrder.STATUS_CANCELLED and total_registered != total_gross_cents:
             logger.error(
@@ -419,19 +488,70 @@ class Interface(object):
         ddpayment_objects.sort(key=lambda ddpayment: ddpayment.payment_id)
         return new_status, ddpayment_objects
 
-    def _get_payment_sum(self, payment, xml_tag, success_status):
+    def _update_payment_fields(self, ddpayment, payment, amount_allocated):
+        """
+        Update the DocdataPayment object with the report line.
+
+        :type ddpayment: DocdataPayment
+        :type payment: oscar_docdata.reports.PaymentReport
+        :returns: The names of the changed fields.
+        :rtype: list[str]
+        """
+        authorization = payment.authorization
+        auth_status = authorization.status
+
+        if not payment.payment_method == ddpayment.payment_method:
+            # Payment method change??
+            logger.warn(
+                "Payment method from Docdata doesn't match saved payment method. "
+                "Storing the payment method received from Docdata for payment id {0}: {1}".format(
+                    ddpayment.payment_id, payment.payment_method
+                )
+            )
+
+        if ddpayment.status != auth_status:
+            # Status change!
+            logger.info("Docdata payment status changed. payment={0} status: {1} -> {2}".format(
+                payment.id, ddpayment.status, auth_status
+            ))
+
+            if auth_status not in DocdataClient.DOCUMENTED_STATUS_VALUES \
+                    and auth_status not in DocdataClient.SEEN_UNDOCUMENTED_STATUS_VALUES:
+                # Note: We continue to process the payment status change on this error.
+                logger.warn("Received unknown payment status from Docdata. payment={0}, status={1}".format(
+                    payment.id, auth_status
+                ))
+
+        # Store the totals
+        new_values = (
+            ('payment_method', payment.payment_method),
+            ('status', auth_status),
+            ('confidence_level', authorization.confidence_level),
+            ('amount_allocated', amount_allocated),
+            ('amount_debited', self._get_payment_sum(payment, "captures", "CAPTURED")),
+            ('amount_refunded', self._get_payment_sum(payment, "refunds", "CAPTURED")),
+            ('amount_chargeback', self._get_payment_sum(payment, "chargebacks", "CHARGED")),
+        )
+
+        # Track changes
+        changed_fields = []
+        for name, value in new_values:
+            if getattr(ddpayment, name) != value:
+                setattr(ddpayment, name, value)
+                changed_fields.append(name)
+        return changed_fields
+
+    def _get_payment_sum(self, payment, field, success_status):
         """
-        Take the sum of multiple <capture>, <refund> or <chargeback> elements.
+        Take the sum of multiple captures, refunds or chargebacks.
         """
         amount = D("0.00")
-        authorization = payment.authorization
-        if hasattr(authorization, xml_tag):
-            # There was some income/refund/chargeback
-            for tag in getattr(authorization, xml_tag):
-                if tag.status == success_status:
-                    amount += _to_decimal(tag.amount)
-                else:
-                    logger.debug("{0} of {1} is marked as {2}, not adding to totals".format(tag.__class__.__name__.title(), payment.id, tag.status))
+        # There was some income/refund/chargeback
+        for item in getattr(payment.authorization, field):
+            if item.status == success_status:
+                amount += _to_decimal(item.amount)
+            else:
+                logger.debug("{0} of {1} is marked as {2}, not adding to totals".format(field.title(), payment.id, item.status))
 
         return amount
 
@@ -447,7 +567,7 @@ class Interface(object):
         :type order: DocdataOrder
         :rtype: str|None
         """
-        totals = report.approximateTotals
+        totals = report.totals
         new_status = None
 
         # Because currency conversions may cause payments to happen with a few cents less,
@@ -455,13 +575,13 @@ class Interface(object):
         # If you don't like this, the alternative is using DOCDATA_PAYMENT_SUCCESS_MARGIN = {}
         # and listening for the callback=SUCCESS value in the `return_view_called` signal.
         margin = 0
-        if order.currency == totals._exchangedTo:  # Reads XML attribute.
-            if any(p.authorization.amount._currency != order.currency for p in report.payment):
+        if order.currency == totals.exchanged_to:
+            if any(p.authorization.currency != order.currency for p in report.payments):
                 # Order has a currency conversion, apply the margin
-                margin = appsettings.DOCDATA_PAYMENT_SUCCESS_MARGIN.get(totals._exchangedTo, 0)
+                margin = appsettings.DOCDATA_PAYMENT_SUCCESS_MARGIN.get(totals.exchanged_to, 0)
 
                 # But if it exceeds the totalRegistered (e.g. it's 0), avoid making everything as paid!
-                if margin >= totals.totalRegistered:
+                if margin >= totals.total_registered:
                     margin = 0
 
         # Integration Manual Order API 1.0 - Document version 1.0, 08-12-2012 - Page 33:
@@ -472,19 +592,19 @@ class Interface(object):
         # long time for acquirers or shoppers to actually have the money transferred and it can be
         # captured.
         #
-        if totals.totalCaptured < (totals.totalRegistered - margin):
+        if totals.total_captured < (totals.total_registered - margin):
             return None
 
         # The single payment indicated there is a payment.
         # Now comparing the totals, to see whether the order was fully paid!
-        payment_sum = (totals.totalCaptured - totals.totalChargedback - totals.totalRefunded)
+        payment_sum = (totals.total_captured - totals.total_charged_back - totals.total_refunded)
 
-        if payment_sum >= (totals.totalRegistered - margin):
+        if payment_sum >= (totals.total_registered - margin):
             # With all capture changes etc.. it's still what was registered.
             # Full amount is paid.
             new_status = DocdataOrder.STATUS_PAID
             logger.info("Payment cluster {0} Total Registered: {1} >= Captured: {2} (margin: {3}); new status PAID".format(
-                order.order_key, totals.totalRegistered, totals.totalCaptured, margin
+                order.order_key, totals.total_registered, totals.total_captured, margin
             ))
 
         elif payment_sum == 0:
@@ -519,12 +639,12 @@ class Interface(object):
 
             # Chargeback.
             # TODO: Add chargeback fee somehow (currently E0.50).
-            if totals.totalCaptured == totals.totalChargedback:
-                if hasattr(authorization, 'chargeback') and len(authorization.chargeback) > 0:
-                    for chargeback in authorization.chargeback:
-                        reason = getattr(chargeback, 'reason', '(reason not provided)')
+            if totals.total_captured == totals.total_charged_back:
+                if authorization.chargebacks:
+                    for chargeback in authorization.chargebacks:
+                        reason = chargeback.reason or '(reason not provided)'
                         logger.info("- Payment {0} chargedback: {1} {2}, {3}".format(
-                            payment.id, chargeback.amount._currency, chargeback.amount.value, reason
+                            payment.id, chargeback.currency, chargeback.amount, reason
                         ))
                 else:
                     logger.info("Payment cluster {0} chargedback.".format(order.order_key))
@@ -533,7 +653,7 @@ class Interface(object):
 
             # Refund.
             # TODO: Log more info from refund when we have an example.
-            if totals.totalCaptured == totals.totalRefunded:
+            if totals.total_captured == totals.total_refunded:
                 logger.info("Payment cluster {0} refunded.".format(order.order_key))
                 new_status = DocdataOrder.STATUS_REFUNDED
         elif payment_sum > 0:
@@ -541,7 +661,7 @@ class Interface(object):
             new_status = DocdataOrder.STATUS_PAID_REFUNDED
 
             logger.info("Payment cluster {0} Total Registered: {1} < Captured: {2} - Refunded: {3} - Chargeback: {4}  (margin: {5}); new status PAID_REFUNDED".format(
-                order.order_key, totals.totalRegistered, totals.totalCaptured, totals.totalRefunded, totals.totalChargedback, margin
+                order.order_key, totals.total_registered, totals.total_captured, totals.total_refunded, totals.total_charged_back, margin
             ))
 
         else:
@@ -567,6 +687,20 @@ class Interface(object):
         order_status_changed.send(sender=DocdataOrder, order=docdataorder, old_status=old_status, new_status=new_status)
 
 
-def _to_decimal(amount):
-    # Convert XML amount to decimal
-    return D(int(amount.value)) / 100
+def _bulk_update(ddpayments, fields):
+    # Update the changed fields of multiple DocdataPayment objects.
+    fields = list(fields) + ['updated']
+    if hasattr(DocdataPayment.objects, 'bulk_update'):
+        updated = now()
+        for ddpayment in ddpayments:
+            ddpayment.updated = updated  # bulk_update() doesn't handle auto_now
+        DocdataPayment.objects.bulk_update(ddpayments, fields)
+    else:
+        # Django < 2.2
+        for ddpayment in ddpayments:
+            ddpayment.save(update_fields=fields)
+
+
+def _to_decimal(cents):
+    # Convert the amount in cents to decimal
+    return D(cents) / 100
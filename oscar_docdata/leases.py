@@ -0,0 +1,92 @@
+"""
+Claiming of orders, so the management commands can run on multiple hosts at the same time.
+
+A command claims a batch of orders by storing a lease (an owner and expiry time) on the rows.
+Other processes skip the claimed orders until the lease is released or expired,
+e.g. when the process holding the lease crashed.
+
+On PostgreSQL (and other databases which support it) the free rows are selected with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent processes never wait for each other.
+On other databases, the conditional ``UPDATE`` makes sure an order is only claimed by one process.
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from oscar_docdata import appsettings
+from oscar_docdata.models import DocdataOrder
+
+__all__ = (
+    'get_lease_owner',
+    'claim_orders',
+    'renew_leases',
+    'release_leases',
+)
+
+
+def get_lease_owner():
+    """
+    Return a unique name for the leases of this process.
+    """
+    return u"{0}:{1}:{2}".format(socket.gethostname()[:30], os.getpid(), uuid.uuid4().hex[:12])
+
+
+def _free(current_time):
+    return Q(lease_expires__isnull=True) | Q(lease_expires__lte=current_time)
+
+
+def claim_orders(queryset, owner, limit=None, duration=None):
+    """
+    Claim the orders of the queryset which are not claimed by another process.
+
+    :param queryset: The orders to claim.
+    :param owner: The name of the lease owner, see :func:`get_lease_owner`.
+    :param limit: The maximum number of orders to claim.
+    :param duration: The seconds before the lease expires, defaults to ``DOCDATA_LEASE_DURATION``.
+    :returns: The IDs of the claimed orders.
+    :rtype: list[int]
+    """
+    if duration is None:
+        duration = appsettings.DOCDATA_LEASE_DURATION
+
+    current_time = now()
+    expires = current_time + timedelta(seconds=duration)
+    db = router.db_for_write(DocdataOrder)
+    with transaction.atomic(using=db):
+        candidates = queryset.using(db).filter(_free(current_time)).order_by('pk')
+        if connections[db].features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+
+        order_ids = list(candidates.values_list('pk', flat=True)[:limit])
+        if not order_ids:
+            return []
+
+        # Without SKIP LOCKED, another process could have selected the same rows,
+        # the conditional update only claims the rows which are still free.
+        DocdataOrder.objects.using(db).filter(_free(current_time), pk__in=order_ids) \
+            .update(lease_owner=owner, lease_expires=expires)
+
+    return list(DocdataOrder.objects.using(db).filter(pk__in=order_ids, lease_owner=owner, lease_expires=expires).values_list('pk', flat=True))
+
+
+def renew_leases(order_ids, owner, duration=None):
+    """
+    Extend the leases of orders that take longer to process.
+    """
+    if duration is None:
+        duration = appsettings.DOCDATA_LEASE_DURATION
+    expires = now() + timedelta(seconds=duration)
+    DocdataOrder.objects.filter(pk__in=order_ids, lease_owner=owner).update(lease_expires=expires)
+
+
+def release_leases(order_ids, owner, **fields):
+    """
+    Release the claimed orders, so other processes can claim them.
+    Extra fields can be updated in the same query.
+    """
+    DocdataOrder.objects.filter(pk__in=order_ids, lease_owner=owner).update(lease_owner='', lease_expires=None, **fields)
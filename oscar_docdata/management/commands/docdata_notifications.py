@@ -0,0 +1,53 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from oscar_docdata import appsettings
+from oscar_docdata.notifications import NotificationWorker
+
+
+class Command(BaseCommand):
+    help = "Process the queued status changed notifications (see DOCDATA_QUEUE_NOTIFICATIONS)"
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+
+        parser.add_argument(
+            "--workers", action="store", dest="workers", type=int, default=1,
+            help="The number of notifications to process concurrently"
+        )
+        parser.add_argument(
+            "--max-attempts", action="store", dest="max_attempts", type=int, default=None,
+            help="The number of attempts for a failing notification (default: DOCDATA_NOTIFICATION_MAX_ATTEMPTS)"
+        )
+        parser.add_argument(
+            "--interval", action="store", dest="interval", type=float, default=None,
+            help="Keep running, and check the queue every given number of seconds"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Process the queue.
+        """
+        workers = options['workers']
+        interval = options['interval']
+        if workers < 1:
+            raise CommandError("The number of --workers should be at least 1")
+        if not appsettings.DOCDATA_QUEUE_NOTIFICATIONS:
+            self.stderr.write(u"Note: the DOCDATA_QUEUE_NOTIFICATIONS setting is disabled, no new notifications are queued.")
+
+        # At -v2 SOAP requests are outputted.
+        verbosity = int(options['verbosity'])
+        logging.getLogger('oscar_docdata.interface').setLevel('WARNING' if verbosity < 2 else 'DEBUG')
+        logging.getLogger('suds.transport').setLevel('INFO' if verbosity < 3 else 'DEBUG')
+
+        worker = NotificationWorker(max_attempts=options['max_attempts'])
+        while True:
+            processed, failed = worker.drain(workers=workers)
+            if processed or failed or verbosity >= 2:
+                self.stdout.write(u"Processed {0} notifications, {1} failed.".format(processed, failed))
+
+            if interval is None:
+                break
+            time.sleep(interval)
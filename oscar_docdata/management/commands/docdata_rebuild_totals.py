@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from oscar_docdata import appsettings
+from oscar_docdata.monthly_totals import rebuild_monthly_totals
+
+
+class Command(BaseCommand):
+    help = "Recalculate the monthly totals of the orders (see DOCDATA_MONTHLY_TOTALS)"
+
+    def handle(self, *args, **options):
+        """
+        Rebuild the totals.
+        """
+        if not appsettings.DOCDATA_MONTHLY_TOTALS:
+            self.stderr.write(u"Note: the DOCDATA_MONTHLY_TOTALS setting is disabled, the totals are not kept up to date.")
+
+        count = rebuild_monthly_totals()
+        self.stdout.write(u"Stored {0} monthly totals.".format(count))
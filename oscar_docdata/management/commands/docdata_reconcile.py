@@ -0,0 +1,69 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from oscar_docdata.reconcile import Reconciler
+
+
+class Command(BaseCommand):
+    help = "Keep checking the status of the open orders, to catch missed status changed notifications"
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+
+        parser.add_argument(
+            "--workers", action="store", dest="workers", type=int, default=4,
+            help="The number of orders to check concurrently"
+        )
+        parser.add_argument(
+            "--min-interval", action="store", dest="min_interval", type=int, default=None,
+            help="The age in seconds of the first check (default: DOCDATA_RECONCILE_MIN_INTERVAL)"
+        )
+        parser.add_argument(
+            "--max-interval", action="store", dest="max_interval", type=int, default=None,
+            help="The maximum seconds between two checks (default: DOCDATA_RECONCILE_MAX_INTERVAL)"
+        )
+        parser.add_argument(
+            "--refresh", action="store", dest="refresh", type=int, default=60,
+            help="The seconds between looking for new orders"
+        )
+        parser.add_argument(
+            "--once", action="store_true", dest="once", default=False,
+            help="Only check the orders which are due now, and exit"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Run the reconciler.
+        """
+        if options['workers'] < 1:
+            raise CommandError("The number of --workers should be at least 1")
+
+        # At -v2 SOAP requests are outputted.
+        verbosity = int(options['verbosity'])
+        logging.getLogger('oscar_docdata.interface').setLevel('WARNING' if verbosity < 2 else 'DEBUG')
+        logging.getLogger('suds.transport').setLevel('INFO' if verbosity < 3 else 'DEBUG')
+
+        reconciler = Reconciler(
+            workers=options['workers'],
+            min_interval=options['min_interval'],
+            max_interval=options['max_interval'],
+            refresh_interval=options['refresh'],
+        )
+
+        if options['once']:
+            count = reconciler.run_once()
+            self.stdout.write(u"Checked {0} orders, {1} orders are scheduled.".format(count, len(reconciler.schedule)))
+            return
+
+        def _stop(signum, frame):
+            self.stdout.write(u"Stopping, waiting for the running checks to finish...")
+            reconciler.stop()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        self.stdout.write(u"Reconciling orders with {0} workers.".format(options['workers']))
+        reconciler.run()
+        self.stdout.write(u"Stopped.")
@@ -1,11 +1,26 @@
-from datetime import datetime
+import csv
+import json
+from datetime import datetime, time, timedelta
 
 from django.core.management import BaseCommand
 from django.core.management.base import CommandError
-from django.db.models import Sum
-from django.utils.timezone import get_current_timezone, now
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date
+from django.utils.timezone import get_current_timezone, make_aware
 
-from oscar_docdata.models import DocdataOrder
+from oscar_docdata import appsettings
+from oscar_docdata.models import DocdataMonthlyTotal, DocdataOrder
+
+#: The columns of the CSV and JSON output.
+FIELDS = ('month', 'currency', 'status', 'registered', 'captured', 'difference', 'refunded', 'charged_back')
+
+
+def _date(value):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError("Invalid date, use the YYYY-MM-DD format")
+    return date
 
 
 class Command(BaseCommand):
@@ -15,70 +30,165 @@ class Command(BaseCommand):
         super(Command, self).add_arguments(parser)
 
         parser.add_argument(
-            "-s", "--status", action="store", dest="status", default="", help="Which status to use, defaults to 'paid'"
+            "-s", "--status", action="store", dest="status", default="", help="Only report the orders with this status"
+        )
+        parser.add_argument(
+            "--from", action="store", dest="from_date", type=_date, default=None,
+            help="Only report the orders created on or after this date (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            "--to", action="store", dest="to_date", type=_date, default=None,
+            help="Only report the orders created on or before this date (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            "--from-orders", action="store_true", dest="from_orders", default=False,
+            help="Calculate the totals from the orders, instead of the DOCDATA_MONTHLY_TOTALS table"
+        )
+        parser.add_argument(
+            "--format", action="store", dest="format", choices=('table', 'csv', 'json'), default='table',
+            help="The output format, defaults to 'table'"
         )
 
     def handle(self, *args, **options):
         """
-        Update the status.
+        Show the report.
         """
-        status = options.get('status', DocdataOrder.STATUS_PAID)
+        status = options.get('status')
         all_status_choices = dict(DocdataOrder.STATUS_CHOICES).keys()
         if status and status not in all_status_choices:
             raise CommandError("Invalid status, valid choices are: {0}".format(", ".join(sorted(all_status_choices))))
 
-        base_qs = DocdataOrder.objects.current_merchant()
-
-        try:
-            start_date = base_qs.values_list('created', flat=True).order_by('created')[0]
-        except IndexError:
-            self.stdout.write("No orders available")
-            return
-
-        currencies = list(base_qs.values_list('currency', flat=True).order_by('currency').distinct())
+        from_date = options['from_date']
+        to_date = options['to_date']
+        if from_date and to_date and from_date > to_date:
+            raise CommandError("The --from date should be before the --to date")
+
+        if not options['from_orders'] and self.can_use_monthly_totals(from_date, to_date):
+            rows = self.get_monthly_total_rows(status=status, from_date=from_date, to_date=to_date)
+        else:
+            rows = self.get_rows(status=status, from_date=from_date, to_date=to_date)
+        if options['format'] == 'csv':
+            self.write_csv(rows)
+        elif options['format'] == 'json':
+            self.write_json(rows)
+        else:
+            self.write_table(rows)
+
+    def get_queryset(self, status=None, from_date=None, to_date=None):
+        """
+        Return the orders to report.
+        """
+        qs = DocdataOrder.objects.current_merchant()
+        if status:
+            qs = qs.filter(status=status)
 
+        # Filter on the datetime field, so the database can use the index on the created date.
         tzinfo = get_current_timezone()
-        cur_date = datetime(start_date.year, start_date.month, 1, tzinfo=tzinfo)
-        end_date = now()
+        if from_date:
+            qs = qs.filter(created__gte=make_aware(datetime.combine(from_date, time.min), tzinfo))
+        if to_date:
+            qs = qs.filter(created__lt=make_aware(datetime.combine(to_date + timedelta(days=1), time.min), tzinfo))
+        return qs
+
+    def get_rows(self, status=None, from_date=None, to_date=None):
+        """
+        Return the totals per month, currency and status, all calculated by a single query.
+        """
+        qs = self.get_queryset(status=status, from_date=from_date, to_date=to_date)
+        qs = qs.annotate(month=TruncMonth('created')).values('month', 'currency', 'status').annotate(
+            registered=Sum('total_registered'),
+            captured=Sum('total_captured'),
+            refunded=Sum('total_refunded'),
+            charged_back=Sum('total_charged_back'),
+        ).order_by('month', 'currency', 'status')
+
+        for totals in qs.iterator():
+            yield self._get_row(totals)
+
+    def can_use_monthly_totals(self, from_date=None, to_date=None):
+        """
+        Tell whether the report can be read from the monthly totals, which requires whole months.
+        """
+        return appsettings.DOCDATA_MONTHLY_TOTALS \
+            and (from_date is None or from_date.day == 1) \
+            and (to_date is None or (to_date + timedelta(days=1)).day == 1)
 
-        col_style = "| {0:8} | {1:3} | {2:12} | {3:12} | {4:12} | {5:12} | {6:12} |"
-        header = col_style.format("Month", "Cur", "Registrered", "Captured", "Difference", "Refunded", "Charged back")
+    def get_monthly_total_rows(self, status=None, from_date=None, to_date=None):
+        """
+        Return the totals per month, currency and status from the ``DOCDATA_MONTHLY_TOTALS`` table.
+        """
+        qs = DocdataMonthlyTotal.objects.filter(merchant_name=appsettings.DOCDATA_MERCHANT_NAME, order_count__gt=0)
+        if status:
+            qs = qs.filter(status=status)
+        if from_date:
+            qs = qs.filter(month__gte=from_date)
+        if to_date:
+            qs = qs.filter(month__lte=to_date)
+
+        qs = qs.values(
+            'month', 'currency', 'status',
+            registered=F('total_registered'),
+            captured=F('total_captured'),
+            refunded=F('total_refunded'),
+            charged_back=F('total_charged_back'),
+        ).order_by('month', 'currency', 'status')
+
+        for totals in qs.iterator():
+            yield self._get_row(totals)
+
+    def _get_row(self, totals):
+        registered = totals['registered'] or 0
+        captured = totals['captured'] or 0
+        return {
+            'month': u"{0:%Y-%m}".format(totals['month']),
+            'currency': totals['currency'],
+            'status': totals['status'],
+            'registered': registered,
+            'captured': captured,
+            'difference': captured - registered,
+            'refunded': totals['refunded'] or 0,
+            'charged_back': totals['charged_back'] or 0,
+        }
+
+    def write_table(self, rows):
+        col_style = "| {0:8} | {1:3} | {2:13} | {3:12} | {4:12} | {5:12} | {6:12} | {7:12} |"
+        header = col_style.format("Month", "Cur", "Status", "Registered", "Captured", "Difference", "Refunded", "Charged back")
         sep = '-' * len(header)
         self.stdout.write(sep)
         self.stdout.write(header)
         self.stdout.write(sep)
 
-        next_date = None
-
-        while cur_date < end_date:
-            if next_date and len(currencies) > 1:
-                self.stdout.write(col_style.format('', '', '', '', '', '', ''))
-
-            if cur_date.month == 12:
-                next_date = datetime(cur_date.year + 1, 1, 1, tzinfo=tzinfo)
-            else:
-                next_date = datetime(cur_date.year, cur_date.month + 1, 1, tzinfo=tzinfo)
-
-            qs = base_qs.filter(created__range=(cur_date, next_date))
-            if status:
-                qs = qs.filter(status=status)
-
-            for currency in currencies:
-                totals = qs.filter(currency=currency).aggregate(
-                    cap=Sum('total_captured'),
-                    reg=Sum('total_registered'),
-                    ref=Sum('total_refunded'),
-                    cb=Sum('total_charged_back'),
-                )
-
-                self.stdout.write(col_style.format(
-                    "{0}-{1:02d}".format(cur_date.year, cur_date.month),
-                    currency,
-                    totals['cap'] or 0,
-                    totals['reg'] or 0,
-                    (totals['cap'] or 0) - (totals['reg'] or 0) or '',
-                    totals['ref'] or 0,
-                    totals['cb'] or 0,
-                ))
-
-            cur_date = next_date
+        last_month = None
+        for row in rows:
+            if last_month and row['month'] != last_month:
+                self.stdout.write(col_style.format('', '', '', '', '', '', '', ''))
+            last_month = row['month']
+
+            self.stdout.write(col_style.format(
+                row['month'],
+                row['currency'],
+                row['status'],
+                row['registered'],
+                row['captured'],
+                row['difference'] or '',
+                row['refunded'],
+                row['charged_back'],
+            ))
+
+        if last_month is None:
+            self.stdout.write("No orders available")
+
+    def write_csv(self, rows):
+        writer = csv.writer(self.stdout, lineterminator='\n')
+        writer.writerow(FIELDS)
+        for row in rows:
+            writer.writerow([row[field] for field in FIELDS])
+
+    def write_json(self, rows):
+        # Written row by row, so large reports are not kept in memory.
+        self.stdout.write("[", ending='')
+        prefix = "\n"
+        for row in rows:
+            self.stdout.write(prefix + json.dumps(row, default=str, sort_keys=True), ending='')
+            prefix = ",\n"
+        self.stdout.write("\n]")
@@ -0,0 +1,76 @@
+import logging
+
+import suds.transport
+from django.core.management.base import BaseCommand, CommandError
+from six.moves.urllib.error import URLError
+
+from oscar_docdata import appsettings
+from oscar_docdata.gateway import create_suds_client, get_wsdl_url
+from oscar_docdata.wsdl_cache import get_wsdl_cache
+
+
+class Command(BaseCommand):
+    help = "Fetch the Docdata WSDL and store the parsed definitions in the DOCDATA_WSDL_CACHE_DIR"
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+
+        parser.add_argument(
+            "--testing", action="store_true", dest="testing", default=False, help="Build the cache for the testing environment"
+        )
+        parser.add_argument(
+            "--live", action="store_true", dest="live", default=False, help="Build the cache for the live environment"
+        )
+        parser.add_argument(
+            "--clear", action="store_true", dest="clear", default=False, help="Only remove the cached definitions"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Build the WSDL cache.
+        """
+        wsdl_cache = get_wsdl_cache()
+        if wsdl_cache is None:
+            raise CommandError("The DOCDATA_WSDL_CACHE_DIR setting is not configured.")
+
+        # At -v2 the fetched documents are outputted.
+        verbosity = int(options['verbosity'])
+        logging.getLogger('suds.transport').setLevel('INFO' if verbosity < 2 else 'DEBUG')
+
+        # Default to the mode of the DOCDATA_TESTING setting.
+        modes = []
+        if options['testing']:
+            modes.append(True)
+        if options['live']:
+            modes.append(False)
+        if not modes:
+            modes.append(appsettings.DOCDATA_TESTING)
+
+        for testing_mode in modes:
+            url = get_wsdl_url(testing_mode)
+            old_stamp = wsdl_cache.get_stamp(url)
+
+            if options['clear']:
+                wsdl_cache.purge_url(url)
+                self.stdout.write(u"Removed cached definitions of {0}".format(url))
+                continue
+
+            # Fetch the remote WSDL, and replace the existing entry.
+            # Using a new cache object, so the content hash is calculated for this URL only.
+            # Running processes keep using the existing entry until it's replaced.
+            url_cache = get_wsdl_cache(refresh=True)
+            try:
+                create_suds_client(url, wsdl_cache=url_cache)
+            except (URLError, suds.transport.TransportError) as e:
+                raise CommandError(u"Failed to fetch {0}: {1}".format(url, e))
+
+            new_stamp = url_cache.get_stamp(url)
+            if new_stamp is None:
+                raise CommandError(u"Failed to store the definitions of {0} in {1}".format(url, url_cache.location))
+
+            if old_stamp is None:
+                self.stdout.write(u"Cached {0} (hash {1})".format(url, new_stamp['content_hash']))
+            elif old_stamp.get('content_hash') != new_stamp['content_hash']:
+                self.stdout.write(u"Updated {0}, contents changed (hash {1})".format(url, new_stamp['content_hash']))
+            else:
+                self.stdout.write(u"Refreshed {0}, contents unchanged (hash {1})".format(url, new_stamp['content_hash']))
@@ -5,12 +5,18 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils.timezone import now
 
+from oscar_docdata.checkpoints import clear_checkpoint, get_checkpoint, get_checkpoint_name, keyset_batches, save_checkpoint
+from oscar_docdata.exceptions import DocdataUnavailable
 from oscar_docdata.facade import get_facade
+from oscar_docdata.leases import claim_orders, get_lease_owner, release_leases
 from oscar_docdata.models import DocdataOrder
+from oscar_docdata.monthly_totals import track_monthly_totals
 
 
 class Command(BaseCommand):
     help = "Mark old open orders as expired"
+    batch_size = 100
+    checkpoint_name = 'expire_docdata_orders'
 
     def add_arguments(self, parser):
         super(Command, self).add_arguments(parser)
@@ -23,6 +29,13 @@ class Command(BaseCommand):
             default=False,
             help="Only list what will change, don't make the actual changes",
         )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            dest="resume",
+            default=False,
+            help="Continue after the last order that an interrupted run processed",
+        )
 
     def handle(self, *args, **options):
         """
@@ -39,43 +52,90 @@ class Command(BaseCommand):
             .filter(status__in=expire_status_choices) \
             .filter(created__lt=(now() - timedelta(days=21)))  # 3 weeks, based on manual testing.
 
+        # Each host stores its own progress, the command can run on multiple hosts at the same time.
+        checkpoint_name = get_checkpoint_name(self.checkpoint_name)
+        last_pk = 0
+        if options['resume']:
+            last_pk = get_checkpoint(checkpoint_name)
+            if last_pk:
+                self.stdout.write(u"Resuming after order ID {0}.".format(last_pk))
+                qs = qs.filter(pk__gt=last_pk)
+
         order_count = qs.count()
         self.stdout.write("Collect %i orders." % order_count)
 
         if order_count == 0:
+            if not is_dry_run:
+                clear_checkpoint(checkpoint_name)
             return
 
         facade = get_facade()
 
         if is_dry_run:
             self.stdout.write(u"Expiring orders (DRY-RUN):")
-        else:
-            self.stdout.write(u"Expiring orders:")
-
-        for order in qs.iterator():
-            # Will loop through all one by one, so signals can be properly fired:
-            self.stdout.write(u"- {0}\t(created {1:%Y-%m-%d}, still {2})".format(order.merchant_order_id, order.created, order.status))
-
-            # Will update
-            old_status = order.status
-            order.status = DocdataOrder.STATUS_EXPIRED
+            for order_ids in keyset_batches(qs, self.batch_size):
+                for order in DocdataOrder.objects.filter(pk__in=order_ids).order_by('pk'):
+                    self.stdout.write(u"- {0}\t(created {1:%Y-%m-%d}, still {2})".format(order.merchant_order_id, order.created, order.status))
+            return
 
-            if not is_dry_run:
-                with transaction.atomic():
-                    # First request the order at docdata, avoid expiring an order which missed an update (very unlikely)
-                    facade.update_order(order)
-                    if order.status not in expire_status_choices:
-                        if order.status == DocdataOrder.STATUS_EXPIRED:
-                            self.stdout.write(u"  Updated order {0} via status API, detected expired state".format(order.merchant_order_id))
-                        else:
-                            self.stderr.write(u"  Skipping order {0}, status changed to: {1}".format(order.merchant_order_id, order.status))
-                    else:
-                        # More efficient SQL
-                        DocdataOrder.objects.filter(id=order.id).update(status=DocdataOrder.STATUS_EXPIRED)
-
-                        try:
-                            # Make sure Oscar is updated, and the signal is sent.
-                            facade.order_status_changed(order, old_status, order.status)
-                        except Exception as e:
-                            self.stderr.write(u"Failed to update order {0}: {1}".format(order.id, e))
-                            DocdataOrder.objects.filter(id=order.id).update(status=old_status)
+        self.stdout.write(u"Expiring orders:")
+
+        # Claim the orders in batches, so the command can run on multiple hosts.
+        # Orders that are claimed by another process are skipped.
+        # The last processed order is stored as checkpoint, so --resume can continue after an interruption.
+        owner = get_lease_owner()
+        if not options['resume']:
+            clear_checkpoint(checkpoint_name)
+        processed_pk = last_pk
+        while True:
+            order_ids = claim_orders(qs.filter(pk__gt=last_pk), owner, limit=self.batch_size)
+            if not order_ids:
+                break
+
+            last_pk = max(order_ids)
+            try:
+                for order in DocdataOrder.objects.filter(pk__in=order_ids).order_by('pk'):
+                    self.expire_order(facade, order, expire_status_choices)
+                    processed_pk = order.pk
+            finally:
+                release_leases(order_ids, owner)
+                if processed_pk:
+                    save_checkpoint(checkpoint_name, processed_pk)
+
+        clear_checkpoint(checkpoint_name)
+
+    def expire_order(self, facade, order, expire_status_choices):
+        # Will loop through all one by one, so signals can be properly fired:
+        self.stdout.write(u"- {0}\t(created {1:%Y-%m-%d}, still {2})".format(order.merchant_order_id, order.created, order.status))
+
+        old_status = order.status
+
+        with transaction.atomic():
+            # First request the order at docdata, avoid expiring an order which missed an update (very unlikely)
+            try:
+                facade.update_order(order)
+            except DocdataUnavailable as e:
+                # Expire the order on the next run.
+                self.stderr.write(u"  Skipping order {0}: {1}".format(order.merchant_order_id, e))
+                return
+
+            if order.status not in expire_status_choices:
+                if order.status == DocdataOrder.STATUS_EXPIRED:
+                    self.stdout.write(u"  Updated order {0} via status API, detected expired state".format(order.merchant_order_id))
+                else:
+                    self.stderr.write(u"  Skipping order {0}, status changed to: {1}".format(order.merchant_order_id, order.status))
+            else:
+                # Only change the status after the update, it would skip an unchanged status report otherwise.
+                order.status = DocdataOrder.STATUS_EXPIRED
+
+                # More efficient SQL
+                with track_monthly_totals(order):
+                    DocdataOrder.objects.filter(id=order.id).update(status=DocdataOrder.STATUS_EXPIRED)
+
+                try:
+                    # Make sure Oscar is updated, and the signal is sent.
+                    facade.order_status_changed(order, old_status, order.status)
+                except Exception as e:
+                    self.stderr.write(u"Failed to update order {0}: {1}".format(order.id, e))
+                    with track_monthly_totals(order):
+                        DocdataOrder.objects.filter(id=order.id).update(status=old_status)
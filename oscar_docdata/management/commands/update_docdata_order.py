@@ -1,12 +1,42 @@
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as futures_wait
+from itertools import islice
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, transaction
 
-from oscar_docdata.exceptions import DocdataStatusError
+from oscar_docdata.checkpoints import CheckpointTracker, clear_checkpoint, get_checkpoint, get_checkpoint_name, keyset_batches
+from oscar_docdata.exceptions import DocdataStatusError, DocdataUnavailable
 from oscar_docdata.facade import get_facade
 from oscar_docdata.models import DocdataOrder
 
+logger = logging.getLogger(__name__)
+
+
+def _chunks(iterable, size):
+    iterable = iter(iterable)
+    while True:
+        chunk = list(islice(iterable, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ChunkResult(object):
+    """
+    The outcome of updating a chunk of orders.
+    The messages are written by the main thread, so the output of the workers isn't mixed.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.changed = 0
+        self.failed = 0
+        self.last_pk = 0
+        self.messages = []
+
 
 class Command(BaseCommand):
     help = "Update the status of the given orders"
@@ -20,6 +50,18 @@ class Command(BaseCommand):
         parser.add_argument(
             "--status", action="store", dest="status", default=None, help="Update all orders of a given status"
         )
+        parser.add_argument(
+            "--workers", action="store", dest="workers", type=int, default=1,
+            help="The number of orders to update concurrently, each worker thread uses its own database connection"
+        )
+        parser.add_argument(
+            "--chunk-size", action="store", dest="chunk_size", type=int, default=100,
+            help="The number of orders that a worker updates before reporting the progress"
+        )
+        parser.add_argument(
+            "--resume", action="store_true", dest="resume", default=False,
+            help="Continue after the last order that an interrupted --all run processed"
+        )
 
     def handle(self, *args, **options):
         """
@@ -28,29 +70,49 @@ class Command(BaseCommand):
         # At -v2 SOAP requests are outputted.
         do_all = options['all']
         only_status = options['status']
-        verbosity = int(options['verbosity'])
+        workers = options['workers']
+        chunk_size = options['chunk_size']
+        self.verbosity = int(options['verbosity'])
+        if workers < 1:
+            raise CommandError("The number of --workers should be at least 1")
+        if chunk_size < 1:
+            raise CommandError("The --chunk-size should be at least 1")
 
         # Apply verbosity
-        logging.getLogger('oscar_docdata.interface').setLevel('WARNING' if verbosity < 2 else 'DEBUG')
-        logging.getLogger('suds.transport').setLevel('INFO' if verbosity < 3 else 'DEBUG')
+        logging.getLogger('oscar_docdata.interface').setLevel('WARNING' if self.verbosity < 2 else 'DEBUG')
+        logging.getLogger('suds.transport').setLevel('INFO' if self.verbosity < 3 else 'DEBUG')
 
         qs = DocdataOrder.objects.active_merchants()
-        facade = get_facade()
+        self.facade = get_facade()
 
         if do_all:
-            orders = qs.all()
-
-            order_count = orders.count()
-            self.stdout.write("There are %i orders." % order_count)
+            if options["oscar_order_number"]:
+                raise CommandError("No order numbers have to be provided for --all")
 
+            orders = qs.all()
             if only_status:
                 orders = orders.filter(status=only_status)
 
-            if args:
-                raise CommandError("No order numbers have to be provided for --all")
+            # Iterate by primary key, so an interrupted run can continue where it stopped.
+            # Each host stores its own progress, so concurrent runs on other hosts don't overwrite it.
+            checkpoint_name = get_checkpoint_name(u"update_docdata_order:{0}".format(only_status or ''))
+            if options['resume']:
+                last_pk = get_checkpoint(checkpoint_name)
+                if last_pk:
+                    self.stdout.write(u"Resuming after order ID {0}.".format(last_pk))
+            else:
+                clear_checkpoint(checkpoint_name)
+                last_pk = 0
+
+            tracker = CheckpointTracker(checkpoint_name, last_pk)
+            if self.update_orders(keyset_batches(orders, chunk_size, last_pk=last_pk), workers=workers, tracker=tracker):
+                clear_checkpoint(checkpoint_name)
         else:
+            if options['resume']:
+                raise CommandError("The --resume option can only be used with --all")
+
             # First get all orders, check them.
-            orders = []
+            order_ids = []
             for order_number in options["oscar_order_number"]:
                 try:
                     order = qs.get(merchant_order_id=order_number)
@@ -61,23 +123,138 @@ class Command(BaseCommand):
                     if only_status and order.status != only_status:
                         self.stderr.write(u"- Order {0} does not have status {1}, but {2}\n".format(order_number, only_status, order.status))
                         continue
-                    orders.append(order)
+                    order_ids.append(order.pk)
+
+            self.stdout.write("Collect %i orders." % len(order_ids))
+            self.update_orders(_chunks(order_ids, chunk_size), workers=workers)
 
-            self.stdout.write("Collect %i orders." % len(orders))
+    def update_orders(self, chunks, workers=1, tracker=None):
+        """
+        Update the chunks of orders, by a pool of worker threads.
+        Ctrl-C stops the command after the orders that are being updated.
 
-        for order in orders:
-            self.stdout.write(u"- Checking {0}\n".format(order.merchant_order_id))
+        :param tracker: Stores the checkpoint of the processed chunks.
+        :type tracker: oscar_docdata.checkpoints.CheckpointTracker
+        :returns: Whether all orders were processed.
+        """
+        self.totals = ChunkResult()
+        self.started = time.time()
+        stop_event = threading.Event()
+        chunks = iter(chunks)
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        pending = {}
+        try:
+            if executor is None:
+                for chunk in chunks:
+                    if tracker is not None:
+                        tracker.add(chunk)
+                    self._chunk_done(chunk, self.update_chunk(chunk, stop_event), tracker)
+                    if stop_event.is_set():
+                        break
+            else:
+                # Only keep a few chunks queued, so the order IDs are fetched as they are needed.
+                for chunk in islice(chunks, workers * 2):
+                    pending[self._submit(executor, chunk, stop_event, tracker)] = chunk
 
-            with transaction.atomic():
-                # First request the order at docdata, avoid expiring an order which missed an update (very unlikely)
-                old_status = order.status
-                try:
-                    facade.update_order(order)
-                except DocdataStatusError as e:
-                    self.stderr.write(u"{0}\n".format(e))
-                    continue
+                while pending:
+                    done, _ = futures_wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._chunk_done(pending.pop(future), future.result(), tracker)
+                    for chunk in islice(chunks, len(done)):
+                        pending[self._submit(executor, chunk, stop_event, tracker)] = chunk
+        except KeyboardInterrupt:
+            stop_event.set()
+            self.stderr.write(u"Interrupted, waiting for the running updates to finish...")
+            for future, chunk in pending.items():
+                self._chunk_done(chunk, future.result(), tracker)
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
-                if order.status == old_status:
-                    self.stderr.write(u"  Order {0} status unchanged, remained: {1}".format(order.merchant_order_id, order.status))
-                else:
-                    self.stdout.write(u"  Order {0} status changed from {1} to {2}".format(order.merchant_order_id, old_status, order.status))
+        if stop_event.is_set():
+            self.stdout.write(u"Interrupted: {0}".format(self._get_progress()))
+            if tracker is not None:
+                self.stdout.write(u"Use --resume to continue after order ID {0}.".format(tracker.last_pk))
+            return False
+
+        self.stdout.write(u"Done: {0}".format(self._get_progress()))
+        return True
+
+    def _submit(self, executor, chunk, stop_event, tracker):
+        if tracker is not None:
+            tracker.add(chunk)
+        return executor.submit(self._update_chunk_in_thread, chunk, stop_event)
+
+    def _update_chunk_in_thread(self, order_ids, stop_event):
+        try:
+            return self.update_chunk(order_ids, stop_event)
+        finally:
+            # Each thread has its own database connection.
+            connection.close()
+
+    def update_chunk(self, order_ids, stop_event=None):
+        """
+        Update the orders, each in its own transaction.
+
+        :rtype: ChunkResult
+        """
+        result = ChunkResult()
+        for order_id in order_ids:
+            if stop_event is not None and stop_event.is_set():
+                break
+
+            processed_pk, result.last_pk = result.last_pk, order_id
+            try:
+                with transaction.atomic():
+                    order = DocdataOrder.objects.select_for_update().get(pk=order_id)
+                    if self.verbosity >= 2:
+                        result.messages.append((self.stdout, u"- Checking {0}".format(order.merchant_order_id)))
+
+                    # First request the order at docdata, avoid expiring an order which missed an update (very unlikely)
+                    old_status = order.status
+                    self.facade.update_order(order)
+            except KeyboardInterrupt:
+                # Only raised in the main thread, the update of this order is rolled back.
+                if stop_event is None:
+                    raise
+                stop_event.set()
+                result.last_pk = processed_pk
+                break
+            except DocdataOrder.DoesNotExist:
+                continue
+            except (DocdataStatusError, DocdataUnavailable) as e:
+                result.failed += 1
+                result.messages.append((self.stderr, u"  Order {0} failed: {1}".format(order_id, e)))
+                continue
+            except Exception as e:
+                logger.exception("Failed to update Docdata order %s", order_id)
+                result.failed += 1
+                result.messages.append((self.stderr, u"  Order {0} failed: {1!r}".format(order_id, e)))
+                continue
+
+            result.checked += 1
+            if order.status != old_status:
+                result.changed += 1
+                result.messages.append((self.stdout, u"  Order {0} status changed from {1} to {2}".format(order.merchant_order_id, old_status, order.status)))
+            elif self.verbosity >= 2:
+                result.messages.append((self.stdout, u"  Order {0} status unchanged, remained: {1}".format(order.merchant_order_id, order.status)))
+        return result
+
+    def _chunk_done(self, chunk, result, tracker=None):
+        if tracker is not None:
+            tracker.done(chunk, result.last_pk)
+
+        for stream, message in result.messages:
+            stream.write(message)
+
+        self.totals.checked += result.checked
+        self.totals.changed += result.changed
+        self.totals.failed += result.failed
+        self.stdout.write(self._get_progress())
+
+    def _get_progress(self):
+        elapsed = max(time.time() - self.started, 0.001)
+        processed = self.totals.checked + self.totals.failed
+        return u"Checked {0} orders, {1} changed, {2} failed ({3:.1f} orders/s)".format(
+            self.totals.checked, self.totals.changed, self.totals.failed, processed / elapsed
+        )
@@ -0,0 +1,45 @@
+"""
+Simple in-process counters, to monitor how often the optimized code paths are taken.
+"""
+import threading
+from collections import defaultdict
+
+__all__ = (
+    'Counters',
+    'counters',
+)
+
+
+class Counters(object):
+    """
+    Thread-safe named counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._values[name] += value
+
+    def get(self, name):
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def snapshot(self):
+        """
+        Return a copy of all counters.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+#: The counters of this process.
+counters = Counters()
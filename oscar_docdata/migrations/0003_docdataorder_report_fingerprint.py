@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_docdata', '0002_remove_directdebitpayment_and_polymorphic_ctype'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='docdataorder',
+            name='report_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name='Report fingerprint'),
+        ),
+    ]
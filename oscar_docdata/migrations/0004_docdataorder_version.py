@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-16 21:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_docdata', '0003_docdataorder_report_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='docdataorder',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Version'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_docdata', '0004_docdataorder_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocdataNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merchant_order_id', models.CharField(max_length=100, unique=True, verbose_name='Order ID')),
+                ('received', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='received')),
+                ('attempts', models.PositiveIntegerField(default=0, editable=False, verbose_name='Attempts')),
+                ('last_error', models.TextField(blank=True, default='', editable=False, verbose_name='Last error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+            ],
+            options={
+                'verbose_name': 'Docdata notification',
+                'verbose_name_plural': 'Docdata notifications',
+                'ordering': ('received',),
+            },
+        ),
+    ]
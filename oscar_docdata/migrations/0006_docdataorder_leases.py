@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_docdata', '0005_docdatanotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='docdataorder',
+            name='lease_expires',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Lease expires'),
+        ),
+        migrations.AddField(
+            model_name='docdataorder',
+            name='lease_owner',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Lease owner'),
+        ),
+        migrations.AddField(
+            model_name='docdataorder',
+            name='next_check',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Next check'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_docdata', '0006_docdataorder_leases'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='docdataorder',
+            index=models.Index(fields=['merchant_order_id', 'merchant_name'], name='docdata_merchant_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='docdataorder',
+            index=models.Index(fields=['merchant_name', 'status', 'created'], name='docdata_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-16 21:06
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_docdata', '0007_docdataorder_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocdataMonthlyTotal',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merchant_name', models.CharField(max_length=100, verbose_name='Docdata account')),
+                ('month', models.DateField(verbose_name='Month')),
+                ('currency', models.CharField(max_length=10, verbose_name='Currency')),
+                ('status', models.CharField(choices=[('new', 'New'), ('in_progress', 'In Progress'), ('pending', 'Pending'), ('paid', 'Paid'), ('paid_refunded', 'Paid, part refunded'), ('cancelled', 'Cancelled'), ('charged_back', 'Charged back'), ('refunded', 'Refunded'), ('expired', 'Expired'), ('unknown', 'Unknown')], max_length=50, verbose_name='Status')),
+                ('order_count', models.IntegerField(default=0, verbose_name='Orders')),
+                ('total_registered', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total registered')),
+                ('total_captured', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total captured')),
+                ('total_refunded', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total refunded')),
+                ('total_charged_back', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total changed back')),
+            ],
+            options={
+                'verbose_name': 'Docdata monthly total',
+                'verbose_name_plural': 'Docdata monthly totals',
+                'ordering': ('month', 'currency', 'status'),
+                'unique_together': {('merchant_name', 'month', 'currency', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-16 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_docdata', '0008_docdatamonthlytotal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocdataCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='Name')),
+                ('last_pk', models.BigIntegerField(default=0, verbose_name='Last processed ID')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='updated')),
+            ],
+            options={
+                'verbose_name': 'Docdata checkpoint',
+                'verbose_name_plural': 'Docdata checkpoints',
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.utils.encoding import python_2_unicode_compatible
 
 from decimal import Decimal as D
 from django.db import models
+from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 from oscar_docdata.managers import DocdataOrderManager
 from . import appsettings
@@ -60,6 +61,19 @@ class DocdataOrder(models.Model):
     total_refunded = models.DecimalField(_("Total refunded"), max_digits=15, decimal_places=2, default=D('0.00'))
     total_charged_back = models.DecimalField(_("Total changed back"), max_digits=15, decimal_places=2, default=D('0.00'))
 
+    # Digest of the last processed status report, to skip unchanged reports.
+    report_fingerprint = models.CharField(_("Report fingerprint"), max_length=64, blank=True, default='', editable=False)
+
+    # Incremented for every stored status report, to detect concurrent updates.
+    version = models.PositiveIntegerField(_("Version"), default=0, editable=False)
+
+    # Claim of the management commands, so multiple hosts don't process the same order.
+    lease_owner = models.CharField(_("Lease owner"), max_length=100, blank=True, default='', editable=False)
+    lease_expires = models.DateTimeField(_("Lease expires"), null=True, blank=True, editable=False, db_index=True)
+
+    # The next status check of the docdata_reconcile command.
+    next_check = models.DateTimeField(_("Next check"), null=True, blank=True, editable=False, db_index=True)
+
     # Internal info.
     created = models.DateTimeField(_("created"), auto_now_add=True)
     updated = models.DateTimeField(_("updated"), auto_now=True)
@@ -70,6 +84,12 @@ class DocdataOrder(models.Model):
         ordering = ('-created', '-updated')
         verbose_name = _("Docdata Order")
         verbose_name_plural = _("Docdata Orders")
+        indexes = [
+            # The status changed notifications, which lookup by merchant_order_id within active_merchants().
+            models.Index(fields=['merchant_order_id', 'merchant_name'], name='docdata_merchant_order_idx'),
+            # The expire command, which filters active_merchants() by status and created date.
+            models.Index(fields=['merchant_name', 'status', 'created'], name='docdata_status_created_idx'),
+        ]
 
     def __str__(self):
         return self.order_key
@@ -131,3 +151,75 @@ class DocdataPayment(models.Model):
         ordering = ('payment_id',)
         verbose_name = _("Payment")
         verbose_name_plural = _("Payments")
+
+
+@python_2_unicode_compatible
+class DocdataNotification(models.Model):
+    """
+    A received status changed notification, which still needs to be processed.
+    This is the queue of the ``DOCDATA_QUEUE_NOTIFICATIONS`` setting.
+
+    Repeated notifications for the same order are stored as a single row,
+    the ``received`` field is updated instead.
+    """
+    merchant_order_id = models.CharField(_("Order ID"), max_length=100, unique=True)
+    received = models.DateTimeField(_("received"), default=now, db_index=True)
+    attempts = models.PositiveIntegerField(_("Attempts"), default=0, editable=False)
+    last_error = models.TextField(_("Last error"), blank=True, default='', editable=False)
+
+    # Internal info.
+    created = models.DateTimeField(_("created"), auto_now_add=True)
+
+    class Meta:
+        ordering = ('received',)
+        verbose_name = _("Docdata notification")
+        verbose_name_plural = _("Docdata notifications")
+
+    def __str__(self):
+        return self.merchant_order_id
+
+
+@python_2_unicode_compatible
+class DocdataMonthlyTotal(models.Model):
+    """
+    The totals of the orders per merchant, month, currency and status.
+    These are kept up to date with ``DOCDATA_MONTHLY_TOTALS``, so the reports don't have to scan all orders.
+    The month is based on the ``created`` date of the order.
+    """
+    merchant_name = models.CharField(_("Docdata account"), max_length=100)
+    month = models.DateField(_("Month"))
+    currency = models.CharField(_("Currency"), max_length=10)
+    status = models.CharField(_("Status"), max_length=50, choices=DocdataOrder.STATUS_CHOICES)
+
+    order_count = models.IntegerField(_("Orders"), default=0)
+    total_registered = models.DecimalField(_("Total registered"), max_digits=15, decimal_places=2, default=D('0.00'))
+    total_captured = models.DecimalField(_("Total captured"), max_digits=15, decimal_places=2, default=D('0.00'))
+    total_refunded = models.DecimalField(_("Total refunded"), max_digits=15, decimal_places=2, default=D('0.00'))
+    total_charged_back = models.DecimalField(_("Total changed back"), max_digits=15, decimal_places=2, default=D('0.00'))
+
+    class Meta:
+        ordering = ('month', 'currency', 'status')
+        unique_together = (('merchant_name', 'month', 'currency', 'status'),)
+        verbose_name = _("Docdata monthly total")
+        verbose_name_plural = _("Docdata monthly totals")
+
+    def __str__(self):
+        return u"{0} {1:%Y-%m} {2} {3}".format(self.merchant_name, self.month, self.currency, self.status)
+
+
+@python_2_unicode_compatible
+class DocdataCheckpoint(models.Model):
+    """
+    The progress of a long-running management command, so an interrupted run can be resumed.
+    The orders are processed in primary key order, so only the last processed key needs to be stored.
+    """
+    name = models.CharField(_("Name"), max_length=200, unique=True)
+    last_pk = models.BigIntegerField(_("Last processed ID"), default=0)
+    updated = models.DateTimeField(_("updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Docdata checkpoint")
+        verbose_name_plural = _("Docdata checkpoints")
+
+    def __str__(self):
+        return self.name
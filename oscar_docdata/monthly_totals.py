@@ -0,0 +1,118 @@
+"""
+Incrementally maintained totals of the orders per merchant, month, currency and status.
+
+With ``DOCDATA_MONTHLY_TOTALS``, every change of the totals or status of an order is added to
+the :class:`~oscar_docdata.models.DocdataMonthlyTotal` table, so the ``docdata_report`` command
+reads a few rows per month instead of all orders. Changes that bypass :func:`track_monthly_totals`
+(e.g. editing the orders in the database directly) are corrected by the ``docdata_rebuild_totals`` command.
+"""
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.timezone import is_aware, localtime
+
+from oscar_docdata import appsettings
+from oscar_docdata.models import DocdataMonthlyTotal, DocdataOrder
+
+__all__ = (
+    'TOTAL_FIELDS',
+    'get_month',
+    'track_monthly_totals',
+    'rebuild_monthly_totals',
+)
+
+#: The order fields that are summed.
+TOTAL_FIELDS = ('total_registered', 'total_captured', 'total_refunded', 'total_charged_back')
+
+
+def get_month(created):
+    """
+    Return the first day of the month of the order, in the current timezone.
+
+    :type created: datetime.datetime
+    :rtype: datetime.date
+    """
+    if is_aware(created):
+        created = localtime(created)
+    return created.date().replace(day=1)
+
+
+@contextmanager
+def track_monthly_totals(order):
+    """
+    Add the changes that are saved inside this block to the monthly totals.
+    The stored values are read before and after the block, so both ``order.save()``
+    and ``QuerySet.update()`` calls are tracked.
+
+    :type order: DocdataOrder
+    """
+    if not appsettings.DOCDATA_MONTHLY_TOTALS:
+        yield
+        return
+
+    old = _get_stored_values(order.pk) if order.pk else None
+    yield
+    new = _get_stored_values(order.pk)
+
+    if old is not None:
+        _add(old, -1)
+    if new is not None:
+        _add(new, 1)
+
+
+def _get_stored_values(order_id):
+    return DocdataOrder.objects.filter(pk=order_id).values('merchant_name', 'created', 'currency', 'status', *TOTAL_FIELDS).first()
+
+
+def _add(values, sign):
+    """
+    Add (or with ``sign=-1`` subtract) the order values to its row of the monthly totals.
+    """
+    key = {
+        'merchant_name': values['merchant_name'],
+        'month': get_month(values['created']),
+        'currency': values['currency'],
+        'status': values['status'],
+    }
+    totals = dict((field, sign * values[field]) for field in TOTAL_FIELDS)
+    changes = dict((field, F(field) + value) for field, value in totals.items() if value)
+    changes['order_count'] = F('order_count') + sign
+
+    if not DocdataMonthlyTotal.objects.filter(**key).update(**changes):
+        try:
+            with transaction.atomic():
+                DocdataMonthlyTotal.objects.create(order_count=sign, **dict(key, **totals))
+        except IntegrityError:
+            # Created concurrently by another process.
+            DocdataMonthlyTotal.objects.filter(**key).update(**changes)
+
+
+def rebuild_monthly_totals():
+    """
+    Recalculate all monthly totals from the orders.
+
+    :returns: The number of stored rows.
+    """
+    aggregates = dict((field, Sum(field)) for field in TOTAL_FIELDS)
+    rows = DocdataOrder.objects.annotate(month=TruncMonth('created')) \
+        .values('merchant_name', 'month', 'currency', 'status') \
+        .annotate(order_count=Count('pk'), **aggregates) \
+        .order_by()
+
+    with transaction.atomic():
+        DocdataMonthlyTotal.objects.all().delete()
+        totals = [
+            DocdataMonthlyTotal(
+                merchant_name=row['merchant_name'],
+                month=get_month(row['month']),
+                currency=row['currency'],
+                status=row['status'],
+                order_count=row['order_count'],
+                **dict((field, row[field] or 0) for field in TOTAL_FIELDS)
+            )
+            for row in rows.iterator()
+        ]
+        DocdataMonthlyTotal.objects.bulk_create(totals, batch_size=500)
+    return len(totals)
@@ -0,0 +1,138 @@
+"""
+Queue of the status changed notifications.
+
+With ``DOCDATA_QUEUE_NOTIFICATIONS``, the notification view only stores the notification
+and returns directly. The ``docdata_notifications`` management command processes the queue
+in the background, so slow status requests or signal receivers don't cause Docdata to retry the notification.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from oscar_docdata import appsettings
+from oscar_docdata.facade import get_facade
+from oscar_docdata.metrics import counters
+from oscar_docdata.models import DocdataNotification, DocdataOrder
+
+logger = logging.getLogger(__name__)
+
+__all__ = (
+    'queue_notification',
+    'NotificationWorker',
+)
+
+
+def queue_notification(merchant_order_id):
+    """
+    Store the notification for the order in the queue.
+    When the order is already queued, the existing notification is updated,
+    and processed again even when it failed too often before.
+    """
+    received = now()
+    if not DocdataNotification.objects.filter(merchant_order_id=merchant_order_id).update(received=received, attempts=0, last_error=''):
+        try:
+            with transaction.atomic():
+                DocdataNotification.objects.create(merchant_order_id=merchant_order_id, received=received)
+        except IntegrityError:
+            # Created concurrently by another request.
+            DocdataNotification.objects.filter(merchant_order_id=merchant_order_id).update(received=received, attempts=0, last_error='')
+
+    counters.increment('notification_queued')
+
+
+class NotificationWorker(object):
+    """
+    Process the queued notifications, by updating the orders.
+
+    A notification is removed once the order is updated. When another notification for the same order
+    arrived in the meantime, it's kept so the order is updated again.
+    Failed notifications are retried, at most ``max_attempts`` times.
+    """
+
+    def __init__(self, facade=None, max_attempts=None):
+        self.facade = facade or get_facade()
+        self.max_attempts = max_attempts if max_attempts is not None else appsettings.DOCDATA_NOTIFICATION_MAX_ATTEMPTS
+
+    def drain(self, workers=1, batch_size=100):
+        """
+        Process all notifications that are queued at this moment.
+
+        :param workers: The number of notifications that are processed concurrently.
+        :returns: The number of processed and failed notifications.
+        :rtype: tuple[int, int]
+        """
+        started = now()
+        processed = failed = 0
+        failed_ids = set()
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while True:
+                notifications = list(
+                    DocdataNotification.objects
+                    .filter(received__lte=started, attempts__lt=self.max_attempts)
+                    .exclude(pk__in=failed_ids)[:batch_size]
+                )
+                if not notifications:
+                    break
+
+                if executor is not None:
+                    results = executor.map(self._process_in_thread, notifications)
+                else:
+                    results = map(self.process, notifications)
+
+                for notification, success in zip(notifications, results):
+                    if success:
+                        processed += 1
+                    else:
+                        failed += 1
+                        failed_ids.add(notification.pk)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return processed, failed
+
+    def _process_in_thread(self, notification):
+        try:
+            return self.process(notification)
+        finally:
+            # Each thread has its own database connection.
+            connection.close()
+
+    def process(self, notification):
+        """
+        Update the order of a single notification.
+
+        :type notification: DocdataNotification
+        :returns: Whether the order was updated.
+        :rtype: bool
+        """
+        try:
+            order = DocdataOrder.objects.active_merchants().get(merchant_order_id=notification.merchant_order_id)
+        except DocdataOrder.DoesNotExist:
+            logger.error("Order merchant_order_id='%s' not found to process the queued notification.", notification.merchant_order_id)
+            notification.delete()
+            return False
+
+        try:
+            # The status changed, so the cached status report is outdated.
+            self.facade.forget_status(order)
+            if appsettings.DOCDATA_FETCH_STATUS_OUTSIDE_LOCK:
+                self.facade.update_order_optimistic(order)
+            else:
+                with transaction.atomic():
+                    order = DocdataOrder.objects.select_for_update().get(pk=order.pk)
+                    self.facade.update_order(order)
+        except Exception as e:
+            logger.exception("Failed to process the queued notification for order %s", notification.merchant_order_id)
+            DocdataNotification.objects.filter(pk=notification.pk).update(attempts=F('attempts') + 1, last_error=str(e))
+            counters.increment('notification_failed')
+            return False
+
+        # Keep the notification when a new one arrived during the update.
+        DocdataNotification.objects.filter(pk=notification.pk, received=notification.received).delete()
+        counters.increment('notification_processed')
+        return True
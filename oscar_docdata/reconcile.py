@@ -0,0 +1,269 @@
+"""
+Reconciliation of the open orders, to catch missed status changed notifications.
+
+The :class:`Reconciler` keeps a schedule with the next check of every open order.
+Young orders are checked often, and the interval doubles as the order gets older
+(the checks happen when the order is ``min_interval``, 2x, 4x, 8x... that age), until ``max_interval`` is reached.
+Orders with a final status are no longer checked.
+"""
+import heapq
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as futures_wait
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from oscar_docdata import appsettings
+from oscar_docdata.facade import get_facade
+from oscar_docdata.leases import claim_orders, get_lease_owner, release_leases
+from oscar_docdata.metrics import counters
+from oscar_docdata.models import DocdataOrder
+
+logger = logging.getLogger(__name__)
+
+__all__ = (
+    'FINAL_STATUSES',
+    'get_next_check',
+    'ReconcileSchedule',
+    'Reconciler',
+)
+
+#: The statuses which are not checked again.
+FINAL_STATUSES = (
+    DocdataOrder.STATUS_PAID,
+    DocdataOrder.STATUS_CANCELLED,
+    DocdataOrder.STATUS_EXPIRED,
+    DocdataOrder.STATUS_REFUNDED,
+)
+
+
+def get_next_check(created, current_time, min_interval, max_interval):
+    """
+    Return the time of the next check of an order.
+
+    :type created: datetime.datetime
+    :type current_time: datetime.datetime
+    :type min_interval: datetime.timedelta
+    :type max_interval: datetime.timedelta
+    :rtype: datetime.datetime
+    """
+    age = max(min_interval, timedelta(seconds=1))
+    while created + age <= current_time:
+        if age >= max_interval:
+            # The interval no longer grows, check every max_interval.
+            return current_time + max_interval
+        age *= 2
+    return created + age
+
+
+class ReconcileSchedule(object):
+    """
+    Priority queue of the orders, by the time of their next check.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._next_checks = {}
+
+    def add(self, order_id, next_check):
+        """
+        Schedule the order, this replaces the existing schedule of the order.
+        """
+        self._next_checks[order_id] = next_check
+        heapq.heappush(self._heap, (next_check, order_id))
+
+    def pop_due(self, current_time, limit=None):
+        """
+        Remove and return the IDs of the orders that need to be checked.
+
+        :rtype: list[int]
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= current_time and (limit is None or len(due) < limit):
+            next_check, order_id = heapq.heappop(self._heap)
+            if self._next_checks.get(order_id) == next_check:  # skip replaced entries
+                del self._next_checks[order_id]
+                due.append(order_id)
+        return due
+
+    def next_due(self):
+        """
+        Return the time of the first check, or ``None`` when the schedule is empty.
+        """
+        while self._heap and self._next_checks.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def __contains__(self, order_id):
+        return order_id in self._next_checks
+
+    def __len__(self):
+        return len(self._next_checks)
+
+
+class Reconciler(object):
+    """
+    Check the open orders according to the schedule, with a bounded pool of worker threads.
+    The schedule is kept in memory, and the next check is stored in ``DocdataOrder.next_check``.
+    When multiple reconcilers run, an order is claimed before it's checked (see :mod:`oscar_docdata.leases`),
+    so each order is only checked by one of them.
+
+    The new orders are added to the schedule every ``refresh_interval`` seconds.
+    Call :func:`stop` (e.g. from a signal handler) to finish the running checks and return from :func:`run`.
+    """
+
+    def __init__(self, facade=None, workers=4, min_interval=None, max_interval=None, refresh_interval=60):
+        self.facade = facade or get_facade()
+        self.workers = workers
+        self.min_interval = timedelta(seconds=min_interval or appsettings.DOCDATA_RECONCILE_MIN_INTERVAL)
+        self.max_interval = timedelta(seconds=max_interval or appsettings.DOCDATA_RECONCILE_MAX_INTERVAL)
+        self.refresh_interval = refresh_interval
+        self.schedule = ReconcileSchedule()
+        self.owner = get_lease_owner()
+        self._stop_event = threading.Event()
+
+    def get_queryset(self):
+        """
+        Return the orders to check.
+        """
+        return DocdataOrder.objects.active_merchants().exclude(status__in=FINAL_STATUSES)
+
+    def load(self):
+        """
+        Add the open orders that are not scheduled yet.
+
+        :returns: The number of added orders.
+        """
+        added = 0
+        values = self.get_queryset().values_list('pk', 'created', 'updated', 'next_check')
+        for order_id, created, updated, next_check in values.iterator():
+            if order_id not in self.schedule:
+                if next_check is None:
+                    # Not checked before, schedule based on the last update of the order.
+                    # When the order missed a check since then, it's checked directly.
+                    next_check = get_next_check(created, updated, self.min_interval, self.max_interval)
+                self.schedule.add(order_id, next_check)
+                added += 1
+        return added
+
+    def run(self):
+        """
+        Keep checking the orders, until :func:`stop` is called.
+        """
+        pending = {}
+        next_load = None
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not self._stop_event.is_set():
+                current_time = now()
+                if next_load is None or current_time >= next_load:
+                    self.load()
+                    next_load = current_time + timedelta(seconds=self.refresh_interval)
+
+                # Only submit as many checks as there are free workers, the others stay in the schedule.
+                for order_id in self._claim(self.schedule.pop_due(current_time, limit=self.workers - len(pending))):
+                    pending[executor.submit(self._check_in_thread, order_id)] = order_id
+
+                # Sleep until a check is done, the next check is due, or the orders are loaded again.
+                next_due = self.schedule.next_due()
+                wake_up = min(next_due, next_load) if next_due is not None else next_load
+                timeout = min(max((wake_up - now()).total_seconds(), 0.1), 1)
+                if pending:
+                    done, _ = futures_wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._reschedule(pending.pop(future), future.result())
+                else:
+                    self._stop_event.wait(timeout)
+
+            # Let the running checks finish, so their next check is stored and the claims are released.
+            for future in pending:
+                self._reschedule(pending[future], future.result())
+
+    def run_once(self):
+        """
+        Check all orders that are due now, and return the number of checked orders.
+        """
+        self.load()
+        order_ids = self._claim(self.schedule.pop_due(now()))
+        if self.workers > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                orders = list(executor.map(self._check_in_thread, order_ids))
+        else:
+            orders = [self.check(order_id) for order_id in order_ids]
+
+        for order_id, order in zip(order_ids, orders):
+            self._reschedule(order_id, order)
+        return len(order_ids)
+
+    def stop(self):
+        """
+        Stop the :func:`run` loop, the running checks are finished first.
+        """
+        self._stop_event.set()
+
+    def _claim(self, order_ids):
+        """
+        Claim the orders which are due, the other orders are checked by another process.
+        """
+        if not order_ids:
+            return []
+
+        current_time = now()
+        due = Q(next_check__isnull=True) | Q(next_check__lte=current_time)
+        claimed = set(claim_orders(DocdataOrder.objects.filter(due, pk__in=order_ids), self.owner))
+
+        # Follow the schedule of the other process.
+        others = DocdataOrder.objects.filter(pk__in=order_ids).exclude(pk__in=claimed).exclude(status__in=FINAL_STATUSES)
+        for order_id, next_check, lease_expires in others.values_list('pk', 'next_check', 'lease_expires'):
+            later = [time for time in (next_check, lease_expires) if time is not None and time > current_time]
+            self.schedule.add(order_id, max(later) if later else current_time + self.min_interval)
+
+        return [order_id for order_id in order_ids if order_id in claimed]
+
+    def _reschedule(self, order_id, order):
+        if order is None:
+            # The check failed, try again later.
+            order = DocdataOrder.objects.filter(pk=order_id).only('pk', 'status', 'created').first()
+            if order is None:
+                return
+
+        if order.status in FINAL_STATUSES:
+            release_leases([order_id], self.owner, next_check=None)
+        else:
+            next_check = get_next_check(order.created, now(), self.min_interval, self.max_interval)
+            self.schedule.add(order_id, next_check)
+            release_leases([order_id], self.owner, next_check=next_check)
+
+    def _check_in_thread(self, order_id):
+        try:
+            return self.check(order_id)
+        finally:
+            # Each thread has its own database connection.
+            connection.close()
+
+    def check(self, order_id):
+        """
+        Update a single order.
+
+        :returns: The updated order, or ``None`` when it failed.
+        :rtype: DocdataOrder | None
+        """
+        counters.increment('reconcile_check')
+        try:
+            with transaction.atomic():
+                order = DocdataOrder.objects.select_for_update().get(pk=order_id)
+                old_status = order.status
+                if old_status not in FINAL_STATUSES:
+                    self.facade.update_order(order)
+        except DocdataOrder.DoesNotExist:
+            return None
+        except Exception:
+            logger.exception("Failed to reconcile Docdata order %s", order_id)
+            return None
+
+        if order.status != old_status:
+            logger.info("Reconciled order %s, status changed from %s to %s", order.merchant_order_id, old_status, order.status)
+            counters.increment('reconcile_changed')
+        return order
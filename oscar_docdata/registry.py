@@ -0,0 +1,112 @@
+"""
+Registry of ready-to-use clients per merchant.
+
+Constructing a :class:`~oscar_docdata.gateway.DocdataClient` creates the merchant node
+and integration info for every call. The registry keeps the clients per merchant and testing mode instead,
+so a burst of status notifications reuses the same client objects.
+"""
+import threading
+from collections import OrderedDict
+
+from django.core.exceptions import ImproperlyConfigured
+from oscar_docdata import appsettings
+from oscar_docdata.gateway import DocdataClient
+
+__all__ = (
+    'ClientRegistry',
+    'client_registry',
+)
+
+
+class ClientRegistry(object):
+    """
+    Thread-safe, bounded registry of :class:`~oscar_docdata.gateway.DocdataClient` objects.
+
+    The clients are stored per merchant name and testing mode.
+    The least recently used client is removed when the registry is full.
+    When the password in ``DOCDATA_MERCHANT_PASSWORDS`` changes, the client is constructed again.
+    """
+
+    def __init__(self, client_class=DocdataClient, max_size=None):
+        self.client_class = client_class
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, merchant_name, testing_mode=None):
+        """
+        Return the client for the merchant, the credentials are read from ``DOCDATA_MERCHANT_PASSWORDS``.
+
+        :rtype: oscar_docdata.gateway.DocdataClient
+        """
+        if testing_mode is None:
+            testing_mode = appsettings.DOCDATA_TESTING
+
+        try:
+            password = appsettings.DOCDATA_MERCHANT_PASSWORDS[merchant_name]
+        except KeyError:
+            raise ImproperlyConfigured("No password provided in DOCDATA_MERCHANT_PASSWORDS for merchant '{0}'".format(merchant_name))
+
+        key = (merchant_name, bool(testing_mode))
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                if entry[0] == password:
+                    self.hits += 1
+                    # Mark as recently used, Python 2 has no OrderedDict.move_to_end()
+                    del self._clients[key]
+                    self._clients[key] = entry
+                    return entry[1]
+
+                # The credentials changed.
+                del self._clients[key]
+                self.invalidations += 1
+
+            self.misses += 1
+
+        # Construct outside the lock, creating the suds client may fetch the WSDL.
+        client = self.client_class(testing_mode=testing_mode, merchant_name=merchant_name, merchant_password=password)
+
+        with self._lock:
+            self._clients[key] = (password, client)
+            max_size = self.max_size if self.max_size is not None else appsettings.DOCDATA_CLIENT_REGISTRY_SIZE
+            while len(self._clients) > max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def invalidate(self, merchant_name=None):
+        """
+        Remove the clients of a merchant, or all clients when no merchant is given.
+        """
+        with self._lock:
+            keys = [key for key in self._clients if merchant_name is None or key[0] == merchant_name]
+            for key in keys:
+                del self._clients[key]
+            self.invalidations += len(keys)
+
+    def stats(self):
+        """
+        Return the hit/miss counters of the registry.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'size': len(self._clients),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def __len__(self):
+        return len(self._clients)
+
+
+#: The registry that the :class:`~oscar_docdata.interface.Interface` uses.
+client_registry = ClientRegistry()
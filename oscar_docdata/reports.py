@@ -0,0 +1,250 @@
+"""
+The data model of the status report.
+
+The report of the ``status`` call is converted into these small immutable objects,
+so no SOAP object tree is kept in memory while the report is processed.
+All amounts are integers in cents, as Docdata sends them.
+
+The objects can be compared and hashed to detect changes, and pickled for caching.
+"""
+import hashlib
+import json
+
+from six import text_type
+
+__all__ = (
+    'StatusReport',
+    'ReportTotals',
+    'PaymentReport',
+    'Authorization',
+    'Transaction',
+)
+
+
+class _Record(object):
+    """
+    Base class for an immutable record.
+    The arguments of ``__init__()`` follow the order of the ``__slots__``.
+    """
+    __slots__ = ()
+
+    # Fields that may differ between otherwise identical replies, these are left out of the fingerprint.
+    volatile_fields = ()
+
+    def _init(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{0} objects are immutable".format(self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{0} objects are immutable".format(self.__class__.__name__))
+
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and self._values() == other._values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __reduce__(self):
+        return (self.__class__, self._values())
+
+    def __repr__(self):
+        return "<{0} {1}>".format(
+            self.__class__.__name__,
+            ", ".join("{0}={1!r}".format(name, getattr(self, name)) for name in self.__slots__)
+        )
+
+
+class StatusReport(_Record):
+    """
+    The status report of a payment cluster.
+
+    :type totals: ReportTotals
+    :type payments: tuple[PaymentReport]
+    """
+    __slots__ = ('totals', 'payments')
+
+    def __init__(self, totals, payments=()):
+        self._init(totals=totals, payments=tuple(payments))
+
+    def fingerprint(self):
+        """
+        Return a digest of the report, which is stable between processes.
+        Unlike ``hash()``, this can be stored to detect whether a report changed.
+        The ``volatile_fields`` (e.g. the exchange rate date) are not included.
+
+        :rtype: str
+        """
+        data = json.dumps(_as_list(self), separators=(',', ':'))
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_suds(cls, report):
+        """
+        Convert the ``statusReport`` object of the suds client.
+        """
+        return cls(
+            totals=ReportTotals.from_suds(report.approximateTotals),
+            payments=[PaymentReport.from_suds(payment) for payment in getattr(report, 'payment', ())],
+        )
+
+
+class ReportTotals(_Record):
+    """
+    The approximate totals of a payment cluster, in cents.
+    """
+    __slots__ = (
+        'exchanged_to',
+        'exchange_rate_date',
+        'total_registered',
+        'total_shopper_pending',
+        'total_acquirer_pending',
+        'total_acquirer_approved',
+        'total_captured',
+        'total_refunded',
+        'total_charged_back',
+        'total_reversed',
+    )
+
+    # Docdata updates the date of the exchange rate, even when nothing else changed.
+    volatile_fields = ('exchange_rate_date',)
+
+    def __init__(
+            self,
+            exchanged_to,
+            exchange_rate_date,
+            total_registered=0,
+            total_shopper_pending=0,
+            total_acquirer_pending=0,
+            total_acquirer_approved=0,
+            total_captured=0,
+            total_refunded=0,
+            total_charged_back=0,
+            total_reversed=0,
+    ):
+        self._init(
+            exchanged_to=exchanged_to,
+            exchange_rate_date=exchange_rate_date,
+            total_registered=int(total_registered),
+            total_shopper_pending=int(total_shopper_pending),
+            total_acquirer_pending=int(total_acquirer_pending),
+            total_acquirer_approved=int(total_acquirer_approved),
+            total_captured=int(total_captured),
+            total_refunded=int(total_refunded),
+            total_charged_back=int(total_charged_back),
+            total_reversed=int(total_reversed),
+        )
+
+    @classmethod
+    def from_suds(cls, totals):
+        return cls(
+            exchanged_to=_text(getattr(totals, '_exchangedTo', None)),
+            exchange_rate_date=_text(getattr(totals, '_exchangeRateDate', None)),
+            total_registered=totals.totalRegistered,
+            total_shopper_pending=totals.totalShopperPending,
+            total_acquirer_pending=totals.totalAcquirerPending,
+            total_acquirer_approved=totals.totalAcquirerApproved,
+            total_captured=totals.totalCaptured,
+            total_refunded=totals.totalRefunded,
+            total_charged_back=totals.totalChargedback,
+            total_reversed=getattr(totals, 'totalReversed', 0),
+        )
+
+
+class PaymentReport(_Record):
+    """
+    A single payment (attempt) of the payment cluster.
+
+    :type authorization: Authorization
+    """
+    __slots__ = ('id', 'payment_method', 'authorization')
+
+    def __init__(self, id, payment_method, authorization):
+        self._init(id=id, payment_method=payment_method, authorization=authorization)
+
+    @classmethod
+    def from_suds(cls, payment):
+        return cls(
+            id=_text(payment.id),
+            payment_method=_text(payment.paymentMethod),
+            authorization=Authorization.from_suds(payment.authorization),
+        )
+
+
+class Authorization(_Record):
+    """
+    The authorization of a payment, with the captures, refunds and chargebacks that happened since.
+    The ``amount`` is in cents.
+
+    :type captures: tuple[Transaction]
+    :type refunds: tuple[Transaction]
+    :type chargebacks: tuple[Transaction]
+    """
+    __slots__ = ('status', 'amount', 'currency', 'confidence_level', 'reason', 'captures', 'refunds', 'chargebacks')
+
+    def __init__(self, status, amount, currency, confidence_level, reason=None, captures=(), refunds=(), chargebacks=()):
+        self._init(
+            status=status,
+            amount=int(amount),
+            currency=currency,
+            confidence_level=confidence_level,
+            reason=reason,
+            captures=tuple(captures),
+            refunds=tuple(refunds),
+            chargebacks=tuple(chargebacks),
+        )
+
+    @classmethod
+    def from_suds(cls, authorization):
+        return cls(
+            status=_text(authorization.status),
+            amount=authorization.amount.value,
+            currency=_text(authorization.amount._currency),
+            confidence_level=_text(authorization.confidenceLevel) or '',
+            reason=_text(getattr(authorization, 'reason', None)),
+            captures=[Transaction.from_suds(t) for t in getattr(authorization, 'capture', ())],
+            refunds=[Transaction.from_suds(t) for t in getattr(authorization, 'refund', ())],
+            chargebacks=[Transaction.from_suds(t) for t in getattr(authorization, 'chargeback', ())],
+        )
+
+
+class Transaction(_Record):
+    """
+    A capture, refund or chargeback of an authorization.
+    The ``amount`` is in cents.
+    """
+    __slots__ = ('status', 'amount', 'currency', 'reason')
+
+    def __init__(self, status, amount, currency, reason=None):
+        self._init(status=status, amount=int(amount), currency=currency, reason=reason)
+
+    @classmethod
+    def from_suds(cls, transaction):
+        return cls(
+            status=_text(transaction.status),
+            amount=transaction.amount.value,
+            currency=_text(transaction.amount._currency),
+            reason=_text(getattr(transaction, 'reason', None)),
+        )
+
+
+def _text(value):
+    # Convert the suds Text objects to plain strings, so the records stay small and picklable.
+    return None if value is None else text_type(value)
+
+
+def _as_list(value):
+    # Convert the records to plain JSON values, without the volatile fields.
+    if isinstance(value, _Record):
+        return [_as_list(getattr(value, name)) for name in value.__slots__ if name not in value.volatile_fields]
+    elif isinstance(value, tuple):
+        return [_as_list(v) for v in value]
+    return value
@@ -0,0 +1,123 @@
+"""
+Retries of the idempotent Docdata calls.
+
+A status request that fails because of a dropped connection, a timeout or a 5xx error of Docdata
+is performed again after an exponential backoff with "full jitter", so processes that failed at
+the same moment don't retry at the same moment too. The retries stop after ``DOCDATA_RETRY_ATTEMPTS``
+attempts, or when the next attempt would exceed the ``DOCDATA_RETRY_BUDGET`` or the deadline of the call.
+
+Only the operations in :data:`IDEMPOTENT_OPERATIONS` are retried.
+Retrying a ``create`` call could start a second payment session for the same order.
+"""
+import random
+import socket
+import time
+
+from six.moves import http_client
+from six.moves.urllib.error import URLError
+
+from oscar_docdata import appsettings
+from oscar_docdata.exceptions import DocdataTimeout
+from oscar_docdata.metrics import counters
+
+__all__ = (
+    'IDEMPOTENT_OPERATIONS',
+    'is_transient_error',
+    'RetryPolicy',
+    'get_retry_policy',
+)
+
+#: The operations that can safely be performed again.
+IDEMPOTENT_OPERATIONS = frozenset([
+    'status',
+    'statusExtended',
+])
+
+
+def is_transient_error(exception):
+    """
+    Tell whether the call failed because of a temporary problem, which could succeed when it's performed again.
+    """
+    if isinstance(exception, (DocdataTimeout, URLError, socket.error, http_client.HTTPException)):
+        return True
+
+    # suds raises a plain Exception((status, description)) for HTTP errors that don't contain a SOAP fault.
+    if type(exception) is Exception and len(exception.args) == 1:
+        error = exception.args[0]
+        return isinstance(error, tuple) and len(error) == 2 and isinstance(error[0], int) and error[0] >= 500
+
+    return False
+
+
+class RetryPolicy(object):
+    """
+    Decide whether and when a failed call is performed again.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=5, budget=10):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+
+    def get_backoff(self, attempt):
+        """
+        Return a random delay before the next attempt, the upper bound doubles with each attempt.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get_retry_delay(self, operation, attempt, exception, started, deadline=None):
+        """
+        Return the seconds to wait before the call is performed again, or ``None`` when it should fail.
+
+        :param attempt: The number of the failed attempt, starting at 0.
+        :param started: The time (as ``time.time()`` value) the first attempt was started.
+        :param deadline: The time (as ``time.time()`` value) the call should be completed.
+        """
+        if operation not in IDEMPOTENT_OPERATIONS or not is_transient_error(exception):
+            return None
+
+        delay = self.get_backoff(attempt)
+        retry_at = time.time() + delay
+        if attempt + 1 >= self.max_attempts \
+                or retry_at - started > self.budget \
+                or (deadline is not None and retry_at >= deadline):
+            counters.increment('retry_exhausted')
+            return None
+
+        counters.increment('retry_attempt')
+        return delay
+
+    def call(self, operation, func, deadline=None):
+        """
+        Perform the call, and retry it when it failed with a transient error.
+        """
+        started = time.time()
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                delay = self.get_retry_delay(operation, attempt, e, started, deadline)
+                if delay is None:
+                    raise
+
+            time.sleep(delay)
+            attempt += 1
+
+
+def get_retry_policy():
+    """
+    Return the retry policy of the ``DOCDATA_RETRY_*`` settings, or ``None`` when retries are disabled.
+
+    :rtype: RetryPolicy | None
+    """
+    if appsettings.DOCDATA_RETRY_ATTEMPTS <= 1:
+        return None
+
+    return RetryPolicy(
+        max_attempts=appsettings.DOCDATA_RETRY_ATTEMPTS,
+        backoff=appsettings.DOCDATA_RETRY_BACKOFF,
+        max_backoff=appsettings.DOCDATA_RETRY_MAX_BACKOFF,
+        budget=appsettings.DOCDATA_RETRY_BUDGET,
+    )
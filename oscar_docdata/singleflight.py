@@ -0,0 +1,109 @@
+"""
+Coalescing of concurrent status requests for the same order.
+
+When the shopper returns from the payment menu, Docdata often calls the notification URL at the same time.
+Both requests would fetch the same status. With a single-flight, the first caller performs the call,
+and the other callers (in any process) wait for its result.
+
+The coordination happens via the Django cache, so the cache needs to be shared between the processes
+(e.g. memcached, Redis or the database cache backend).
+"""
+import logging
+import time
+import uuid
+
+from django.core.cache import caches
+from oscar_docdata import appsettings
+from oscar_docdata.exceptions import DocdataTimeout
+from oscar_docdata.metrics import counters
+
+logger = logging.getLogger(__name__)
+
+__all__ = (
+    'SingleFlight',
+    'get_single_flight',
+)
+
+_MISSING = object()
+
+
+class SingleFlight(object):
+    """
+    Perform only one call at a time for each key, and share the result with the concurrent callers.
+
+    Exceptions are not shared; when the first caller fails, the waiting callers perform the call themselves.
+    The same happens when the result doesn't arrive within the ``timeout``.
+    """
+
+    def __init__(self, cache, timeout=10, poll_interval=0.05, prefix='oscar_docdata:flight:'):
+        self.cache = cache
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+
+    def call(self, key, func, deadline=None, operation='status'):
+        """
+        Perform the call, or wait for the result of the same call in another thread or process.
+
+        :param deadline: The time (as :func:`time.time` value) at which waiting for the result should be given up.
+        :param operation: The name of the Docdata operation, for the :class:`~oscar_docdata.exceptions.DocdataTimeout` error.
+        :raises DocdataTimeout: When the deadline passed while waiting for the other caller.
+        """
+        lock_key = self.prefix + key
+        token = uuid.uuid4().hex
+        if self.cache.add(lock_key, token, self.timeout):
+            return self._lead(lock_key, token, func)
+        else:
+            return self._follow(lock_key, func, deadline, operation)
+
+    def _result_key(self, token):
+        return self.prefix + 'result:' + token
+
+    def _lead(self, lock_key, token, func):
+        counters.increment('single_flight_call')
+        try:
+            result = func()
+        except Exception:
+            self.cache.delete(lock_key)
+            raise
+
+        # Store the result before releasing the lock, so the waiting callers always find it.
+        self.cache.set(self._result_key(token), result, self.timeout)
+        self.cache.delete(lock_key)
+        return result
+
+    def _follow(self, lock_key, func, deadline, operation):
+        wait_until = time.time() + self.timeout
+        if deadline is not None:
+            wait_until = min(wait_until, deadline)
+
+        token = self.cache.get(lock_key)
+        while token is not None and time.time() < wait_until:
+            time.sleep(max(0, min(self.poll_interval, wait_until - time.time())))
+            result = self.cache.get(self._result_key(token), _MISSING)
+            if result is not _MISSING:
+                counters.increment('single_flight_shared')
+                return result
+
+            if self.cache.get(lock_key) != token:
+                # The first caller failed, or the result expired already.
+                break
+
+        if deadline is not None and time.time() >= deadline:
+            counters.increment('single_flight_timeout')
+            raise DocdataTimeout(operation)
+
+        logger.debug("Single-flight %s: no result to share, performing the call.", lock_key)
+        counters.increment('single_flight_fallback')
+        return func()
+
+
+def get_single_flight():
+    """
+    Return the single-flight of the ``DOCDATA_SINGLE_FLIGHT_CACHE`` setting.
+
+    :rtype: SingleFlight | None
+    """
+    if not appsettings.DOCDATA_SINGLE_FLIGHT_CACHE:
+        return None
+    return SingleFlight(caches[appsettings.DOCDATA_SINGLE_FLIGHT_CACHE], timeout=appsettings.DOCDATA_SINGLE_FLIGHT_TIMEOUT)
@@ -0,0 +1,55 @@
+"""
+Short-lived cache of the status reports.
+
+The dashboard, return view, notification view and management commands often request
+the status of the same order within a few seconds. With ``DOCDATA_STATUS_CACHE``,
+the :class:`~oscar_docdata.reports.StatusReport` is kept in a Django cache for ``DOCDATA_STATUS_CACHE_TTL`` seconds.
+"""
+import hashlib
+
+from django.core.cache import caches
+from oscar_docdata import appsettings
+
+__all__ = (
+    'StatusCache',
+    'get_status_cache',
+)
+
+
+class StatusCache(object):
+    """
+    Store the status reports per merchant and order key in a Django cache.
+    """
+
+    def __init__(self, cache, ttl, prefix='oscar_docdata:status:'):
+        self.cache = cache
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get_key(self, merchant_name, order_key, testing_mode):
+        # Hashed, as not all cache backends accept every character in the key.
+        value = u"{0}\n{1}\n{2}".format(merchant_name, order_key, int(bool(testing_mode)))
+        return self.prefix + hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    def get(self, merchant_name, order_key, testing_mode):
+        """
+        :rtype: oscar_docdata.reports.StatusReport | None
+        """
+        return self.cache.get(self.get_key(merchant_name, order_key, testing_mode))
+
+    def set(self, merchant_name, order_key, testing_mode, report):
+        self.cache.set(self.get_key(merchant_name, order_key, testing_mode), report, self.ttl)
+
+    def delete(self, merchant_name, order_key, testing_mode):
+        self.cache.delete(self.get_key(merchant_name, order_key, testing_mode))
+
+
+def get_status_cache():
+    """
+    Return the status cache of the ``DOCDATA_STATUS_CACHE`` setting.
+
+    :rtype: StatusCache | None
+    """
+    if not appsettings.DOCDATA_STATUS_CACHE:
+        return None
+    return StatusCache(caches[appsettings.DOCDATA_STATUS_CACHE], ttl=appsettings.DOCDATA_STATUS_CACHE_TTL)
@@ -0,0 +1,185 @@
+"""
+Incremental parser for the reply of the ``status`` call.
+
+Parsing the reply with suds builds a generic object tree of the whole response.
+This parser reads the ``statusResponse`` element by element instead,
+and produces the :mod:`~oscar_docdata.reports` objects for the totals and each payment.
+Processed elements are discarded directly, so memory use stays flat for clusters with many payments.
+"""
+from io import BytesIO
+
+from oscar_docdata.reports import Authorization, PaymentReport, ReportTotals, StatusReport, Transaction
+
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+ParseError = ElementTree.ParseError
+
+__all__ = (
+    'ParseError',
+    'iter_status_records',
+    'parse_status_response',
+    'ReportError',
+)
+
+NS = '{http://www.docdatapayments.com/services/paymentservice/1_3/}'
+
+TAG_REPORT = NS + 'report'
+TAG_TOTALS = NS + 'approximateTotals'
+TAG_PAYMENT = NS + 'payment'
+TAG_STATUS_ERRORS = NS + 'statusErrors'
+TAG_ERROR = NS + 'error'
+
+TOTALS_FIELDS = (
+    ('totalRegistered', 'total_registered'),
+    ('totalShopperPending', 'total_shopper_pending'),
+    ('totalAcquirerPending', 'total_acquirer_pending'),
+    ('totalAcquirerApproved', 'total_acquirer_approved'),
+    ('totalCaptured', 'total_captured'),
+    ('totalRefunded', 'total_refunded'),
+    ('totalChargedback', 'total_charged_back'),
+    ('totalReversed', 'total_reversed'),
+)
+
+
+class ReportError(object):
+    """
+    An error of the ``statusErrors`` reply.
+    """
+    def __init__(self, code, value):
+        self._code = code
+        self.value = value
+
+    def __repr__(self):
+        return "<ReportError {0}: {1}>".format(self._code, self.value)
+
+
+def _text(element, tag, default=None):
+    child = element.find(NS + tag)
+    if child is None:
+        return default
+    return child.text or ''
+
+
+def _required(element, tag):
+    child = element.find(NS + tag)
+    if child is None:
+        raise ParseError("Missing <{0}> in <{1}>".format(tag, element.tag.replace(NS, '')))
+    return child
+
+
+def _create(record_class, **kwargs):
+    # The records convert the amounts to integers.
+    try:
+        return record_class(**kwargs)
+    except (TypeError, ValueError) as e:
+        raise ParseError("Invalid {0}: {1}".format(record_class.__name__, e))
+
+
+def _read_transactions(element, tag):
+    transactions = []
+    for child in element.iterfind(NS + tag):
+        amount = _required(child, 'amount')
+        transactions.append(_create(
+            Transaction,
+            status=_text(child, 'status'),
+            amount=amount.text,
+            currency=amount.get('currency'),
+            reason=_text(child, 'reason'),
+        ))
+    return transactions
+
+
+def _read_totals(element):
+    totals = dict((name, _text(element, tag, 0)) for tag, name in TOTALS_FIELDS)
+    return _create(ReportTotals, exchanged_to=element.get('exchangedTo'), exchange_rate_date=element.get('exchangeRateDate'), **totals)
+
+
+def _read_payment(element):
+    auth = _required(element, 'authorization')
+    amount = _required(auth, 'amount')
+    return PaymentReport(
+        id=_text(element, 'id'),
+        payment_method=_text(element, 'paymentMethod'),
+        authorization=_create(
+            Authorization,
+            status=_text(auth, 'status'),
+            amount=amount.text,
+            currency=amount.get('currency'),
+            confidence_level=_text(auth, 'confidenceLevel', ''),
+            reason=_text(auth, 'reason'),
+            captures=_read_transactions(auth, 'capture'),
+            refunds=_read_transactions(auth, 'refund'),
+            chargebacks=_read_transactions(auth, 'chargeback'),
+        )
+    )
+
+
+def iter_status_records(source):
+    """
+    Read the reply of the ``status`` call, and yield the records as soon as they're read.
+    This yields a :class:`~oscar_docdata.reports.ReportTotals`,
+    and a :class:`~oscar_docdata.reports.PaymentReport` for each payment,
+    or a :class:`ReportError` for each error.
+
+    :param source: The SOAP reply, as bytes or file object.
+    :returns: An iterator of records. When the reply isn't a ``statusResponse`` (e.g. a SOAP fault), nothing is yielded.
+    :raises ParseError: When the reply isn't valid XML, or a record misses required fields.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+
+    depth = 0
+    report = None
+    report_depth = None
+    in_errors = False
+    for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if element.tag == TAG_REPORT:
+                report = element
+                report_depth = depth
+            elif element.tag == TAG_STATUS_ERRORS:
+                in_errors = True
+            continue
+
+        depth -= 1
+        if report is not None and depth == report_depth:
+            # A direct child of the report is complete.
+            if element.tag == TAG_TOTALS:
+                yield _read_totals(element)
+            elif element.tag == TAG_PAYMENT:
+                yield _read_payment(element)
+
+            # Free the memory of the processed element.
+            report.remove(element)
+        elif in_errors and element.tag == TAG_ERROR:
+            yield ReportError(element.get('code'), element.text or '')
+
+
+def parse_status_response(source):
+    """
+    Read the reply of the ``status`` call.
+
+    :returns: The :class:`~oscar_docdata.reports.StatusReport`, or the list of :class:`ReportError` objects.
+              When the reply doesn't contain a ``statusResponse``, ``None`` is returned.
+    :rtype: StatusReport | list[ReportError] | None
+    """
+    totals = None
+    payments = []
+    errors = []
+    for record in iter_status_records(source):
+        if isinstance(record, ReportTotals):
+            totals = record
+        elif isinstance(record, PaymentReport):
+            payments.append(record)
+        else:
+            errors.append(record)
+
+    if errors:
+        return errors
+    elif totals is None:
+        return None
+    return StatusReport(totals, payments)
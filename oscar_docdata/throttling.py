@@ -0,0 +1,157 @@
+"""
+Limit the rate of the calls to the Docdata API.
+"""
+import hashlib
+import threading
+import time
+
+from django.core.cache import caches
+from oscar_docdata import appsettings
+from oscar_docdata.metrics import counters
+
+__all__ = (
+    'RateLimiter',
+    'TokenBucket',
+    'get_token_bucket',
+    'PRIORITY_HIGH',
+    'PRIORITY_LOW',
+)
+
+PRIORITY_HIGH = 'high'
+PRIORITY_LOW = 'low'
+
+
+class RateLimiter(object):
+    """
+    Thread-safe limiter that spaces calls evenly, to at most ``rate`` calls per second.
+    When ``rate`` is ``None``, calls are not limited.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next_call = 0
+
+    def reserve(self):
+        """
+        Reserve the next call slot, without waiting for it.
+
+        :returns: The number of seconds until the call is allowed.
+        """
+        if not self.interval:
+            return 0
+
+        with self._lock:
+            now = time.time()
+            call_at = max(now, self._next_call)
+            self._next_call = call_at + self.interval
+
+        return call_at - now
+
+    def wait(self):
+        """
+        Wait until the next call is allowed.
+
+        :returns: The number of seconds waited.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class TokenBucket(object):
+    """
+    Token bucket that is shared between processes, by storing the state in a Django cache.
+
+    The bucket holds at most ``burst`` tokens, and is refilled with ``rate`` tokens per second.
+    There are two priority lanes: calls in the low priority lane leave a ``reserve`` fraction
+    of the bucket for the high priority calls, and high priority calls are queued ahead of them.
+    """
+
+    def __init__(self, cache, rate, burst=None, reserve=0.25, prefix='oscar_docdata:bucket:', lock_timeout=1.0):
+        self.cache = cache
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.reserve = reserve
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+
+    def get_key(self, name):
+        # Hashed, as not all cache backends accept every character in the key.
+        return self.prefix + hashlib.sha1(name.encode('utf-8')).hexdigest()
+
+    def acquire(self, name, priority=PRIORITY_HIGH):
+        """
+        Try to take a token from the bucket.
+
+        A high priority call always receives a token, but may have to wait for it.
+        A low priority call only receives a token when one is available directly,
+        otherwise it should try again after the returned delay.
+
+        :returns: Whether a token is taken, and the number of seconds to wait.
+        :rtype: tuple[bool, float]
+        """
+        key = self.get_key(name)
+        lock_key = key + ':lock'
+        deadline = time.time() + self.lock_timeout
+        while not self.cache.add(lock_key, 1, 5):
+            if time.time() > deadline:
+                # Don't block the calls when a process died while holding the lock.
+                counters.increment('rate_limit_lock_timeout')
+                return True, 0
+            time.sleep(0.005)
+
+        try:
+            now = time.time()
+            tokens, updated = self.cache.get(key) or (self.burst, now)
+            tokens = min(self.burst, tokens + max(now - updated, 0) * self.rate)
+
+            # The low priority lane keeps a part of the bucket free.
+            floor = self.burst * self.reserve if priority == PRIORITY_LOW else 0
+            delay = max(floor + 1 - tokens, 0) / self.rate
+            taken = priority != PRIORITY_LOW or not delay
+            if taken:
+                # A high priority call can reserve a future token, the bucket goes below zero then.
+                tokens -= 1
+            self.cache.set(key, (tokens, now), max(int(self.burst / self.rate) * 2, 60))
+        finally:
+            self.cache.delete(lock_key)
+
+        return taken, delay
+
+    def wait(self, name, priority=PRIORITY_HIGH):
+        """
+        Wait until a call is allowed.
+
+        :returns: The number of seconds waited.
+        """
+        waited = 0
+        while True:
+            taken, delay = self.acquire(name, priority)
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+            if taken:
+                break
+
+        if waited:
+            counters.increment('rate_limit_delayed')
+            counters.increment('rate_limit_wait_seconds', waited)
+        return waited
+
+
+def get_token_bucket():
+    """
+    Return the token bucket of the ``DOCDATA_RATE_LIMIT`` setting.
+
+    :rtype: TokenBucket | None
+    """
+    if not appsettings.DOCDATA_RATE_LIMIT:
+        return None
+    return TokenBucket(
+        caches[appsettings.DOCDATA_RATE_LIMIT_CACHE],
+        rate=appsettings.DOCDATA_RATE_LIMIT,
+        burst=appsettings.DOCDATA_RATE_LIMIT_BURST,
+        reserve=appsettings.DOCDATA_RATE_LIMIT_RESERVE,
+    )
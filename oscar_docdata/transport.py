@@ -0,0 +1,390 @@
+"""
+HTTP transport for the suds client, which reuses connections.
+
+The default suds transport uses urllib, which opens a new TCP+TLS connection for every SOAP call.
+This transport keeps the connections open (HTTP keep-alive) in a bounded, thread-safe pool,
+so the TLS handshake is only paid once per connection.
+
+Like the gateway, this module is ignorant of Oscar.
+"""
+import base64
+import importlib
+import logging
+import re
+import select
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import suds
+import suds.transport
+from six.moves import http_client
+from six.moves.urllib.error import URLError
+from six.moves.urllib.parse import unquote, urlsplit
+from six.moves.urllib.request import getproxies, proxy_bypass
+
+from oscar_docdata import appsettings
+
+logger = logging.getLogger(__name__)
+
+__all__ = (
+    'get_transport',
+    'get_connection_pool',
+    'ConnectionPool',
+    'ConnectionPoolTimeout',
+    'PooledHttpTransport',
+    'get_proxy',
+    'request_timeout',
+    'get_request_timeout',
+)
+
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+_local = threading.local()
+
+RE_KEEP_ALIVE_TIMEOUT = re.compile(r'timeout=(\d+)')
+
+
+def get_transport():
+    """
+    Create the transport object for the suds client.
+    This reads the ``DOCDATA_TRANSPORT_CLASS`` setting.
+
+    :rtype: suds.transport.Transport
+    """
+    mod_name, class_name = appsettings.DOCDATA_TRANSPORT_CLASS.rsplit('.', 1)
+    TransportClass = getattr(importlib.import_module(mod_name), class_name)
+    return TransportClass()
+
+
+@contextmanager
+def request_timeout(timeout):
+    """
+    Apply a timeout to the requests that are sent by the current thread.
+    The suds client is shared between threads, so its ``timeout`` option can't be changed per call.
+    """
+    previous = getattr(_local, 'timeout', None)
+    _local.timeout = timeout
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+
+def get_request_timeout():
+    """
+    Return the timeout of :func:`request_timeout` for the current thread.
+    """
+    return getattr(_local, 'timeout', None)
+
+
+def get_connection_pool():
+    """
+    Return the connection pool that is shared by all transports in this process.
+
+    :rtype: ConnectionPool
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = ConnectionPool(
+                    max_connections=appsettings.DOCDATA_HTTP_POOL_SIZE,
+                    idle_timeout=appsettings.DOCDATA_HTTP_POOL_IDLE_TIMEOUT,
+                )
+    return _connection_pool
+
+
+class ConnectionPoolTimeout(URLError):
+    """
+    No connection became available in time.
+    """
+
+
+class ConnectionPool(object):
+    """
+    A bounded, thread-safe pool of keep-alive HTTP connections.
+
+    At most ``max_connections`` connections are opened per host,
+    further requests wait until a connection is released.
+    Connections that were idle for more than ``idle_timeout`` seconds are closed,
+    as the server likely closed them already. When the server announces a shorter
+    timeout in the ``Keep-Alive`` header, that timeout is used instead.
+    """
+    connection_classes = {
+        'http': http_client.HTTPConnection,
+        'https': http_client.HTTPSConnection,
+    }
+
+    # The maximum wait for a free connection, when the request has no timeout.
+    default_wait_timeout = 30
+
+    def __init__(self, max_connections=4, idle_timeout=5):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._idle = {}    # key: [(connection, expires_at), ...]
+        self._in_use = {}  # key: number of connections handed out
+
+    def acquire(self, scheme, host, port, timeout=None, proxy=None):
+        """
+        Get a connection for the host, either an idle one or a new one.
+        The connection needs to be returned with :func:`release`.
+
+        :param proxy: The ``(host, port, authorization)`` of the HTTP proxy, see :func:`get_proxy`.
+        :returns: A tuple of the connection, and whether it's reused.
+        """
+        key = (scheme, host, port, proxy)
+        self._reserve(key, timeout or self.default_wait_timeout)
+        try:
+            connection = self._pop_idle(key)
+            if connection is not None:
+                # Apply the timeout of the current request.
+                connection.timeout = timeout
+                connection.sock.settimeout(timeout)
+                return connection, True
+
+            connection_class = self.connection_classes[scheme]
+            if proxy is None:
+                return connection_class(host, port, timeout=timeout), False
+
+            proxy_host, proxy_port, authorization = proxy
+            connection = connection_class(proxy_host, proxy_port, timeout=timeout)
+            if scheme == 'https':
+                # Tunnel the TLS connection through the proxy.
+                headers = {'Proxy-Authorization': authorization} if authorization else None
+                connection.set_tunnel(host, port, headers=headers)
+            return connection, False
+        except Exception:
+            self._unreserve(key)
+            raise
+
+    def release(self, connection, scheme, host, port, reusable=True, keep_alive=None, proxy=None):
+        """
+        Return the connection to the pool.
+        When the connection can't be reused, it's closed instead.
+
+        :param keep_alive: The idle timeout the server announced for this connection.
+        """
+        key = (scheme, host, port, proxy)
+        try:
+            if reusable and connection.sock is not None:
+                idle_timeout = self.idle_timeout
+                if keep_alive is not None:
+                    # Give back the connection just before the server closes it.
+                    idle_timeout = min(idle_timeout, keep_alive - 1)
+
+                if idle_timeout > 0:
+                    with self._lock:
+                        self._idle.setdefault(key, []).append((connection, self._now() + idle_timeout))
+                else:
+                    connection.close()
+            else:
+                connection.close()
+        finally:
+            self._unreserve(key)
+
+    def clear(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+
+        for connections in idle.values():
+            for connection, expires_at in connections:
+                connection.close()
+
+    def _now(self):
+        return time.time()
+
+    def _reserve(self, key, timeout):
+        deadline = self._now() + timeout
+        with self._released:
+            while self._in_use.get(key, 0) >= self.max_connections:
+                remaining = deadline - self._now()
+                if remaining <= 0:
+                    raise ConnectionPoolTimeout("No connection to {0} available within {1} seconds".format(key[1], timeout))
+                self._released.wait(remaining)
+
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+
+    def _unreserve(self, key):
+        with self._released:
+            self._in_use[key] -= 1
+            self._released.notify()
+
+    def _pop_idle(self, key):
+        now = self._now()
+        expired = []
+        connection = None
+        with self._lock:
+            connections = self._idle.get(key, [])
+            while connections:
+                candidate, expires_at = connections.pop()  # Most recently used first.
+                if expires_at <= now or _is_closed(candidate.sock):
+                    expired.append(candidate)
+                else:
+                    connection = candidate
+                    break
+
+            # Evict the older connections that expired too.
+            expired.extend(c for (c, t) in connections if t <= now)
+            connections[:] = [(c, t) for (c, t) in connections if t > now]
+
+        for candidate in expired:
+            candidate.close()
+        return connection
+
+
+def _is_closed(sock):
+    """
+    Tell whether the server closed the idle connection.
+    An idle socket only becomes readable when the server closed it.
+    """
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (ValueError, select.error, socket.error):
+        return True
+    return bool(readable)
+
+
+class PooledHttpTransport(suds.transport.Transport):
+    """
+    A suds transport that sends the requests over pooled keep-alive connections.
+
+    Connection errors are raised as :class:`~urllib.error.URLError`, like the default suds transport does.
+    The ``proxy`` option of the suds client is used, otherwise the proxies of the environment
+    (e.g. ``HTTPS_PROXY`` and ``NO_PROXY``) are used. HTTPS requests are tunneled through the proxy.
+    Note that cookies are not supported by this transport,
+    use ``DOCDATA_TRANSPORT_CLASS = 'suds.transport.https.HttpAuthenticated'`` for those.
+    """
+    # The errors that happen when the server closed a keep-alive connection before the request was read.
+    stale_connection_errors = (http_client.BadStatusLine, http_client.CannotSendRequest, socket.error)
+
+    def __init__(self, pool=None):
+        suds.transport.Transport.__init__(self)
+        self.pool = pool
+
+    def get_pool(self):
+        """
+        Return the connection pool, by default the pool is shared between all transports.
+
+        :rtype: ConnectionPool
+        """
+        return self.pool if self.pool is not None else get_connection_pool()
+
+    def open(self, request):
+        status, headers, body = self._request('GET', request)
+        if status >= 300:
+            raise suds.transport.TransportError(http_client.responses.get(status, ''), status, suds.BytesIO(body))
+        return suds.BytesIO(body)
+
+    def send(self, request):
+        status, headers, body = self._request('POST', request)
+        if status in (http_client.ACCEPTED, http_client.NO_CONTENT):
+            return None
+        elif status >= 300:
+            raise suds.transport.TransportError(http_client.responses.get(status, ''), status, suds.BytesIO(body))
+        return suds.transport.Reply(http_client.OK, headers, body)
+
+    def _request(self, method, request):
+        parts = urlsplit(request.url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise URLError("Unsupported URL scheme: {0}".format(request.url))
+
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        headers = request.headers
+        proxy = get_proxy(scheme, parts.hostname, self.options.proxy)
+        if proxy is not None and scheme == 'http':
+            # Plain HTTP requests are sent to the proxy with the full URL.
+            path = request.url
+            if proxy[2]:
+                headers = dict(headers, **{'Proxy-Authorization': proxy[2]})
+
+        # The timeout of the request object is only available in newer suds versions.
+        timeout = get_request_timeout() or getattr(request, 'timeout', None) or self.options.timeout
+        pool = self.get_pool()
+        address = (scheme, parts.hostname, parts.port)
+
+        while True:
+            connection, is_reused = pool.acquire(*address, timeout=timeout, proxy=proxy)
+            reusable = False
+            keep_alive = None
+            request_sent = False
+            try:
+                connection.request(method, path, request.message, headers)
+                request_sent = True
+                response = connection.getresponse()
+                body = response.read()
+                reusable = not response.will_close
+                keep_alive = _get_keep_alive_timeout(response)
+                return response.status, dict(response.getheaders()), body
+            except self.stale_connection_errors as e:
+                # When the server closed the keep-alive connection in the meantime,
+                # no response was received at all. The request was not processed, so it's safe to resend.
+                if is_reused and _is_stale_connection_error(e, request_sent):
+                    logger.debug("Reopening stale connection to %s", parts.hostname)
+                    continue
+                raise URLError(e)
+            except http_client.HTTPException as e:
+                # e.g. IncompleteRead or LineTooLong, raised like the connection errors.
+                raise URLError(e)
+            finally:
+                pool.release(connection, *address, reusable=reusable, keep_alive=keep_alive, proxy=proxy)
+
+
+def get_proxy(scheme, host, proxies=None):
+    """
+    Return the HTTP proxy to use for the host, as ``(host, port, authorization)`` tuple.
+    The ``proxies`` are defined like the suds ``proxy`` option (``{'https': 'host:port'}``).
+    When those are not given, the proxies of the environment are used.
+
+    :rtype: tuple | None
+    """
+    if not proxies:
+        if proxy_bypass(host):
+            return None
+        proxies = getproxies()
+
+    proxy_url = proxies.get(scheme)
+    if not proxy_url:
+        return None
+    if '://' not in proxy_url:
+        proxy_url = 'http://' + proxy_url
+
+    parts = urlsplit(proxy_url)
+    authorization = None
+    if parts.username:
+        credentials = u"{0}:{1}".format(unquote(parts.username), unquote(parts.password or ''))
+        authorization = 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+    return parts.hostname, parts.port or 80, authorization
+
+
+def _is_stale_connection_error(exception, request_sent):
+    if isinstance(exception, socket.timeout):
+        # The server might still process the request.
+        return False
+    if not request_sent:
+        # Sending the request failed, so the server didn't receive a complete request.
+        return True
+    if isinstance(exception, http_client.BadStatusLine):
+        # RemoteDisconnected, or an empty status line; the server closed the connection without reading the request.
+        return not exception.line or exception.line in ("''", '""')
+    # The server received the request, and might have processed it (e.g. a connection reset while reading the response).
+    # Sending it again could create or cancel a payment twice.
+    return False
+
+
+def _get_keep_alive_timeout(response):
+    match = RE_KEEP_ALIVE_TIMEOUT.search(response.getheader('Keep-Alive') or '')
+    return int(match.group(1)) if match else None
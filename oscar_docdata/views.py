@@ -1,5 +1,6 @@
 import logging
 
+import six
 from django.db import transaction
 from django.http import (
     HttpResponseBadRequest, HttpResponseRedirect, HttpResponse,
@@ -8,9 +9,11 @@ from django.utils import translation
 from django.views.generic import View
 
 from oscar_docdata import appsettings
-from oscar_docdata.exceptions import DocdataStatusError
+from oscar_docdata.exceptions import DocdataStatusError, DocdataUnavailable, OrderUpdateConflict
 from oscar_docdata.facade import get_facade
+from oscar_docdata.gateway import get_deadline
 from oscar_docdata.models import DocdataOrder
+from oscar_docdata import notifications
 from oscar_docdata.signals import return_view_called, status_changed_view_called
 
 logger = logging.getLogger(__name__)
@@ -30,6 +33,12 @@ class UpdateOrderMixin(object):
     # but setting ``DOCDATA_FACADE_CLASS`` is a better option nowadays.
     facade_class = None
 
+    # Fetch the status before locking the order, see ``DOCDATA_FETCH_STATUS_OUTSIDE_LOCK``.
+    fetch_status_outside_lock = appsettings.DOCDATA_FETCH_STATUS_OUTSIDE_LOCK
+
+    # The maximum number of seconds to wait for the status, ``None`` uses the ``DOCDATA_TIMEOUTS``.
+    update_timeout = None
+
     def get_facade(self):
         if self.facade_class is not None:
             return self.facade_class()
@@ -43,23 +52,63 @@ class UpdateOrderMixin(object):
         except KeyError:
             raise KeyError("Missing {0} parameter".format(self.order_query_arg))
 
-    def get_order(self, order_slug):
+    def get_order(self, order_slug, lock=True):
         """
         Update the status of an order, by fetching the latest state from docdata.
         """
         # Try to find the order and when found, lock the row.
         # NOTE: you need to call this function inside a transaction!
+        queryset = DocdataOrder.objects.active_merchants()
+        if lock:
+            queryset = queryset.select_for_update()
 
         try:
-            return DocdataOrder.objects.select_for_update().active_merchants().get(**{self.order_slug_field: order_slug})
+            return queryset.get(**{self.order_slug_field: order_slug})
         except DocdataOrder.DoesNotExist:
             logger.error("Order {0}='%s' not found to update payment status.".format(self.order_slug_field), order_slug)
             raise Http404(u"Order {0}='{1}' not found!".format(self.order_slug_field, order_slug))
 
-    def update_order(self, order):
+    def update_order(self, order, **kwargs):
         # Ask the facade to request the status, and update the order accordingly.
         facade = self.get_facade()
-        facade.update_order(order)
+        facade.update_order(order, **kwargs)
+
+    def update_order_optimistic(self, order, **kwargs):
+        """
+        Update the order with ``fetch_status_outside_lock``, the order is not locked yet.
+        Override this together with :func:`update_order` to customize both update paths.
+
+        :returns: The updated order object.
+        """
+        return self.get_facade().update_order_optimistic(order, **kwargs)
+
+    def get_updated_order(self, order_slug):
+        """
+        Find the order, and update it with the latest status from docdata.
+        """
+        # Only pass the deadline when it's used, so existing overrides of update_order() keep working.
+        kwargs = {}
+        if self.update_timeout:
+            kwargs['deadline'] = get_deadline(self.update_timeout)
+
+        if self.fetch_status_outside_lock and not self._has_custom_update_order():
+            # The order is only locked while the fetched status is stored.
+            order = self.get_order(order_slug, lock=False)
+            return self.update_order_optimistic(order, **kwargs)
+        else:
+            # Keep the order locked during the remote call.
+            with transaction.atomic():
+                order = self.get_order(order_slug)
+                self.update_order(order, **kwargs)
+            return order
+
+    def _has_custom_update_order(self):
+        # When only update_order() is overwritten, the optimistic update would skip it.
+        # Keep using the locked update then, which calls update_order().
+        def _is_overwritten(name):
+            return six.get_unbound_function(getattr(self.__class__, name)) is not six.get_unbound_function(getattr(UpdateOrderMixin, name))
+
+        return _is_overwritten('update_order') and not _is_overwritten('update_order_optimistic')
 
 
 class OrderReturnView(UpdateOrderMixin, View):
@@ -86,6 +135,7 @@ class OrderReturnView(UpdateOrderMixin, View):
     pending_url = appsettings.DOCDATA_PENDING_URL
     cancelled_url = appsettings.DOCDATA_CANCELLED_URL
     error_url = appsettings.DOCDATA_ERROR_URL
+    update_timeout = appsettings.DOCDATA_RETURN_VIEW_TIMEOUT
 
     def get(self, request, *args, **kwargs):
         # Directly query the latest state from Docdata
@@ -99,9 +149,16 @@ class OrderReturnView(UpdateOrderMixin, View):
 
         # Need to make sure the latest status is present,
         # won't wait for Docdata to call our update API.
-        with transaction.atomic():
-            self.order = self.get_order(order_key)   # this is the docdata id.
-            self.update_order(self.order)
+        try:
+            self.order = self.get_updated_order(order_key)   # this is the docdata id.
+        except DocdataUnavailable:
+            # Includes a DocdataTimeout, don't let the shopper wait for Docdata, the notification view will update the order later.
+            logger.warning("Docdata is unavailable, using the last known status of order %s", order_key)
+            self.order = self.get_order(order_key, lock=False)
+        except OrderUpdateConflict:
+            # Other processes updated the order in the meantime, which already stored a recent status.
+            logger.warning("Order %s was updated concurrently, using the last stored status", order_key)
+            self.order = self.get_order(order_key, lock=False)
 
         # Allow other code to perform actions, e.g. send a confirmation email.
         responses = return_view_called.send(sender=self.__class__, request=request, order=self.order, callback=callback)
@@ -145,9 +202,16 @@ class StatusChangedNotificationView(UpdateOrderMixin, View):
     ``http://www.merchantwebsite.com/api/docdata/update_order/?order_id=``
 
     The use of this service is optional, but recommended.
+
+    With ``DOCDATA_QUEUE_NOTIFICATIONS``, the notification is only stored,
+    and the ``docdata_notifications`` management command updates the order.
+    The ``status_changed_view_called`` signal is not sent in that case.
     """
     order_slug_field = 'merchant_order_id'
 
+    # Store the notification for the docdata_notifications command, see ``DOCDATA_QUEUE_NOTIFICATIONS``.
+    queue_notifications = appsettings.DOCDATA_QUEUE_NOTIFICATIONS
+
     def get(self, request, *args, **kwargs):
         try:
             order_key = self.get_order_slug()
@@ -156,28 +220,49 @@ class StatusChangedNotificationView(UpdateOrderMixin, View):
 
         logger.info("Got Docdata status changed notification for {0}".format(order_key))
 
-        with transaction.atomic():
-            try:
-                self.order = self.get_order(order_key)  # Inconsistent, this call uses the merchant_order_id
-            except Http404 as e:
-                return HttpResponseNotFound(str(e), content_type='text/plain; charset=utf-8')
-
-            try:
-                self.update_order(self.order)
-            except DocdataStatusError as e:
-                logger.exception("The order status could not be retrieved from Docdata by the notification-url")
-                return HttpResponseServerError(
-                    "Failed to fetch status from Docdata API.\n"
-                    "\n\n"
-                    "Docdata API response:\n"
-                    "---------------------\n"
-                    "\n"
-                    "code:    {0}\n"
-                    "message: {1}".format(e.code, e.message),
-                    content_type='text/plain; charset=utf-8'
-                )
+        if self.queue_notifications:
+            return self.queue_notification(order_key)
+
+        try:
+            self.forget_status(order_key)
+            self.order = self.get_updated_order(order_key)  # Inconsistent, this call uses the merchant_order_id
+        except Http404 as e:
+            return HttpResponseNotFound(str(e), content_type='text/plain; charset=utf-8')
+        except (DocdataUnavailable, OrderUpdateConflict) as e:
+            # Let Docdata send the notification again later.
+            return HttpResponse(str(e), status=503, content_type='text/plain; charset=utf-8')
+        except DocdataStatusError as e:
+            logger.exception("The order status could not be retrieved from Docdata by the notification-url")
+            return HttpResponseServerError(
+                "Failed to fetch status from Docdata API.\n"
+                "\n\n"
+                "Docdata API response:\n"
+                "---------------------\n"
+                "\n"
+                "code:    {0}\n"
+                "message: {1}".format(e.code, e.message),
+                content_type='text/plain; charset=utf-8'
+            )
 
         status_changed_view_called.send(sender=self.__class__, request=request, order=self.order)
 
         # Return 200 as required by DocData when the status changed notification was consumed.
         return HttpResponse(u"ok, order {0} updated\n".format(order_key), content_type='text/plain; charset=utf-8')
+
+    def forget_status(self, order_slug):
+        """
+        Make sure the order is updated with a new status report, not the one from the ``DOCDATA_STATUS_CACHE``.
+        """
+        if appsettings.DOCDATA_STATUS_CACHE:
+            self.get_facade().forget_status(self.get_order(order_slug, lock=False))
+
+    def queue_notification(self, order_slug):
+        """
+        Store the notification, to be processed by the ``docdata_notifications`` command.
+        """
+        if not DocdataOrder.objects.active_merchants().filter(merchant_order_id=order_slug).exists():
+            logger.error("Order merchant_order_id='%s' not found to queue the notification.", order_slug)
+            return HttpResponseNotFound(u"Order merchant_order_id='{0}' not found!".format(order_slug), content_type='text/plain; charset=utf-8')
+
+        notifications.queue_notification(order_slug)
+        return HttpResponse(u"ok, order {0} queued\n".format(order_slug), content_type='text/plain; charset=utf-8')
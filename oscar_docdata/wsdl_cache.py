@@ -0,0 +1,194 @@
+"""
+Persistent cache for the parsed Docdata WSDL and XSD definitions.
+
+By default, suds stores its cache in a temporary folder which is removed when the process exits.
+Hence every new worker process has to download and parse the WSDL and the large XSD file again.
+This cache stores the parsed service definition in a fixed folder, so it survives restarts.
+The cache can be pre-built at deploy time using ``manage.py docdata_wsdl_cache``.
+
+Note that the cached definitions are not compared with the remote WSDL at runtime,
+as that requires downloading it again. Changes in the remote WSDL or XSD are picked up
+when the ``docdata_wsdl_cache`` command runs, or when the entry expires after ``DOCDATA_WSDL_CACHE_DAYS``.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+import suds
+import suds.cache
+import suds.options
+import suds.plugin
+import suds.reader
+from six import text_type
+
+from oscar_docdata import appsettings, __version__ as oscar_docdata_version
+
+logger = logging.getLogger(__name__)
+
+__all__ = (
+    'get_wsdl_cache',
+    'WsdlCache',
+    'ContentHashPlugin',
+)
+
+
+def get_wsdl_cache(refresh=False):
+    """
+    Return the persistent WSDL cache, if ``DOCDATA_WSDL_CACHE_DIR`` is configured.
+
+    :rtype: WsdlCache
+    """
+    if not appsettings.DOCDATA_WSDL_CACHE_DIR:
+        return None
+
+    return WsdlCache(appsettings.DOCDATA_WSDL_CACHE_DIR, days=appsettings.DOCDATA_WSDL_CACHE_DAYS, refresh=refresh)
+
+
+def get_cache_id(url):
+    """
+    Return the cache key under which the WSDL definitions of an URL are stored.
+    """
+    # Not the key that suds uses, suds-jurko hashes the URL differently in every process.
+    return '{0}-wsdl'.format(hashlib.md5(url.encode('utf-8')).hexdigest())
+
+
+def get_suds_cache_id(url):
+    """
+    Return the cache key that the suds client uses for the WSDL definitions of an URL.
+    This is only stable within the current process.
+    """
+    return suds.reader.Reader(suds.options.Options()).mangle(url, 'wsdl')
+
+
+class ContentHashPlugin(suds.plugin.DocumentPlugin):
+    """
+    Calculate a hash of all documents (the WSDL and XSD files) that are downloaded to build the client.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+
+    def loaded(self, context):
+        document = context.document
+        if isinstance(document, text_type):
+            document = document.encode('utf-8')
+        self.hashes[context.url] = hashlib.sha1(document).hexdigest()
+
+    def hexdigest(self):
+        """
+        The combined hash of all loaded documents.
+        """
+        if not self.hashes:
+            return None
+
+        combined = hashlib.sha1()
+        for url, digest in sorted(self.hashes.items()):
+            combined.update(u"{0}={1}\n".format(url, digest).encode('utf-8'))
+        return combined.hexdigest()
+
+
+class WsdlCache(suds.cache.ObjectCache):
+    """
+    A suds object cache that stores the parsed WSDL definitions on disk.
+
+    Each entry is stamped with the WSDL URL, the hash of the downloaded documents,
+    and the suds and oscar_docdata versions. Entries that can't be read, or were created by other versions,
+    are ignored. In that case suds simply fetches the WSDL again, and the entry is replaced.
+
+    This cache needs to be used with ``cachingpolicy=1``, so suds stores the parsed definitions.
+    The URLs need to be registered with :meth:`add_url`, as the cache key of suds can't be traced back to the URL.
+    When ``refresh`` is set, the existing entries are not read but only replaced.
+    """
+    fnprefix = 'suds-docdata'
+
+    def __init__(self, location, days=30, refresh=False):
+        super(WsdlCache, self).__init__(location=location, days=days)
+        self.refresh = refresh
+
+        # Add this plugin to the suds client, to track which content was stored.
+        self.content_hasher = ContentHashPlugin()
+        self._urls = {}
+
+    def add_url(self, url):
+        """
+        Register the URL of a client that uses this cache.
+        """
+        self._urls[get_suds_cache_id(url)] = url
+
+    def get(self, id):
+        url = self._urls.get(id)
+        if self.refresh or url is None:
+            return None
+
+        cache_id = get_cache_id(url)
+        entry = super(WsdlCache, self).get(cache_id)  # Also purges unreadable entries
+        if entry is None:
+            return None
+
+        try:
+            stamp, wsdl = entry
+            is_stale = stamp['version'] != oscar_docdata_version \
+                or stamp['suds_version'] != suds.__version__ \
+                or stamp['url'] != url \
+                or not stamp['content_hash']
+        except (TypeError, ValueError, KeyError):
+            is_stale = True
+
+        if is_stale:
+            logger.info("Ignoring stale cached WSDL definitions in %s", self.location)
+            self.purge(cache_id)
+            return None
+
+        return wsdl
+
+    def put(self, id, wsdl):
+        stamp = {
+            'url': wsdl.url,
+            'content_hash': self.content_hasher.hexdigest(),
+            'version': oscar_docdata_version,
+            'suds_version': suds.__version__,
+        }
+
+        try:
+            data = pickle.dumps((stamp, wsdl), self.protocol)
+            self._write_file(get_cache_id(wsdl.url), data)
+        except (pickle.PicklingError, TypeError, RuntimeError, IOError, OSError) as e:
+            # The client can still be used, it's just not cached.
+            logger.warning("Could not store the WSDL definitions of %s in the cache: %s", wsdl.url, e)
+        return wsdl
+
+    def _write_file(self, id, data):
+        # Write to a temporary file first, so other processes never read a partially written file.
+        if not os.path.isdir(self.location):
+            os.makedirs(self.location)
+
+        filename = os.path.join(self.location, '{0}-{1}.{2}'.format(self.fnprefix, id, self.fnsuffix()))
+        fd, tmp_filename = tempfile.mkstemp(prefix='.tmp-', dir=self.location)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            getattr(os, 'replace', os.rename)(tmp_filename, filename)
+        except Exception:
+            os.remove(tmp_filename)
+            raise
+
+    def get_stamp(self, url):
+        """
+        Return the metadata of the cached entry for an URL.
+        This includes the ``url``, ``content_hash``, ``version`` and ``suds_version``.
+
+        :rtype: dict
+        """
+        entry = super(WsdlCache, self).get(get_cache_id(url))
+        try:
+            return entry[0]
+        except (TypeError, IndexError, KeyError):
+            return None
+
+    def purge_url(self, url):
+        """
+        Remove the cached entry of an URL.
+        """
+        self.purge(get_cache_id(url))
@@ -35,7 +35,8 @@ setup(
     install_requires=[
         'suds-jurko>=0.6',
         'django-oscar>=1.5',
-        'six>=1.10'
+        'six>=1.10',
+        'futures; python_version < "3.0"',
     ],
     description='Docdata Payments Gateway integration for django-oscar',
     long_description=read('README.rst'),
@@ -70,6 +71,9 @@ setup(
         'Topic :: Software Development :: Libraries :: Python Modules',
     ],
     extras_require={
+        'async': [
+            'aiohttp>=3.5; python_version >= "3.6"',
+        ],
         'dev': [
             'wheel',
             'twine',
@@ -78,7 +82,8 @@ setup(
             'pytest-django',
             'pytest-mock',
             'pytest-env',
-            'django-webtest'
+            'django-webtest',
+            'aiohttp>=3.5; python_version >= "3.6"',
         ],
     }
 )
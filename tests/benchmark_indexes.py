@@ -0,0 +1,140 @@
+"""
+Benchmark of the ``DocdataOrder`` indexes of migration 0007.
+
+This generates orders in a test database, and prints the query plans and timings
+of the hot lookups without and with the indexes::
+
+    python -m tests.benchmark_indexes --orders 200000
+
+Use ``DJANGO_SETTINGS_MODULE=sandbox.settings.postgresql`` to benchmark PostgreSQL.
+The test database is created and removed by the script, the sandbox database is not touched.
+This requires Django 2.1 or newer, for ``QuerySet.explain()``.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sandbox.settings')
+os.environ.setdefault('DOCDATA_MERCHANT_NAME', 'merchant')
+os.environ.setdefault('DOCDATA_MERCHANT_PASSWORD', 'merchant')
+
+import django  # noqa: E402
+
+if django.VERSION < (2, 1):
+    raise SystemExit("The index benchmark requires Django 2.1 or newer, for QuerySet.explain().")
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import Max, Min  # noqa: E402
+from django.utils.timezone import now  # noqa: E402
+
+from oscar_docdata.models import DocdataOrder  # noqa: E402
+
+MERCHANTS = [os.environ['DOCDATA_MERCHANT_NAME'], 'other-merchant-1', 'other-merchant-2']
+STATUSES = [DocdataOrder.STATUS_NEW, DocdataOrder.STATUS_IN_PROGRESS, DocdataOrder.STATUS_PAID, DocdataOrder.STATUS_EXPIRED]
+DAYS = 365
+
+
+def generate_orders(count, batch_size=5000):
+    """
+    Insert the orders, spread over the merchants, statuses and the last year.
+    """
+    for start in range(0, count, batch_size):
+        DocdataOrder.objects.bulk_create([
+            DocdataOrder(
+                merchant_name=MERCHANTS[i % len(MERCHANTS)],
+                merchant_order_id=str(100000 + i),
+                order_key='key-{0}'.format(i),
+                status=random.choice(STATUSES),
+                total_gross_amount=10,
+                currency='EUR',
+            )
+            for i in range(start, min(start + batch_size, count))
+        ])
+
+    # The created date is set by auto_now_add, so it's changed afterwards.
+    pks = DocdataOrder.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    first_pk = pks['first']
+    step = max((pks['last'] - first_pk) // DAYS, 1)
+    current_time = now()
+    for day in range(DAYS):
+        DocdataOrder.objects.filter(pk__gte=first_pk + day * step, pk__lt=first_pk + (day + 1) * step).update(created=current_time - timedelta(days=DAYS - day))
+
+
+def get_queries(count):
+    """
+    The lookups of the notification view and the expire command.
+    """
+    def _notification_lookup():
+        return DocdataOrder.objects.active_merchants().filter(merchant_order_id=str(100000 + random.randrange(count)))
+
+    def _expire_orders():
+        return DocdataOrder.objects.active_merchants() \
+            .filter(status__in=(DocdataOrder.STATUS_NEW, DocdataOrder.STATUS_IN_PROGRESS)) \
+            .filter(created__lt=(now() - timedelta(days=21)))
+
+    return [
+        # Evaluated like get() does, first() would add an ORDER BY that changes the plan.
+        ("notification lookup", _notification_lookup, list),
+        ("expire count", _expire_orders, lambda qs: qs.count()),
+    ]
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE {0}'.format(connection.ops.quote_name(DocdataOrder._meta.db_table)))
+        else:
+            cursor.execute('ANALYZE')
+
+
+def run_queries(queries, repeat):
+    analyze()
+    results = {}
+    for name, get_queryset, evaluate in queries:
+        plan = get_queryset().explain()
+        start = time.time()
+        for i in range(repeat):
+            evaluate(get_queryset())
+        results[name] = ((time.time() - start) / repeat * 1000, plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200000, help="The number of generated orders")
+    parser.add_argument('--repeat', type=int, default=20, help="The number of times each query is timed")
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        print("Generating {0} orders on {1}...".format(args.orders, connection.vendor))
+        generate_orders(args.orders)
+        queries = get_queries(args.orders)
+        indexes = DocdataOrder._meta.indexes
+
+        with connection.schema_editor() as schema_editor:
+            for index in indexes:
+                schema_editor.remove_index(DocdataOrder, index)
+        before = run_queries(queries, args.repeat)
+
+        with connection.schema_editor() as schema_editor:
+            for index in indexes:
+                schema_editor.add_index(DocdataOrder, index)
+        after = run_queries(queries, args.repeat)
+
+        print("Average of {0} queries:".format(args.repeat))
+        for name, _, _ in queries:
+            print("\n{0}: {1:.1f}ms -> {2:.1f}ms".format(name, before[name][0], after[name][0]))
+            print("  before: {0}".format(before[name][1].replace('\n', '\n          ')))
+            print("  after:  {0}".format(after[name][1].replace('\n', '\n          ')))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import tempfile
 from django.core.management import call_command
 
 from oscar_docdata.gateway import DocdataAPIVersionPlugin
+from oscar_docdata.registry import client_registry
 
 import pytest
 
@@ -40,6 +41,8 @@ def mock_suds_client(mocker):
 
     # patch the CACHED_CLIENT so get_suds_client will return ours
     mocker.patch.dict("oscar_docdata.gateway.CACHED_CLIENT", {url: client})
+    # The registered clients still refer to the previous suds client.
+    client_registry.invalidate()
 
     return client
 
@@ -7,6 +7,8 @@ from oscar.core.loading import get_class, get_model
 
 from oscar_docdata.models import DocdataOrder
 
+from tests.http_server import start_server
+
 
 import pytest
 
@@ -164,3 +166,11 @@ def mock_total_from_oscar_order(mocker):
         return total
 
     return _mock_total_from_oscar_order
+
+
+@pytest.fixture()
+def http_server():
+    server = start_server()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -1,6 +1,13 @@
+import time
+
 import pytest
+from django.core.management import call_command
+from six import StringIO
 
-from oscar_docdata.models import DocdataOrder
+from oscar_docdata.exceptions import DocdataTimeout, DocdataUnavailable, OrderUpdateConflict
+from oscar_docdata.facade import Facade
+from oscar_docdata.models import DocdataNotification, DocdataOrder
+from oscar_docdata.views import OrderReturnView
 
 from tests.testdata import docdata_responses
 
@@ -74,3 +81,110 @@ def test_payment_cancelled(django_app, cancelled_docdata_order, mock_transport):
     cancelled_docdata_order.refresh_from_db()
 
     assert cancelled_docdata_order.status == DocdataOrder.STATUS_CANCELLED
+
+
+@pytest.mark.django_db
+def test_status_changed_outside_lock(django_app, docdata_order, mock_transport, mocker):
+    """
+    The notification view can fetch the status before locking the order.
+    """
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE])
+    mocker.patch('oscar_docdata.views.StatusChangedNotificationView.fetch_status_outside_lock', True)
+    update_order = mocker.spy(Facade, 'update_order_optimistic')
+
+    response = django_app.get("/api/docdata/update_order/?order_id={}".format(docdata_order.merchant_order_id))
+    assert response.status == "200 OK"
+    assert update_order.call_count == 1
+
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_PAID
+    assert docdata_order.version == 1
+
+
+@pytest.mark.django_db
+def test_status_changed_queued(django_app, docdata_order, mock_transport, mocker):
+    """
+    The notification view can queue the notification, the management command updates the order.
+    """
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE])
+    mocker.patch('oscar_docdata.views.StatusChangedNotificationView.queue_notifications', True)
+
+    # Repeated notifications are only queued once.
+    for i in range(2):
+        response = django_app.get("/api/docdata/update_order/?order_id={}".format(docdata_order.merchant_order_id))
+        assert response.status == "200 OK"
+    assert DocdataNotification.objects.filter(merchant_order_id=docdata_order.merchant_order_id).count() == 1
+
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_NEW
+
+    call_command("docdata_notifications", stdout=StringIO())
+
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_PAID
+    assert not DocdataNotification.objects.exists()
+
+    response = django_app.get("/api/docdata/update_order/?order_id=unknown", expect_errors=True)
+    assert response.status == "404 Not Found"
+
+
+@pytest.mark.django_db
+def test_return_view_docdata_unavailable(django_app, docdata_order, mocker):
+    """
+    The return view uses the last known status when Docdata is unavailable.
+    """
+    mocker.patch('oscar_docdata.gateway.DocdataClient.status', side_effect=DocdataUnavailable('status'))
+
+    response = django_app.get("/api/docdata/return/?callback=SUCCESS&order_id={}".format(docdata_order.order_key))
+    assert response.status == "302 Found"
+
+    response = django_app.get("/api/docdata/update_order/?order_id={}".format(docdata_order.merchant_order_id), expect_errors=True)
+    assert response.status == "503 Service Unavailable"
+
+
+@pytest.mark.django_db
+def test_return_view_timeout(django_app, docdata_order, mocker):
+    """
+    The return view gives Docdata at most DOCDATA_RETURN_VIEW_TIMEOUT seconds.
+    """
+    mocker.patch('oscar_docdata.views.OrderReturnView.update_timeout', 2)
+    status = mocker.patch('oscar_docdata.gateway.DocdataClient.status', side_effect=DocdataTimeout('status'))
+
+    response = django_app.get("/api/docdata/return/?callback=SUCCESS&order_id={}".format(docdata_order.order_key))
+    assert response.status == "302 Found"
+    assert 0 < status.call_args[1]['deadline'] - time.time() <= 2
+
+
+@pytest.mark.django_db
+def test_views_update_conflict(django_app, docdata_order, mocker):
+    """
+    The views don't fail when the order was updated concurrently too often.
+    """
+    mocker.patch('oscar_docdata.views.UpdateOrderMixin.fetch_status_outside_lock', True)
+    mocker.patch('oscar_docdata.facade.Facade.update_order_optimistic', side_effect=OrderUpdateConflict("conflict"))
+
+    response = django_app.get("/api/docdata/return/?callback=SUCCESS&order_id={}".format(docdata_order.order_key))
+    assert response.status == "302 Found"
+
+    # Docdata sends the notification again.
+    response = django_app.get("/api/docdata/update_order/?order_id={}".format(docdata_order.merchant_order_id), expect_errors=True)
+    assert response.status == "503 Service Unavailable"
+
+
+@pytest.mark.django_db
+def test_views_custom_update_order(docdata_order, mocker):
+    """
+    A view that overrides update_order() keeps using it, when the status is fetched outside the lock.
+    """
+    calls = []
+
+    class CustomReturnView(OrderReturnView):
+        fetch_status_outside_lock = True
+
+        def update_order(self, order, **kwargs):
+            calls.append(order)
+
+    optimistic = mocker.patch('oscar_docdata.facade.Facade.update_order_optimistic')
+    assert CustomReturnView().get_updated_order(docdata_order.order_key) == docdata_order
+    assert calls == [docdata_order]
+    assert not optimistic.called
@@ -1,11 +1,17 @@
+import csv
+import json
 from datetime import timedelta
+from decimal import Decimal as D
 
 from django.core.management import call_command
+from django.utils.timezone import localtime
 
 from six import StringIO
 
 import pytest
 
+from oscar_docdata.exceptions import DocdataUnavailable
+from oscar_docdata.models import DocdataOrder
 from tests.testdata import docdata_responses
 
 
@@ -55,6 +61,24 @@ def test_manage_expire_docdata_orders_status_expired(expired_docdata_order, mock
     assert expired_docdata_order.status == expired_docdata_order.STATUS_EXPIRED
 
 
+@pytest.mark.django_db
+def test_manage_expire_docdata_orders_unchanged_report(docdata_order, mock_transport):
+    mock_transport.set_responses([
+        docdata_responses.STATUS_CANCELLED_RESPONSE,
+        docdata_responses.STATUS_CANCELLED_RESPONSE,
+    ])
+
+    # The same report was stored while the order was young.
+    call_command("update_docdata_order", "--all", stdout=StringIO())
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_NEW
+    DocdataOrder.objects.filter(pk=docdata_order.pk).update(created=docdata_order.created - timedelta(days=22))
+
+    call_command("expire_docdata_orders", stdout=StringIO())
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_EXPIRED
+
+
 @pytest.mark.django_db
 def test_manage_expire_docdata_orders_status_paid(docdata_order, mock_transport):
     mock_transport.set_responses([
@@ -79,3 +103,64 @@ def test_manage_docdata_report(docdata_order):
 
     # just test that the report is printing something
     assert len(output.getvalue()) > 0
+
+
+@pytest.mark.django_db
+def test_manage_docdata_report_csv(docdata_order, django_assert_num_queries):
+    docdata_order.currency = 'EUR'
+    docdata_order.total_registered = 10
+    docdata_order.total_captured = 8
+    docdata_order.save()
+
+    output = StringIO()
+    with django_assert_num_queries(1):
+        call_command("docdata_report", "--format", "csv", stdout=output)
+    rows = list(csv.DictReader(StringIO(output.getvalue())))
+    assert len(rows) == 1
+    assert rows[0]['month'] == "{0:%Y-%m}".format(localtime(docdata_order.created))
+    assert rows[0]['currency'] == 'EUR'
+    assert rows[0]['status'] == 'new'
+    assert D(rows[0]['difference']) == D('-2.00')
+
+
+@pytest.mark.django_db
+def test_manage_docdata_report_json_range(docdata_order):
+    created = localtime(docdata_order.created).date()
+
+    output = StringIO()
+    call_command("docdata_report", "--format", "json", "--from", str(created), "--to", str(created), stdout=output)
+    assert len(json.loads(output.getvalue())) == 1
+
+    output = StringIO()
+    call_command("docdata_report", "--format", "json", "--from", str(created + timedelta(days=1)), stdout=output)
+    assert json.loads(output.getvalue()) == []
+
+
+@pytest.mark.django_db
+def test_manage_update_docdata_order_chunks(docdata_order, mock_transport):
+    mock_transport.set_responses([
+        docdata_responses.STATUS_SUCCESS_RESPONSE
+    ])
+
+    output = StringIO()
+    call_command("update_docdata_order", "--all", "--chunk-size", "1", stdout=output)
+    assert "Checked 1 orders, 1 changed, 0 failed" in output.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_manage_update_docdata_order_workers(docdata_order, mocker):
+    # The worker threads use their own database connection, hence the transactional test.
+    DocdataOrder.objects.bulk_create([
+        DocdataOrder(merchant_name=docdata_order.merchant_name, merchant_order_id=str(i), order_key='key{0}'.format(i), total_gross_amount=1)
+        for i in range(5)
+    ])
+
+    def _update_order(order, **kwargs):
+        if order.merchant_order_id == '3':
+            raise DocdataUnavailable('status')
+        order.status = DocdataOrder.STATUS_PAID  # not saved, SQLite locks the table for concurrent writes
+
+    mocker.patch('oscar_docdata.facade.Facade.update_order', side_effect=_update_order)
+    output = StringIO()
+    call_command("update_docdata_order", "--all", "--workers", "3", "--chunk-size", "2", stdout=output, stderr=StringIO())
+    assert "Done: Checked 5 orders, 5 changed, 1 failed" in output.getvalue()
@@ -0,0 +1,81 @@
+"""
+A local keep-alive HTTP server that mimics the Docdata SOAP service.
+"""
+import threading
+
+from six.moves import BaseHTTPServer, socketserver
+
+from tests.suds_transport import WSDL, XSD
+from tests.testdata import docdata_responses
+
+
+class KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.connection_count += 1
+
+    def do_GET(self):
+        base_url = 'http://127.0.0.1:{0}'.format(self.server.server_address[1])
+        if self.path.endswith('?wsdl'):
+            self._reply(200, WSDL.replace('https://test.docdatapayments.com:443', base_url).encode('utf-8'))
+        elif self.path.endswith('?xsd=1'):
+            self._reply(200, XSD.encode('utf-8'))
+        else:
+            self._reply(200, b'<wsdl/>')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(body)
+        self.server.paths.append(self.path)
+        if self.path == '/fault':
+            self._reply(500, b'<fault/>')
+        elif self.path.startswith('/ps/services/'):
+            self._reply(200, self._soap_response(body).encode('utf-8'))
+        else:
+            self._reply(200, body)
+
+        if self.path == '/drop':
+            # Close the connection without telling the client, like an idle timeout does.
+            self.close_connection = True
+
+    def _soap_response(self, body):
+        action = self.headers.get('SOAPAction', '').strip('"')
+        if action == 'create':
+            return docdata_responses.CREATE_PAYMENT_RESPONSE
+        elif action == 'cancel':
+            return docdata_responses.CANCELLED_PAYMENT_RESPONSE
+        elif b'unknown-key' in body:
+            return docdata_responses.STATUS_ERROR_RESPONSE
+        else:
+            return docdata_responses.STATUS_SUCCESS_RESPONSE
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.connection_count = 0
+    server.received = []
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def server_url(server, path):
+    return 'http://127.0.0.1:{0}{1}'.format(server.server_address[1], path)
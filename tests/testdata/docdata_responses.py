@@ -94,3 +94,93 @@ STATUS_CANCELLED_RESPONSE = """<?xml version='1.0' encoding='UTF-8'?>
     </S:Body>
 </S:Envelope>
 """
+
+STATUS_ERROR_RESPONSE = """<?xml version='1.0' encoding='UTF-8'?>
+<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/">
+    <S:Body>
+        <statusResponse ddpXsdVersion="1.3.14" xmlns="http://www.docdatapayments.com/services/paymentservice/1_3/">
+            <statusErrors>
+                <error code="REQUEST_DATA_INCORRECT">Order could not be found with the given key.</error>
+            </statusErrors>
+        </statusResponse>
+    </S:Body>
+</S:Envelope>
+"""
+
+STATUS_MULTIPLE_PAYMENTS_RESPONSE = """<?xml version='1.0' encoding='UTF-8'?>
+<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/">
+    <S:Body>
+        <statusResponse ddpXsdVersion="1.3.14" xmlns="http://www.docdatapayments.com/services/paymentservice/1_3/">
+            <statusSuccess>
+                <success code="SUCCESS">Operation successful.</success>
+                <report>
+                    <approximateTotals exchangeRateDate="2019-02-12 10:02:13" exchangedTo="EUR">
+                        <totalRegistered>5000</totalRegistered>
+                        <totalShopperPending>0</totalShopperPending>
+                        <totalAcquirerPending>0</totalAcquirerPending>
+                        <totalAcquirerApproved>5000</totalAcquirerApproved>
+                        <totalCaptured>5000</totalCaptured>
+                        <totalRefunded>1000</totalRefunded>
+                        <totalChargedback>500</totalChargedback>
+                        <totalReversed>0</totalReversed>
+                    </approximateTotals>
+                    <payment>
+                        <id>4910079746</id>
+                        <paymentMethod>MASTERCARD</paymentMethod>
+                        <authorization>
+                            <status>AUTHORIZED</status>
+                            <amount currency="EUR">5000</amount>
+                            <confidenceLevel>ACQUIRER_APPROVED</confidenceLevel>
+                            <capture>
+                                <merchantCaptureId>1</merchantCaptureId>
+                                <status>CAPTURED</status>
+                                <amount currency="EUR">5000</amount>
+                            </capture>
+                            <refund>
+                                <merchantRefundId>2</merchantRefundId>
+                                <status>CAPTURED</status>
+                                <amount currency="EUR">1000</amount>
+                                <reason>Returned</reason>
+                            </refund>
+                            <refund>
+                                <status>FAILED</status>
+                                <amount currency="EUR">200</amount>
+                            </refund>
+                            <chargeback>
+                                <chargebackId>437055</chargebackId>
+                                <status>CHARGED</status>
+                                <amount currency="EUR">500</amount>
+                                <reason>Fraud</reason>
+                            </chargeback>
+                        </authorization>
+                    </payment>
+                    <payment>
+                        <id>4910079745</id>
+                        <paymentMethod>IDEAL</paymentMethod>
+                        <authorization>
+                            <status>CANCELED</status>
+                            <reason>Cancelled by shopper</reason>
+                            <amount currency="EUR">5000</amount>
+                            <confidenceLevel></confidenceLevel>
+                        </authorization>
+                    </payment>
+                    <apiInformation conversionApplied="false">
+                        <originalVersion>1.3</originalVersion>
+                    </apiInformation>
+                </report>
+            </statusSuccess>
+        </statusResponse>
+    </S:Body>
+</S:Envelope>
+"""
+
+SOAP_FAULT_RESPONSE = """<?xml version='1.0' encoding='UTF-8'?>
+<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/">
+    <S:Body>
+        <S:Fault>
+            <faultcode>S:Server</faultcode>
+            <faultstring>Internal error</faultstring>
+        </S:Fault>
+    </S:Body>
+</S:Envelope>
+"""
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+from decimal import Decimal as D
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from six.moves.urllib.error import URLError
+
+from oscar_docdata.circuit import CircuitBreaker
+from oscar_docdata.exceptions import DocdataStatusError, DocdataTimeout
+from oscar_docdata.gateway import Address, Amount, CreateReply, Destination, Name, Shopper, StatusReply
+from oscar_docdata.metrics import counters
+from tests.http_server import server_url
+from tests.testdata import docdata_responses
+
+aio = pytest.importorskip('oscar_docdata.aio')
+
+
+@pytest.fixture()
+def async_client(http_server, mocker):
+    # Let the envelopes point to the local server
+    mocker.patch.dict(aio.CACHED_REQUEST_CLIENT, clear=True)
+    mocker.patch('oscar_docdata.aio.get_wsdl_url', return_value=server_url(http_server, '/ps/services/paymentservice/1_3?wsdl'))
+    return aio.AsyncDocdataClient(testing_mode=True)
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_async_create(async_client, http_server):
+    name = Name(first="John", last="Doe")
+
+    async def _create():
+        async with async_client:
+            return await async_client.create(
+                order_id='1001',
+                total_gross_amount=Amount(D('10.00'), 'EUR'),
+                shopper=Shopper(1, name, 'john@example.com', 'en'),
+                bill_to=Destination(name, Address('Street', '1', None, '1234AB', 'Amsterdam', None, 'NL')),
+                description="Order 1001",
+            )
+
+    reply = _run(_create())
+    assert isinstance(reply, CreateReply)
+    assert reply.order_id == '1001'
+    assert reply.order_key == docdata_responses.ORDER_KEY
+
+    # The envelope has the same contents as the suds client would send.
+    assert b'version="1.3"' in http_server.received[-1]
+    assert b':merchantOrderReference>1001</' in http_server.received[-1]
+
+
+def test_async_status_and_cancel(async_client, http_server):
+    async def _calls():
+        async with async_client:
+            status = await async_client.status(docdata_responses.ORDER_KEY)
+            cancelled = await async_client.cancel(docdata_responses.ORDER_KEY)
+            with pytest.raises(DocdataStatusError):
+                await async_client.status_extended('unknown-key')
+            return status, cancelled
+
+    status, cancelled = _run(_calls())
+    assert isinstance(status, StatusReply)
+    assert status.report.totals.total_registered == 299
+    assert cancelled is True
+
+    # All calls share one keep-alive connection.
+    assert http_server.connection_count == 2  # WSDL + SOAP calls
+
+
+def test_async_status_many(async_client, http_server):
+    order_keys = ['key-{0}'.format(i) for i in range(20)] + ['unknown-key']
+
+    async def _status_many():
+        async with async_client:
+            return [result async for result in async_client.status_many(order_keys, max_workers=5)]
+
+    results = {result.order_key: result for result in _run(_status_many())}
+    assert sorted(results.keys()) == sorted(order_keys)
+    assert isinstance(results['key-0'].reply, StatusReply)
+    assert isinstance(results['unknown-key'].error, DocdataStatusError)
+    assert http_server.connection_count <= 6
+
+
+def test_async_connection_error(async_client, http_server, mocker):
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_RETRY_BACKOFF', 0.01)
+    http_server.shutdown()
+    http_server.server_close()
+
+    async def _status():
+        async with async_client:
+            await async_client.status(docdata_responses.ORDER_KEY)
+
+    counters.reset()
+    with pytest.raises(URLError):
+        _run(_status())
+    assert counters.get('retry_attempt') == 2
+    assert counters.get('retry_exhausted') == 1
+
+
+def test_async_location(async_client, http_server):
+    # The location option of the suds client is used, like the synchronous client does.
+    async_client.client.set_options(location=server_url(http_server, '/ps/services/other'))
+
+    async def _status():
+        async with async_client:
+            return await async_client.status(docdata_responses.ORDER_KEY)
+
+    assert isinstance(_run(_status()), StatusReply)
+    assert http_server.paths[-1] == '/ps/services/other'
+
+
+def test_async_cache_in_executor(async_client, http_server, mocker):
+    # The Django cache calls don't block the event loop.
+    threads = []
+    mocker.patch.object(aio.AsyncDocdataClient, '_get_cached_status', side_effect=lambda order_key: threads.append(threading.current_thread()))
+
+    async def _status():
+        async with async_client:
+            return await async_client.status(docdata_responses.ORDER_KEY)
+
+    _run(_status())
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_async_http_error(async_client, http_server, mocker):
+    # An HTTP error without SOAP fault is raised the same way as the synchronous client does.
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_RETRY_ATTEMPTS', 1)
+    async_client.client.set_options(location=server_url(http_server, '/fault'))
+
+    async def _status():
+        async with async_client:
+            await async_client.status(docdata_responses.ORDER_KEY)
+
+    with pytest.raises(Exception) as e:
+        _run(_status())
+    assert e.value.args == ((500, 'Internal Server Error'),)
+
+
+def test_async_deadline_rate_limit(async_client, http_server, mocker):
+    # A deadline that passed while waiting for the rate limit doesn't open the circuit.
+    breaker = CircuitBreaker(LocMemCache('circuit-breaker', {}), 'status:1', failure_threshold=1)
+    mocker.patch('oscar_docdata.aio.get_circuit_breaker', return_value=breaker)
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_RETRY_ATTEMPTS', 1)
+
+    async def _wait_for_rate_limit(operation):
+        await asyncio.sleep(0.1)
+
+    mocker.patch.object(async_client, '_wait_for_rate_limit', side_effect=_wait_for_rate_limit)
+
+    async def _status():
+        async with async_client:
+            await async_client.status(docdata_responses.ORDER_KEY, deadline=time.time() + 0.05)
+
+    with pytest.raises(DocdataTimeout):
+        _run(_status())
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
+    assert not http_server.received
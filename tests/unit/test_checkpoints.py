@@ -0,0 +1,95 @@
+import pytest
+from django.core.management import call_command
+from six import StringIO
+
+from oscar_docdata.checkpoints import CheckpointTracker, get_checkpoint, get_checkpoint_name, keyset_batches, save_checkpoint
+from oscar_docdata.models import DocdataOrder
+
+
+def _create_orders(docdata_order, count):
+    DocdataOrder.objects.bulk_create([
+        DocdataOrder(merchant_name=docdata_order.merchant_name, merchant_order_id=str(i), order_key='key{0}'.format(i), total_gross_amount=1)
+        for i in range(count)
+    ])
+    return list(DocdataOrder.objects.order_by('pk').values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+def test_keyset_batches(docdata_order):
+    pks = _create_orders(docdata_order, 4)
+    assert list(keyset_batches(DocdataOrder.objects.all(), 2)) == [pks[0:2], pks[2:4], pks[4:]]
+    assert list(keyset_batches(DocdataOrder.objects.all(), 3, last_pk=pks[1])) == [pks[2:5]]
+
+
+@pytest.mark.django_db
+def test_checkpoint_tracker():
+    tracker = CheckpointTracker('test')
+    for batch in ([1, 2], [3, 4], [5, 6], [7, 8]):
+        tracker.add(batch)
+
+    # The checkpoint only moves past the batches that are completed in order.
+    tracker.done([3, 4])
+    assert get_checkpoint('test') == 0
+    tracker.done([1, 2])
+    assert get_checkpoint('test') == 4
+
+    # Nothing after an interrupted batch is stored, the remaining orders are processed on --resume.
+    tracker.done([5, 6], 5)
+    tracker.done([7, 8])
+    assert get_checkpoint('test') == 5
+    assert tracker.last_pk == 5
+
+
+@pytest.mark.django_db
+def test_update_docdata_order_resume(docdata_order, mocker):
+    pks = _create_orders(docdata_order, 3)
+    save_checkpoint(get_checkpoint_name('update_docdata_order:'), pks[1])
+    update_order = mocker.patch('oscar_docdata.facade.Facade.update_order')
+
+    output = StringIO()
+    call_command("update_docdata_order", "--all", "--resume", stdout=output)
+    assert [call[0][0].pk for call in update_order.call_args_list] == pks[2:]
+    assert "Resuming after order ID {0}".format(pks[1]) in output.getvalue()
+    assert get_checkpoint(get_checkpoint_name('update_docdata_order:')) == 0  # completed
+
+
+@pytest.mark.django_db
+def test_update_docdata_order_interrupted(docdata_order, mocker):
+    pks = _create_orders(docdata_order, 3)
+
+    def _update_order(order, **kwargs):
+        if order.pk == pks[2]:
+            raise KeyboardInterrupt
+
+    mocker.patch('oscar_docdata.facade.Facade.update_order', side_effect=_update_order)
+    output = StringIO()
+    call_command("update_docdata_order", "--all", "--chunk-size", "2", stdout=output, stderr=StringIO())
+    assert get_checkpoint(get_checkpoint_name('update_docdata_order:')) == pks[1]
+    assert "Use --resume to continue after order ID {0}".format(pks[1]) in output.getvalue()
+
+
+@pytest.mark.django_db
+def test_expire_docdata_orders_resume(expired_docdata_order, mocker):
+    save_checkpoint(get_checkpoint_name('expire_docdata_orders'), expired_docdata_order.pk)
+    update_order = mocker.patch('oscar_docdata.facade.Facade.update_order')
+
+    # The order was processed by the interrupted run.
+    output = StringIO()
+    call_command("expire_docdata_orders", "--resume", stdout=output)
+    assert not update_order.called
+    assert "Collect 0 orders." in output.getvalue()
+    assert get_checkpoint(get_checkpoint_name('expire_docdata_orders')) == 0
+
+
+@pytest.mark.django_db
+def test_checkpoint_per_host(expired_docdata_order, mocker):
+    # Another host is still running the command, its progress is left alone.
+    save_checkpoint('expire_docdata_orders@other-host', expired_docdata_order.pk)
+    mocker.patch('oscar_docdata.checkpoints.socket.gethostname', return_value='this-host')
+    assert get_checkpoint_name('expire_docdata_orders') == 'expire_docdata_orders@this-host'
+    mocker.patch('oscar_docdata.facade.Facade.update_order')
+
+    output = StringIO()
+    call_command("expire_docdata_orders", "--resume", stdout=output)
+    assert "Collect 1 orders." in output.getvalue()
+    assert get_checkpoint('expire_docdata_orders@other-host') == expired_docdata_order.pk
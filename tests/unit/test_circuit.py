@@ -0,0 +1,91 @@
+import time
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from six.moves.urllib.error import URLError
+
+from oscar_docdata.circuit import CircuitBreaker
+from oscar_docdata.exceptions import DocdataStatusError, DocdataTimeout, DocdataUnavailable
+from oscar_docdata.gateway import DocdataClient
+from tests.testdata import docdata_responses
+
+
+@pytest.fixture()
+def breaker(mocker):
+    cache = LocMemCache('circuit-breaker', {})
+    cache.clear()
+    return CircuitBreaker(cache, 'status:1', failure_threshold=2, reset_timeout=30)
+
+
+def test_circuit_breaker(breaker, mocker):
+    mock_time = mocker.patch('oscar_docdata.circuit.time.time', return_value=1000.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_OPEN
+    assert not breaker.allow()
+
+    # After the timeout, only one call may probe the service.
+    mock_time.return_value = 1031.0
+    assert breaker.state == CircuitBreaker.STATE_HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # A failed probe opens the circuit again.
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_OPEN
+
+    # A probe that wasn't performed lets another call probe.
+    mock_time.return_value = 1062.0
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
+    assert breaker.allow()
+
+
+@pytest.mark.django_db
+def test_client_circuit_breaker(mock_transport, mocker, breaker):
+    mocker.patch('oscar_docdata.gateway.get_circuit_breaker', return_value=breaker)
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_RETRY_ATTEMPTS', 1)
+    send = mocker.patch.object(mock_transport, 'send', side_effect=URLError("Connection refused"))
+    client = DocdataClient(testing_mode=True)
+
+    for i in range(2):
+        with pytest.raises(URLError):
+            client.status(docdata_responses.ORDER_KEY)
+
+    # Fail directly, without calling Docdata.
+    with pytest.raises(DocdataUnavailable):
+        client.status(docdata_responses.ORDER_KEY)
+    assert send.call_count == 2
+
+
+@pytest.mark.django_db
+def test_client_circuit_breaker_errors(mock_transport, mocker, breaker):
+    # Errors that Docdata replies with don't open the circuit.
+    mocker.patch('oscar_docdata.gateway.get_circuit_breaker', return_value=breaker)
+    mock_transport.set_responses([docdata_responses.STATUS_ERROR_RESPONSE] * 3)
+    client = DocdataClient(testing_mode=True)
+
+    for i in range(3):
+        with pytest.raises(DocdataStatusError):
+            client.status(docdata_responses.ORDER_KEY)
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
+
+
+@pytest.mark.django_db
+def test_client_circuit_breaker_deadline(mock_transport, mocker, breaker):
+    # A deadline that passed while waiting for the rate limit doesn't open the circuit.
+    mocker.patch('oscar_docdata.gateway.get_circuit_breaker', return_value=breaker)
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_RETRY_ATTEMPTS', 1)
+    mocker.patch.object(DocdataClient, '_wait_for_rate_limit', side_effect=lambda operation: time.sleep(0.1))
+    send = mocker.spy(mock_transport, 'send')
+    client = DocdataClient(testing_mode=True)
+
+    for i in range(3):
+        with pytest.raises(DocdataTimeout):
+            client.status(docdata_responses.ORDER_KEY, deadline=time.time() + 0.05)
+    assert send.call_count == 0
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
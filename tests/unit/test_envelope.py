@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import datetime
+from decimal import Decimal as D
+
+import pytest
+
+from oscar_docdata import gateway
+from oscar_docdata.gateway import (
+    Address, Amount, Destination, DocdataClient, Invoice, Item, Name, Quantity, Shopper, Vat
+)
+from tests.testdata import docdata_responses
+
+
+@pytest.fixture()
+def sent_messages(mock_transport, mocker):
+    mock_transport.set_responses([docdata_responses.CREATE_PAYMENT_RESPONSE] * 2)
+    return mocker.spy(mock_transport, 'send')
+
+
+def _create(**kwargs):
+    client = DocdataClient(testing_mode=True, merchant_name='merchant & <co>', merchant_password='pass"word')
+    reply = client.create(**kwargs)
+    assert reply.order_key == docdata_responses.ORDER_KEY
+
+
+def _assert_same_envelope(sent_messages, mocker, **kwargs):
+    # Compare with the envelope that suds generates.
+    create_envelope = mocker.spy(gateway, 'create_envelope')
+    _create(**kwargs)
+    assert create_envelope.call_count == 1
+
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_FAST_SERIALIZER', False)
+    _create(**kwargs)
+    assert create_envelope.call_count == 1
+
+    fast_request, suds_request = [call[0][0] for call in sent_messages.call_args_list]
+    assert fast_request.message == suds_request.message
+    assert fast_request.url == suds_request.url
+    assert fast_request.headers['SOAPAction'] == suds_request.headers['SOAPAction']
+
+
+def _invoice(lines):
+    name = Name(first="Jane", last="Doe", prefix="Mrs")
+    address = Address("Main street", "12", "a", "1234 AB", "Amsterdam", "NH", "NL", company="ACME", careOf="Reception")
+    items = [
+        Item(
+            number=i,
+            name="Book <{0}> & more".format(i),
+            code="978{0}".format(i),
+            quantity=Quantity(2),
+            description="Ãpfel 'n peren" if i % 2 else None,
+            net_amount=Amount(D('10.00'), 'EUR'),
+            gross_amount=Amount(D('12.10'), 'EUR'),
+            vat=Vat(D('2.10'), 'EUR', 21),
+            total_net_amount=Amount(D('20.00'), 'EUR'),
+            total_gross_amount=Amount(D('24.20'), 'EUR'),
+            total_vat=Vat(D('4.20'), 'EUR', 21),
+            image_url="https://example.com/image.jpg?a=1&b=2" if i == 1 else None,
+        )
+        for i in range(lines)
+    ]
+    return Invoice(
+        total_net_amount=Amount(D('20.00') * lines, 'EUR'),
+        total_vat_amount=Vat(D('4.20') * lines, 'EUR', 21),
+        items=items,
+        ship_to=Destination(name, address),
+        additional_description="Deliver at the back",
+    )
+
+
+@pytest.mark.django_db
+def test_create_envelope_invoice(sent_messages, mocker):
+    name = Name(first="Jöhn", last="O'Brien", middle="van", initials="J.", suffix="Jr.")
+    _assert_same_envelope(
+        sent_messages, mocker,
+        order_id='1001',
+        total_gross_amount=Amount(D('72.60'), 'EUR'),
+        shopper=Shopper(
+            5, name, 'john@example.com', 'nl', gender='m',
+            date_of_birth=datetime.date(1980, 1, 31), phone_number='+3120123456', ipAddress='127.0.0.1'
+        ),
+        bill_to=Destination(name, Address("Street & co", "1", None, "1234AB", "Amsterdam", None, "NL", vatNumber="NL01")),
+        description="Order 1001 & <friends>",
+        invoice=_invoice(3),
+        receiptText="Thank you",
+        includeCosts=True,
+    )
+
+
+@pytest.mark.django_db
+def test_create_envelope_minimal(sent_messages, mocker):
+    name = Name(first="John", last="Doe")
+    _assert_same_envelope(
+        sent_messages, mocker,
+        order_id=1002,
+        total_gross_amount=Amount(D('0'), 'EUR'),
+        shopper=Shopper('', name, None, 'en', gender=None, phone_number='', mobile_phone_number=''),
+        bill_to=Destination(name, Address("Street", "N/A", None, "1234", "City", "", "NL")),
+        description='',
+        invoice=_invoice(0),
+    )
+
+
+@pytest.mark.django_db
+def test_create_envelope_custom_objects(sent_messages, mocker):
+    class CustomName(Name):
+        def to_xml(self, factory):
+            node = super(CustomName, self).to_xml(factory)
+            node.last = node.last.upper()
+            return node
+
+    # The customized to_xml() is respected, suds generates the envelope.
+    create_envelope = mocker.patch('oscar_docdata.gateway.create_envelope')
+    name = CustomName(first="John", last="Doe")
+    _create(
+        order_id='1003',
+        total_gross_amount=Amount(D('10.00'), 'EUR'),
+        shopper=Shopper(1, name, 'john@example.com', 'en'),
+        bill_to=Destination(name, Address("Street", "1", None, "1234AB", "City", None, "NL")),
+        description='Order',
+    )
+    assert not create_envelope.called
+    assert b':last>DOE</' in sent_messages.call_args[0][0].message
+
+
+@pytest.mark.django_db
+def test_create_envelope_subject_merchant(sent_messages, mocker):
+    # A subject merchant is not supported by the fast serializer.
+    create_envelope = mocker.spy(gateway, 'create_envelope')
+    client = DocdataClient(testing_mode=True)
+    client.merchant.subjectMerchant = client.client.factory.create('ns0:subjectMerchant')
+    client.merchant.subjectMerchant._name = 'sub-merchant'
+    name = Name(first="John", last="Doe")
+    client.create(
+        order_id='1004',
+        total_gross_amount=Amount(D('10.00'), 'EUR'),
+        shopper=Shopper(1, name, 'john@example.com', 'en'),
+        bill_to=Destination(name, Address("Street", "1", None, "1234AB", "City", None, "NL")),
+        description='Order',
+    )
+    assert not create_envelope.called
+    assert b'sub-merchant' in sent_messages.call_args[0][0].message
@@ -1,6 +1,7 @@
 import pytest
+from oscar.apps.payment.exceptions import PaymentError
 
-from oscar_docdata.exceptions import DocdataStatusError
+from oscar_docdata.exceptions import DocdataStatusError, DocdataUnavailable
 from oscar_docdata.facade import Facade
 from tests.testdata import docdata_responses
 
@@ -22,6 +23,20 @@ def test_facade_create_payment(oscar_order, mock_total_from_oscar_order, mock_tr
     assert docdata_order_key == docdata_responses.ORDER_KEY
 
 
+@pytest.mark.django_db
+def test_facade_create_payment_unavailable(oscar_order, mock_total_from_oscar_order, mocker):
+    mocker.patch('oscar_docdata.gateway.DocdataClient.create', side_effect=DocdataUnavailable('create'))
+    facade = Facade(testing_mode=True)
+
+    with pytest.raises(PaymentError):
+        facade.create_payment(
+            order_number=oscar_order.number,
+            total=mock_total_from_oscar_order(oscar_order),
+            user=oscar_order.user,
+            billing_address=oscar_order.billing_address
+        )
+
+
 @pytest.mark.django_db
 def test_facade_order_status_changed(docdata_order, mock_transport):
     mock_transport.set_responses([
@@ -0,0 +1,156 @@
+import socket
+import threading
+import time
+
+import pytest
+import suds
+from django.core.cache.backends.locmem import LocMemCache
+from six.moves import http_client
+
+from oscar_docdata.exceptions import DocdataStatusError, DocdataTimeout
+from oscar_docdata.gateway import DocdataClient, StatusReply, get_deadline
+from oscar_docdata.transport import get_request_timeout
+from oscar_docdata.metrics import counters
+from oscar_docdata.throttling import PRIORITY_LOW, RateLimiter, TokenBucket
+from tests.testdata import docdata_responses
+
+
+@pytest.fixture()
+def concurrent_transport(mock_transport, mocker):
+    """
+    Reply to the status requests by order key, and track how many requests run at the same time.
+    """
+    state = {'active': 0, 'max_active': 0}
+    lock = threading.Lock()
+
+    def _send(request):
+        with lock:
+            state['active'] += 1
+            state['max_active'] = max(state['max_active'], state['active'])
+        time.sleep(0.05)
+        with lock:
+            state['active'] -= 1
+
+        if b'unknown-key' in request.message:
+            response = docdata_responses.STATUS_ERROR_RESPONSE
+        else:
+            response = docdata_responses.STATUS_SUCCESS_RESPONSE
+        return suds.transport.Reply(http_client.OK, {}, suds.byte_str(response))
+
+    mocker.patch.object(mock_transport, 'send', side_effect=_send)
+    return state
+
+
+@pytest.mark.django_db
+def test_status_many(concurrent_transport):
+    client = DocdataClient(testing_mode=True)
+    order_keys = ['key-{0}'.format(i) for i in range(8)] + ['unknown-key']
+
+    results = {result.order_key: result for result in client.status_many(iter(order_keys), max_workers=4)}
+
+    assert sorted(results.keys()) == sorted(order_keys)
+    assert isinstance(results['key-0'].reply, StatusReply)
+    assert results['key-0'].error is None
+
+    # Errors are reported per order.
+    assert isinstance(results['unknown-key'].error, DocdataStatusError)
+    assert results['unknown-key'].reply is None
+
+    assert 1 < concurrent_transport['max_active'] <= 4
+
+
+def test_rate_limiter(mocker):
+    sleep = mocker.patch('oscar_docdata.throttling.time.sleep')
+    limiter = RateLimiter(rate=10)
+
+    assert limiter.wait() == 0
+    assert limiter.wait() == pytest.approx(0.1, abs=0.01)
+    assert sleep.call_count == 1
+
+
+@pytest.fixture()
+def token_bucket(mocker):
+    mocker.patch('oscar_docdata.throttling.time.time', return_value=1000.0)
+    cache = LocMemCache('token-bucket', {})
+    cache.clear()
+    return TokenBucket(cache, rate=10, burst=2, reserve=0.5)
+
+
+def test_token_bucket(token_bucket):
+    assert token_bucket.acquire('merchant') == (True, 0)
+    assert token_bucket.acquire('merchant') == (True, 0)
+    assert token_bucket.acquire('merchant') == (True, pytest.approx(0.1))
+
+    # The buckets are shared by name.
+    assert TokenBucket(token_bucket.cache, rate=10, burst=2).acquire('merchant') == (True, pytest.approx(0.2))
+    assert token_bucket.acquire('other') == (True, 0)
+
+
+def test_token_bucket_priority(token_bucket):
+    # The low priority calls leave half of the bucket to the high priority calls.
+    assert token_bucket.acquire('merchant', PRIORITY_LOW) == (True, 0)
+    assert token_bucket.acquire('merchant', PRIORITY_LOW) == (False, pytest.approx(0.1))
+    assert token_bucket.acquire('merchant') == (True, 0)
+
+
+@pytest.mark.django_db
+def test_client_rate_limit(mock_transport, mocker, token_bucket):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE] * 3)
+    mocker.patch('oscar_docdata.gateway.get_token_bucket', return_value=token_bucket)
+    sleep = mocker.patch('oscar_docdata.throttling.time.sleep')
+    client = DocdataClient(testing_mode=True)
+
+    counters.reset()
+    acquire = mocker.spy(token_bucket, 'acquire')
+    client.status(docdata_responses.ORDER_KEY)
+    assert acquire.call_args[0][1] == PRIORITY_LOW
+    assert sleep.call_count == 0
+
+    # The status call waits until the bucket has room for the low priority lane.
+    acquire.side_effect = [(False, 0.1), (True, 0)]
+    client.status(docdata_responses.ORDER_KEY)
+    sleep.assert_called_once_with(0.1)
+    assert counters.get('rate_limit_wait_seconds') == pytest.approx(0.1)
+
+
+@pytest.mark.django_db
+def test_client_timeout(mock_transport, mocker):
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_TIMEOUTS', {'status': 5})
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_RETRY_ATTEMPTS', 1)
+    timeouts = []
+
+    def _send(request):
+        timeouts.append(get_request_timeout())
+        raise socket.timeout("timed out")
+
+    send = mocker.patch.object(mock_transport, 'send', side_effect=_send)
+    client = DocdataClient(testing_mode=True)
+    with pytest.raises(DocdataTimeout):
+        client.status(docdata_responses.ORDER_KEY)
+    assert timeouts == [5]
+
+    # The deadline shortens the timeout.
+    with pytest.raises(DocdataTimeout):
+        client.status(docdata_responses.ORDER_KEY, deadline=get_deadline(2))
+    assert 1 < timeouts[-1] <= 2
+
+    # An expired deadline doesn't call Docdata at all.
+    with pytest.raises(DocdataTimeout):
+        client.status(docdata_responses.ORDER_KEY, deadline=time.time() - 1)
+    assert send.call_count == 2
+
+
+def test_process_reply():
+    # The replies of the envelopes that are sent without suds are still parsed by suds.
+    client = DocdataClient(testing_mode=True)
+    reply = client._process_reply('status', suds.byte_str(docdata_responses.STATUS_SUCCESS_RESPONSE))
+    assert reply.statusSuccess.report.approximateTotals.totalRegistered == 299
+
+    with pytest.raises(suds.WebFault):
+        client._process_reply('status', suds.byte_str(docdata_responses.SOAP_FAULT_RESPONSE), 500, 'Internal Server Error')
+
+    # Same error as suds raises, which is retried.
+    with pytest.raises(Exception) as e:
+        client._process_reply('status', b'', 503, 'Service Unavailable')
+    assert e.value.args == ((503, 'Service Unavailable'),)
+    assert client._process_reply('status', b'', 204) is None
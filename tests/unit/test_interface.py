@@ -1,6 +1,17 @@
+from decimal import Decimal as D
+
 import pytest
+import suds
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from oscar_docdata.exceptions import OrderUpdateConflict
 from oscar_docdata.interface import Interface
+from oscar_docdata.metrics import counters
+from oscar_docdata.models import DocdataOrder, DocdataPayment
+from oscar_docdata.reports import Authorization, PaymentReport, StatusReport
+from oscar_docdata.status_parser import parse_status_response
+from tests.testdata import docdata_responses
 
 
 @pytest.mark.django_db
@@ -30,3 +41,107 @@ def test_create_payment(docdata_order, oscar_order, mock_total_from_oscar_order)
             total=mock_total_from_oscar_order(oscar_order),
             user=oscar_order.user
         )
+
+
+@pytest.mark.django_db
+def test_update_order_payments(docdata_order, mock_transport, mocker):
+    mock_transport.set_responses([docdata_responses.STATUS_MULTIPLE_PAYMENTS_RESPONSE])
+    order_status_changed = mocker.patch.object(Interface, 'order_status_changed')
+    interface = Interface(testing_mode=True)
+    interface.update_order(docdata_order)
+
+    order_status_changed.assert_called_once_with(docdata_order, 'new', 'paid_refunded')
+    assert docdata_order.total_refunded == D('10.00')
+    assert docdata_order.total_charged_back == D('5.00')
+
+    ideal, card = docdata_order.payments.order_by('payment_id')
+    assert ideal.status == 'CANCELED'
+    assert ideal.amount_allocated == 0
+    assert card.status == 'AUTHORIZED'
+    assert card.amount_allocated == D('50.00')
+    assert card.amount_debited == D('50.00')
+    assert card.amount_refunded == D('10.00')  # The failed refund is not included.
+    assert card.amount_chargeback == D('5.00')
+    assert not hasattr(card, '_source')
+
+
+@pytest.mark.django_db
+def test_update_order_unchanged(docdata_order, mock_transport, mocker):
+    mock_transport.set_responses([docdata_responses.STATUS_MULTIPLE_PAYMENTS_RESPONSE] * 2)
+    mocker.patch.object(Interface, 'order_status_changed')
+    interface = Interface(testing_mode=True)
+    interface.update_order(docdata_order)
+    assert docdata_order.report_fingerprint
+
+    # The same report again doesn't write anything.
+    counters.reset()
+    save = mocker.patch.object(DocdataOrder, 'save')
+    payment_updated = mocker.patch('oscar_docdata.interface.payment_updated')
+    interface.update_order(DocdataOrder.objects.get(pk=docdata_order.pk))
+    assert not save.called
+    assert not payment_updated.send.called
+    assert counters.get('report_unchanged') == 1
+
+
+@pytest.mark.django_db
+def test_store_report_lines_queries(docdata_order, mocker):
+    report = parse_status_response(suds.byte_str(docdata_responses.STATUS_MULTIPLE_PAYMENTS_RESPONSE))
+    payment_added = mocker.patch('oscar_docdata.interface.payment_added')
+    payment_updated = mocker.patch('oscar_docdata.interface.payment_updated')
+    interface = Interface(testing_mode=True)
+
+    # The order is locked, as the new payment lines can't be locked yet.
+    # One query to lock the existing payments, one to insert the new ones.
+    with CaptureQueriesContext(connection) as queries:
+        interface._store_report_lines(docdata_order, report)
+    assert len([q for q in queries if 'docdataorder' in q['sql'] and q['sql'].startswith('SELECT')]) == 1
+    assert len([q for q in queries if 'docdatapayment' in q['sql']]) == 2
+    assert payment_added.send.call_count == 2
+    assert docdata_order.payments.count() == 2
+
+    # Only the changed line is updated.
+    card = report.payments[0]
+    changed_card = PaymentReport(card.id, card.payment_method, Authorization(
+        'AUTHORIZED', 5000, 'EUR', 'ACQUIRER_APPROVED', captures=card.authorization.captures
+    ))
+    changed_report = StatusReport(report.totals, [changed_card, report.payments[1]])
+    with CaptureQueriesContext(connection) as queries:
+        interface._store_report_lines(docdata_order, changed_report)
+    assert len([q for q in queries if 'docdatapayment' in q['sql']]) == 2
+    payment_updated.send.assert_called_once_with(sender=DocdataPayment, order=docdata_order, payment=mocker.ANY)
+    assert docdata_order.payments.get(payment_id=card.id).amount_refunded == 0
+
+
+@pytest.mark.django_db
+def test_update_order_optimistic(docdata_order, mock_transport, mocker):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE] * 2)
+    mocker.patch.object(Interface, 'order_status_changed')
+    interface = Interface(testing_mode=True)
+    fetch_status = interface.fetch_status
+
+    def _concurrent_fetch(order, deadline=None):
+        # Another process stores a report while the first status is fetched.
+        if not _concurrent_fetch.called:
+            _concurrent_fetch.called = True
+            DocdataOrder.objects.filter(pk=order.pk).update(version=order.version + 1, report_fingerprint='other')
+        return fetch_status(order, deadline=deadline)
+
+    _concurrent_fetch.called = False
+    mocker.patch.object(interface, 'fetch_status', side_effect=_concurrent_fetch)
+    counters.reset()
+
+    order = interface.update_order_optimistic(docdata_order)
+    assert order.status == DocdataOrder.STATUS_PAID
+    assert order.version == 2
+    assert interface.fetch_status.call_count == 2
+    assert counters.get('order_update_conflict') == 1
+
+
+@pytest.mark.django_db
+def test_update_order_optimistic_conflict(docdata_order, mock_transport, mocker):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE] * 2)
+    interface = Interface(testing_mode=True)
+    DocdataOrder.objects.filter(pk=docdata_order.pk).update(version=5)
+
+    with pytest.raises(OrderUpdateConflict):
+        interface.update_order_optimistic(docdata_order, max_attempts=1)
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+import pytest
+from django.utils.timezone import now
+
+from oscar_docdata.leases import claim_orders, get_lease_owner, release_leases, renew_leases
+from oscar_docdata.models import DocdataOrder
+
+
+@pytest.mark.django_db
+def test_claim_orders(docdata_order):
+    owner1 = get_lease_owner()
+    owner2 = get_lease_owner()
+    assert owner1 != owner2
+
+    queryset = DocdataOrder.objects.all()
+    assert claim_orders(queryset, owner1) == [docdata_order.pk]
+    assert claim_orders(queryset, owner2) == []
+
+    docdata_order.refresh_from_db()
+    assert docdata_order.lease_owner == owner1
+    assert docdata_order.lease_expires > now()
+
+    # Only the owner can release the order.
+    release_leases([docdata_order.pk], owner2)
+    assert claim_orders(queryset, owner2) == []
+    release_leases([docdata_order.pk], owner1)
+    assert claim_orders(queryset, owner2) == [docdata_order.pk]
+
+
+@pytest.mark.django_db
+def test_claim_expired_lease(docdata_order):
+    owner1 = get_lease_owner()
+    owner2 = get_lease_owner()
+    queryset = DocdataOrder.objects.all()
+    assert claim_orders(queryset, owner1, duration=60) == [docdata_order.pk]
+
+    # The lease of a crashed process expires.
+    DocdataOrder.objects.filter(pk=docdata_order.pk).update(lease_expires=now() - timedelta(seconds=1))
+    assert claim_orders(queryset, owner2) == [docdata_order.pk]
+
+    renew_leases([docdata_order.pk], owner1, duration=3600)
+    docdata_order.refresh_from_db()
+    assert docdata_order.lease_expires < now() + timedelta(seconds=600)
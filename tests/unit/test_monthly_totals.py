@@ -0,0 +1,66 @@
+from decimal import Decimal as D
+
+import pytest
+from django.core.management import call_command
+from six import StringIO
+
+from oscar_docdata.interface import Interface
+from oscar_docdata.models import DocdataMonthlyTotal, DocdataOrder
+from oscar_docdata.monthly_totals import get_month, rebuild_monthly_totals, track_monthly_totals
+from tests.testdata import docdata_responses
+
+
+def _get_totals():
+    return sorted(
+        DocdataMonthlyTotal.objects.filter(order_count__gt=0).values_list(
+            'merchant_name', 'month', 'currency', 'status', 'order_count', 'total_registered', 'total_captured',
+            'total_refunded', 'total_charged_back'
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_track_monthly_totals(docdata_order, mock_transport, mocker):
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_MONTHLY_TOTALS', True)
+    mocker.patch.object(Interface, 'order_status_changed')
+    mock_transport.set_responses([docdata_responses.STATUS_MULTIPLE_PAYMENTS_RESPONSE])
+    assert rebuild_monthly_totals() == 1
+
+    # The order moves from the 'new' to the 'paid_refunded' totals.
+    Interface(testing_mode=True).update_order(docdata_order)
+    totals = DocdataMonthlyTotal.objects.get(status=DocdataOrder.STATUS_PAID_REFUNDED)
+    assert totals.month == get_month(docdata_order.created)
+    assert totals.order_count == 1
+    assert totals.total_refunded == D('10.00')
+    assert DocdataMonthlyTotal.objects.get(status=DocdataOrder.STATUS_NEW).order_count == 0
+
+    # Queryset updates are tracked too.
+    with track_monthly_totals(docdata_order):
+        DocdataOrder.objects.filter(pk=docdata_order.pk).update(status=DocdataOrder.STATUS_EXPIRED)
+
+    tracked = _get_totals()
+    rebuild_monthly_totals()
+    assert _get_totals() == tracked
+
+
+@pytest.mark.django_db
+def test_track_monthly_totals_disabled(docdata_order):
+    with track_monthly_totals(docdata_order):
+        DocdataOrder.objects.filter(pk=docdata_order.pk).update(status=DocdataOrder.STATUS_EXPIRED)
+    assert not DocdataMonthlyTotal.objects.exists()
+
+
+@pytest.mark.django_db
+def test_report_monthly_totals(docdata_order, mocker, django_assert_num_queries):
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_MONTHLY_TOTALS', True)
+    call_command("docdata_rebuild_totals", stdout=StringIO())
+    DocdataOrder.objects.all().delete()  # Make sure the report reads the monthly totals
+
+    output = StringIO()
+    with django_assert_num_queries(1):
+        call_command("docdata_report", "--format", "csv", stdout=output)
+    assert len(output.getvalue().splitlines()) == 2
+
+    output = StringIO()
+    call_command("docdata_report", "--format", "csv", "--from-orders", stdout=output)
+    assert len(output.getvalue().splitlines()) == 1
@@ -0,0 +1,64 @@
+import pytest
+
+from oscar_docdata.exceptions import DocdataStatusError
+from oscar_docdata.models import DocdataNotification
+from oscar_docdata.notifications import NotificationWorker, queue_notification
+
+
+@pytest.mark.django_db
+def test_worker_retries_failures(docdata_order, mocker):
+    queue_notification(docdata_order.merchant_order_id)
+    facade = mocker.Mock()
+    facade.update_order.side_effect = DocdataStatusError('ERROR', "Failed")
+    worker = NotificationWorker(facade=facade, max_attempts=2)
+
+    assert worker.drain() == (0, 1)
+    notification = DocdataNotification.objects.get()
+    assert notification.attempts == 1
+    assert "Failed" in notification.last_error
+
+    # Stops after the maximum number of attempts.
+    assert worker.drain() == (0, 1)
+    assert worker.drain() == (0, 0)
+    assert facade.update_order.call_count == 2
+
+
+@pytest.mark.django_db
+def test_worker_retries_new_notification(docdata_order, mocker):
+    queue_notification(docdata_order.merchant_order_id)
+    facade = mocker.Mock()
+    facade.update_order.side_effect = DocdataStatusError('ERROR', "Failed")
+    worker = NotificationWorker(facade=facade, max_attempts=1)
+    assert worker.drain() == (0, 1)
+    assert worker.drain() == (0, 0)
+
+    # A new notification for the order resets the attempts.
+    queue_notification(docdata_order.merchant_order_id)
+    notification = DocdataNotification.objects.get()
+    assert notification.attempts == 0
+    assert notification.last_error == ''
+
+    facade.update_order.side_effect = None
+    assert worker.drain() == (1, 0)
+    assert not DocdataNotification.objects.exists()
+
+
+@pytest.mark.django_db
+def test_worker_keeps_new_notification(docdata_order, mocker):
+    queue_notification(docdata_order.merchant_order_id)
+    facade = mocker.Mock()
+    facade.update_order.side_effect = lambda order: queue_notification(order.merchant_order_id)
+    worker = NotificationWorker(facade=facade)
+
+    # The notification that arrived during the update is processed in the next run.
+    assert worker.drain() == (1, 0)
+    assert DocdataNotification.objects.count() == 1
+    assert worker.drain() == (1, 0)
+    assert DocdataNotification.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_worker_unknown_order():
+    queue_notification('unknown')
+    assert NotificationWorker(facade=object()).drain() == (0, 1)
+    assert not DocdataNotification.objects.exists()
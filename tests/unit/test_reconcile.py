@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from django.utils.timezone import now
+
+from oscar_docdata.models import DocdataOrder
+from oscar_docdata.reconcile import ReconcileSchedule, Reconciler, get_next_check
+from tests.testdata import docdata_responses
+
+T0 = datetime(2020, 1, 1, 12, 0, 0)
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+
+
+def test_get_next_check():
+    assert get_next_check(T0, T0, MINUTE, HOUR) == T0 + MINUTE
+    assert get_next_check(T0, T0 + MINUTE, MINUTE, HOUR) == T0 + 2 * MINUTE
+    assert get_next_check(T0, T0 + 3 * MINUTE, MINUTE, HOUR) == T0 + 4 * MINUTE
+    assert get_next_check(T0, T0 + 40 * MINUTE, MINUTE, HOUR) == T0 + 64 * MINUTE
+
+    # Old orders are checked every max_interval.
+    assert get_next_check(T0, T0 + 5 * HOUR, MINUTE, HOUR) == T0 + 6 * HOUR
+
+
+def test_schedule():
+    schedule = ReconcileSchedule()
+    schedule.add(1, T0 + 2 * MINUTE)
+    schedule.add(2, T0 + MINUTE)
+    schedule.add(3, T0 + 3 * MINUTE)
+    schedule.add(1, T0 + HOUR)  # replaces the previous entry
+
+    assert len(schedule) == 3
+    assert schedule.next_due() == T0 + MINUTE
+    assert schedule.pop_due(T0) == []
+    assert schedule.pop_due(T0 + 5 * MINUTE, limit=1) == [2]
+    assert schedule.pop_due(T0 + 5 * MINUTE) == [3]
+    assert schedule.next_due() == T0 + HOUR
+    assert 1 in schedule and 2 not in schedule
+
+
+@pytest.mark.django_db
+def test_reconcile_once(docdata_order, mock_transport, mocker):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE])
+    DocdataOrder.objects.filter(pk=docdata_order.pk).update(created=now() - 2 * MINUTE, updated=now() - 2 * MINUTE)
+    reconciler = Reconciler(workers=1, min_interval=60, max_interval=3600)
+
+    assert reconciler.run_once() == 1
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_PAID
+
+    # Paid orders are no longer checked.
+    assert len(reconciler.schedule) == 0
+    assert reconciler.run_once() == 0
+
+
+@pytest.mark.django_db
+def test_reconcile_failure(docdata_order, mocker):
+    facade = mocker.Mock()
+    facade.update_order.side_effect = ValueError("Failed")
+    reconciler = Reconciler(facade=facade, workers=1, min_interval=60, max_interval=3600)
+
+    # Young orders are not checked yet.
+    assert reconciler.run_once() == 0
+    assert len(reconciler.schedule) == 1
+
+    # A failed check is scheduled again.
+    DocdataOrder.objects.filter(pk=docdata_order.pk).update(created=now() - 2 * MINUTE, updated=now() - 2 * MINUTE)
+    reconciler.schedule = ReconcileSchedule()
+    assert reconciler.run_once() == 1
+    assert facade.update_order.call_count == 1
+    assert reconciler.schedule.next_due() > now()
+
+
+@pytest.mark.django_db
+def test_reconcile_stop(mocker):
+    reconciler = Reconciler(facade=mocker.Mock(), workers=2)
+    threading.Timer(0.2, reconciler.stop).start()
+    reconciler.run()  # returns after stop()
+
+
+@pytest.mark.django_db
+def test_reconcile_claimed_elsewhere(docdata_order, mocker):
+    facade = mocker.Mock()
+    DocdataOrder.objects.filter(pk=docdata_order.pk).update(created=now() - 2 * MINUTE, updated=now() - 2 * MINUTE)
+    reconciler1 = Reconciler(facade=facade, workers=1, min_interval=60, max_interval=3600)
+    reconciler2 = Reconciler(facade=facade, workers=1, min_interval=60, max_interval=3600)
+    reconciler1.load()
+    reconciler2.load()
+
+    # Only one reconciler checks the order, the other one follows the stored schedule.
+    assert reconciler1.run_once() == 1
+    assert reconciler2.run_once() == 0
+    assert facade.update_order.call_count == 1
+
+    docdata_order.refresh_from_db()
+    assert docdata_order.lease_owner == ''
+    assert docdata_order.next_check > now()
+    assert reconciler2.schedule.next_due() == docdata_order.next_check
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from oscar_docdata.registry import ClientRegistry
+
+
+@pytest.fixture()
+def passwords(mocker):
+    # patch.dict() only returns the dict since Python 3.8
+    passwords = {'shop1': 'secret1', 'shop2': 'secret2'}
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_MERCHANT_PASSWORDS', passwords)
+    return passwords
+
+
+class FakeClient(object):
+    def __init__(self, testing_mode, merchant_name, merchant_password):
+        self.testing_mode = testing_mode
+        self.merchant_name = merchant_name
+
+
+@pytest.mark.django_db
+def test_registry_reuses_clients(passwords):
+    registry = ClientRegistry()
+    client = registry.get('shop1', testing_mode=True)
+    assert client.merchant_name == 'shop1'
+    assert registry.get('shop1', testing_mode=True) is client
+    assert registry.get('shop2', testing_mode=True) is not client
+    assert registry.stats() == {'size': 2, 'hits': 1, 'misses': 2, 'evictions': 0, 'invalidations': 0}
+
+    with pytest.raises(ImproperlyConfigured):
+        registry.get('unknown')
+
+
+@pytest.mark.django_db
+def test_registry_invalidation(passwords):
+    registry = ClientRegistry()
+    client = registry.get('shop1', testing_mode=True)
+
+    # Changed credentials construct a new client.
+    passwords['shop1'] = 'changed'
+    new_client = registry.get('shop1', testing_mode=True)
+    assert new_client is not client
+    assert new_client.merchant._password == 'changed'
+
+    registry.invalidate('shop1')
+    assert len(registry) == 0
+    assert registry.stats()['invalidations'] == 2
+
+
+@pytest.mark.django_db
+def test_registry_bounded(passwords):
+    registry = ClientRegistry(client_class=FakeClient, max_size=2)
+    client = registry.get('shop1', testing_mode=True)
+    assert registry.get('shop1', testing_mode=False) is not client
+    registry.get('shop2', testing_mode=True)
+    assert len(registry) == 2
+    assert registry.get('shop1', testing_mode=True) is not client
+    assert registry.stats()['evictions'] == 2
+
+
+def test_registry_threads(passwords):
+    registry = ClientRegistry(client_class=FakeClient)
+    clients = []
+
+    def _get():
+        for i in range(50):
+            clients.append(registry.get('shop1', testing_mode=True))
+
+    threads = [threading.Thread(target=_get) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = registry.stats()
+    assert stats['hits'] + stats['misses'] == 200
+    assert stats['size'] == 1
+    assert clients[-1] is registry.get('shop1', testing_mode=True)
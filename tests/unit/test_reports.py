@@ -0,0 +1,57 @@
+import pickle
+
+import pytest
+import suds
+
+from oscar_docdata.reports import Authorization, PaymentReport, ReportTotals, StatusReport, Transaction
+from oscar_docdata.status_parser import parse_status_response
+from tests.testdata import docdata_responses
+
+
+def _report(captured=299):
+    return StatusReport(
+        totals=ReportTotals('EUR', '2019-02-10 16:52:52', total_registered=299, total_captured=captured),
+        payments=[
+            PaymentReport('4910079745', 'IDEAL', Authorization(
+                'AUTHORIZED', '299', 'EUR', 'ACQUIRER_APPROVED',
+                captures=[Transaction('CAPTURED', 299, 'EUR')]
+            )),
+        ]
+    )
+
+
+def test_report_compare():
+    assert _report() == _report()
+    assert hash(_report()) == hash(_report())
+    assert _report() != _report(captured=0)
+    assert _report().payments[0].authorization.amount == 299
+
+
+def test_report_immutable():
+    report = _report()
+    with pytest.raises(AttributeError):
+        report.totals = None
+    with pytest.raises(AttributeError):
+        report.extra = True
+    assert not hasattr(report, '__dict__')
+
+
+def test_report_pickle():
+    report = _report()
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert pickle.loads(pickle.dumps(report, protocol)) == report
+
+
+def test_report_fingerprint():
+    assert _report().fingerprint() == _report().fingerprint()
+    assert _report().fingerprint() != _report(captured=0).fingerprint()
+    assert len(_report().fingerprint()) == 64
+
+
+def test_report_fingerprint_exchange_rate_date():
+    # Docdata sends a new exchange rate date, while nothing else changed.
+    other_response = docdata_responses.STATUS_SUCCESS_RESPONSE.replace('2019-02-10 16:52:52', '2019-02-11 09:00:00')
+    report = parse_status_response(suds.byte_str(docdata_responses.STATUS_SUCCESS_RESPONSE))
+    other_report = parse_status_response(suds.byte_str(other_response))
+    assert report.totals.exchange_rate_date != other_report.totals.exchange_rate_date
+    assert report.fingerprint() == other_report.fingerprint()
@@ -0,0 +1,87 @@
+import socket
+from decimal import Decimal as D
+
+import pytest
+from six.moves.urllib.error import URLError
+
+from oscar_docdata.exceptions import DocdataStatusError, DocdataTimeout
+from oscar_docdata.gateway import Address, Amount, Destination, DocdataClient, Name, Shopper
+from oscar_docdata.metrics import counters
+from oscar_docdata.retry import RetryPolicy, is_transient_error
+from tests.testdata import docdata_responses
+
+
+def test_is_transient_error():
+    assert is_transient_error(URLError("Connection refused"))
+    assert is_transient_error(socket.error("Connection reset by peer"))
+    assert is_transient_error(DocdataTimeout('status'))
+    assert is_transient_error(Exception((503, "Service Unavailable")))
+    assert not is_transient_error(Exception((404, "Not Found")))
+    assert not is_transient_error(DocdataStatusError('REQUEST_DATA_INCORRECT', "Order not found"))
+    assert not is_transient_error(ValueError("Failed"))
+
+
+def test_retry_policy(mocker):
+    mocker.patch('oscar_docdata.retry.random.uniform', side_effect=lambda low, high: high)
+    mocker.patch('oscar_docdata.retry.time.time', return_value=1000.0)
+    policy = RetryPolicy(max_attempts=4, backoff=0.5, max_backoff=1.5, budget=10)
+    error = URLError("Connection refused")
+
+    assert [policy.get_retry_delay('status', attempt, error, 1000.0) for attempt in range(4)] == [0.5, 1.0, 1.5, None]
+
+    # The budget and deadline limit the retries.
+    assert policy.get_retry_delay('status', 0, error, 990.0) is None
+    assert policy.get_retry_delay('status', 0, error, 1000.0, deadline=1000.2) is None
+
+    # Non-idempotent calls are never retried.
+    assert policy.get_retry_delay('create', 0, error, 1000.0) is None
+
+
+@pytest.mark.django_db
+def test_client_retry(mock_transport, mocker):
+    sleep = mocker.patch('oscar_docdata.retry.time.sleep')
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE])
+    send = mock_transport.send
+    failures = [URLError("Connection refused"), socket.error("Connection reset by peer")]
+
+    def _send(request):
+        if failures:
+            raise failures.pop(0)
+        return send(request)
+
+    mocker.patch.object(mock_transport, 'send', side_effect=_send)
+    client = DocdataClient(testing_mode=True)
+
+    counters.reset()
+    reply = client.status(docdata_responses.ORDER_KEY)
+    assert reply.order_key == docdata_responses.ORDER_KEY
+    assert mock_transport.send.call_count == 3
+    assert sleep.call_count == 2
+    assert counters.get('retry_attempt') == 2
+
+
+@pytest.mark.django_db
+def test_client_no_retry(mock_transport, mocker):
+    sleep = mocker.patch('oscar_docdata.retry.time.sleep')
+    client = DocdataClient(testing_mode=True)
+
+    # Errors that Docdata replies with are not retried.
+    mock_transport.set_responses([docdata_responses.STATUS_ERROR_RESPONSE])
+    send = mocker.spy(mock_transport, 'send')
+    with pytest.raises(DocdataStatusError):
+        client.status(docdata_responses.ORDER_KEY)
+    assert send.call_count == 1
+
+    # The create call is never retried, it could start a second payment.
+    send = mocker.patch.object(mock_transport, 'send', side_effect=URLError("Connection refused"))
+    name = Name(first="John", last="Doe")
+    with pytest.raises(URLError):
+        client.create(
+            order_id='1001',
+            total_gross_amount=Amount(D('10.00'), 'EUR'),
+            shopper=Shopper(1, name, 'john@example.com', 'en'),
+            bill_to=Destination(name, Address('Street', '1', None, '1234AB', 'Amsterdam', None, 'NL')),
+            description='Order',
+        )
+    assert send.call_count == 1
+    assert sleep.call_count == 0
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from oscar_docdata.exceptions import DocdataTimeout
+from oscar_docdata.interface import Interface
+from oscar_docdata.metrics import counters
+from oscar_docdata.singleflight import SingleFlight
+from tests.testdata import docdata_responses
+
+
+@pytest.fixture()
+def flight():
+    return SingleFlight(LocMemCache('single-flight', {}), timeout=2, poll_interval=0.01)
+
+
+def _run_concurrent(target, count=4):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_single_flight_shares_result(flight):
+    calls = []
+
+    def _status():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    counters.reset()
+    results = _run_concurrent(lambda: flight.call('key1', _status))
+    assert results == [1, 1, 1, 1]
+    assert len(calls) == 1
+    assert counters.get('single_flight_shared') == 3
+
+    # A next call is performed again.
+    assert flight.call('key1', _status) == 2
+
+
+def test_single_flight_error(flight):
+    calls = []
+
+    def _status():
+        calls.append(1)
+        time.sleep(0.1)
+        if len(calls) == 1:
+            raise IOError("timeout")
+        return 'ok'
+
+    errors = []
+
+    def _call():
+        try:
+            return flight.call('key1', _status)
+        except IOError as e:
+            errors.append(e)
+
+    # The waiting callers perform the call themselves.
+    results = _run_concurrent(_call, count=2)
+    assert len(errors) == 1
+    assert results.count('ok') == 1
+    assert len(calls) == 2
+
+
+def test_single_flight_deadline(flight):
+    started = threading.Event()
+
+    def _slow_status():
+        started.set()
+        time.sleep(0.5)
+        return 'ok'
+
+    leader = threading.Thread(target=lambda: flight.call('key1', _slow_status))
+    leader.start()
+    started.wait()
+
+    # The waiting caller gives up at its deadline, instead of the single-flight timeout.
+    start = time.time()
+    with pytest.raises(DocdataTimeout):
+        flight.call('key1', _slow_status, deadline=start + 0.1)
+    assert time.time() - start < 0.4
+    leader.join()
+
+
+@pytest.mark.django_db
+def test_fetch_status_single_flight(docdata_order, mock_transport, mocker, flight):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE])
+    mocker.patch('oscar_docdata.interface.get_single_flight', return_value=flight)
+    send = mock_transport.send
+
+    def _slow_send(request):
+        time.sleep(0.2)
+        return send(request)
+
+    mocker.patch.object(mock_transport, 'send', side_effect=_slow_send)
+    interface = Interface(testing_mode=True)
+
+    replies = _run_concurrent(lambda: interface.fetch_status(docdata_order), count=2)
+    assert mock_transport.send.call_count == 1
+    assert replies[0].report == replies[1].report
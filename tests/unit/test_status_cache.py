@@ -0,0 +1,103 @@
+import pickle
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from oscar_docdata.facade import Facade
+from oscar_docdata.gateway import DocdataClient
+from oscar_docdata.metrics import counters
+from oscar_docdata.models import DocdataOrder
+from oscar_docdata.notifications import NotificationWorker, queue_notification
+from oscar_docdata.reports import ReportTotals, StatusReport
+from oscar_docdata.status_cache import StatusCache
+from tests.testdata import docdata_responses
+
+
+@pytest.fixture()
+def status_cache(mocker):
+    status_cache = StatusCache(LocMemCache('status-cache', {}), ttl=60)
+    status_cache.cache.clear()  # locmem caches with the same name share their data
+    mocker.patch('oscar_docdata.gateway.get_status_cache', return_value=status_cache)
+    return status_cache
+
+
+@pytest.mark.django_db
+def test_status_cached(mock_transport, mocker, status_cache):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE])
+    sent_messages = mocker.spy(mock_transport, 'send')
+    client = DocdataClient(testing_mode=True)
+
+    counters.reset()
+    reply = client.status(docdata_responses.ORDER_KEY)
+    cached_reply = client.status(docdata_responses.ORDER_KEY)
+    assert sent_messages.call_count == 1
+    assert cached_reply.report == reply.report
+    assert counters.get('status_cache_miss') == 1
+    assert counters.get('status_cache_hit') == 1
+
+    # The cached report is picklable, so any cache backend can store it.
+    assert pickle.loads(pickle.dumps(cached_reply.report)) == reply.report
+
+
+@pytest.mark.django_db
+def test_status_cache_key(status_cache):
+    assert status_cache.get_key('merchant1', docdata_responses.ORDER_KEY, True) != status_cache.get_key('merchant2', docdata_responses.ORDER_KEY, True)
+    assert status_cache.get_key('merchant1', docdata_responses.ORDER_KEY, True) != status_cache.get_key('merchant1', docdata_responses.ORDER_KEY, False)
+
+    client1 = DocdataClient(testing_mode=True, merchant_name='merchant1', merchant_password='secret')
+    client2 = DocdataClient(testing_mode=True, merchant_name='merchant2', merchant_password='secret')
+    report = StatusReport(totals=ReportTotals(exchanged_to='EUR', exchange_rate_date=None, total_registered=1000))
+    status_cache.set('merchant1', docdata_responses.ORDER_KEY, True, report)
+    assert client1._get_cached_status(docdata_responses.ORDER_KEY).report == report
+    assert client2._get_cached_status(docdata_responses.ORDER_KEY) is None
+
+
+@pytest.mark.django_db
+def test_cancel_invalidates_status(mock_transport, mocker, status_cache):
+    mock_transport.set_responses([
+        docdata_responses.STATUS_SUCCESS_RESPONSE,
+        docdata_responses.CANCELLED_PAYMENT_RESPONSE,
+        docdata_responses.STATUS_CANCELLED_RESPONSE,
+    ])
+    client = DocdataClient(testing_mode=True)
+
+    reply = client.status(docdata_responses.ORDER_KEY)
+    assert isinstance(status_cache.get(client.merchant_name, docdata_responses.ORDER_KEY, True), StatusReport)
+
+    client.cancel(docdata_responses.ORDER_KEY)
+    assert status_cache.get(client.merchant_name, docdata_responses.ORDER_KEY, True) is None
+
+    cancelled_reply = client.status(docdata_responses.ORDER_KEY)
+    assert cancelled_reply.report != reply.report
+
+
+@pytest.mark.django_db
+def test_notification_skips_status_cache(django_app, docdata_order, mock_transport, mocker, status_cache):
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_STATUS_CACHE', 'default')
+    mock_transport.set_responses([
+        docdata_responses.STATUS_CANCELLED_RESPONSE,
+        docdata_responses.STATUS_SUCCESS_RESPONSE,
+    ])
+
+    # The return view caches the report, before the shopper completed the payment.
+    django_app.get("/api/docdata/return/?callback=PENDING&order_id={}".format(docdata_order.order_key))
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_NEW
+
+    # The status changed notification fetches the new status.
+    response = django_app.get("/api/docdata/update_order/?order_id={}".format(docdata_order.merchant_order_id))
+    assert response.status == "200 OK"
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_PAID
+
+
+@pytest.mark.django_db
+def test_queued_notification_skips_status_cache(docdata_order, mock_transport, status_cache):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE])
+    report = StatusReport(totals=ReportTotals(exchanged_to='EUR', exchange_rate_date=None, total_registered=1000))
+    status_cache.set(docdata_order.merchant_name, docdata_order.order_key, True, report)
+
+    queue_notification(docdata_order.merchant_order_id)
+    assert NotificationWorker(facade=Facade(testing_mode=True)).drain() == (1, 0)
+    docdata_order.refresh_from_db()
+    assert docdata_order.status == DocdataOrder.STATUS_PAID
@@ -0,0 +1,100 @@
+import pytest
+import suds
+
+from oscar_docdata.exceptions import DocdataStatusError
+from oscar_docdata.gateway import DocdataClient
+from oscar_docdata.reports import PaymentReport, ReportTotals, StatusReport
+from oscar_docdata.status_parser import ParseError, ReportError, iter_status_records, parse_status_response
+from tests.testdata import docdata_responses
+
+
+@pytest.mark.parametrize('response', [
+    docdata_responses.STATUS_SUCCESS_RESPONSE,
+    docdata_responses.STATUS_CANCELLED_RESPONSE,
+    docdata_responses.STATUS_MULTIPLE_PAYMENTS_RESPONSE,
+])
+@pytest.mark.django_db
+def test_parse_same_as_suds(response):
+    client = DocdataClient(testing_mode=True)
+    body = suds.byte_str(response)
+    suds_report = client._process_reply('status', body).statusSuccess.report
+
+    report = parse_status_response(body)
+    assert isinstance(report, StatusReport)
+    assert report == StatusReport.from_suds(suds_report)
+
+
+def test_iter_status_records():
+    records = list(iter_status_records(suds.byte_str(docdata_responses.STATUS_MULTIPLE_PAYMENTS_RESPONSE)))
+    assert [type(record) for record in records] == [ReportTotals, PaymentReport, PaymentReport]
+
+    authorization = records[1].authorization
+    assert authorization.amount == 5000
+    assert [refund.status for refund in authorization.refunds] == ['CAPTURED', 'FAILED']
+    assert authorization.refunds[1].reason is None
+    assert authorization.chargebacks[0].reason == 'Fraud'
+    assert records[2].authorization.captures == ()
+    assert records[2].authorization.reason == 'Cancelled by shopper'
+
+
+def test_parse_errors():
+    errors = parse_status_response(suds.byte_str(docdata_responses.STATUS_ERROR_RESPONSE))
+    assert len(errors) == 1
+    assert isinstance(errors[0], ReportError)
+    assert errors[0]._code == 'REQUEST_DATA_INCORRECT'
+
+
+@pytest.mark.parametrize('replacements', [
+    [('<authorization>', '<authorisation>'), ('</authorization>', '</authorisation>')],
+    [('<amount currency="EUR">299</amount>', '<sum currency="EUR">299</sum>')],
+    [('<totalRegistered>299</totalRegistered>', '<totalRegistered>2.99</totalRegistered>')],
+])
+def test_parse_invalid_records(replacements):
+    body = docdata_responses.STATUS_SUCCESS_RESPONSE
+    for old, new in replacements:
+        body = body.replace(old, new)
+    with pytest.raises(ParseError):
+        parse_status_response(suds.byte_str(body))
+
+
+def test_parse_other_response():
+    assert parse_status_response(suds.byte_str(docdata_responses.CANCELLED_PAYMENT_RESPONSE)) is None
+
+
+@pytest.mark.django_db
+def test_status_envelope(mock_transport, mocker):
+    mock_transport.set_responses([docdata_responses.STATUS_SUCCESS_RESPONSE] * 2)
+    sent_messages = mocker.spy(mock_transport, 'send')
+    client = DocdataClient(testing_mode=True, merchant_name='merchant & co', merchant_password='pass"word')
+
+    reply = client.status(docdata_responses.ORDER_KEY)
+    assert isinstance(reply.report, StatusReport)
+
+    # The envelope is the same as suds generates.
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_FAST_STATUS_PARSER', False)
+    suds_reply = client.status(docdata_responses.ORDER_KEY)
+    assert suds_reply.report == reply.report
+
+    fast_request, suds_request = [call[0][0] for call in sent_messages.call_args_list]
+    assert fast_request.message == suds_request.message
+    assert fast_request.headers['SOAPAction'] == suds_request.headers['SOAPAction']
+
+
+@pytest.mark.django_db
+def test_status_error(mock_transport):
+    mock_transport.set_responses([docdata_responses.STATUS_ERROR_RESPONSE])
+    client = DocdataClient(testing_mode=True)
+
+    with pytest.raises(DocdataStatusError) as excinfo:
+        client.status('unknown-key')
+    assert excinfo.value.code == 'REQUEST_DATA_INCORRECT'
+
+
+@pytest.mark.django_db
+def test_status_fault(mock_transport):
+    # Other replies are still handled by suds.
+    mock_transport.set_responses([docdata_responses.SOAP_FAULT_RESPONSE])
+    client = DocdataClient(testing_mode=True)
+
+    with pytest.raises(suds.WebFault):
+        client.status(docdata_responses.ORDER_KEY)
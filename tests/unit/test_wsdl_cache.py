@@ -0,0 +1,104 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from six import StringIO
+
+import pytest
+
+from oscar_docdata.gateway import create_suds_client, get_wsdl_url
+from oscar_docdata.wsdl_cache import WsdlCache
+
+from tests.suds_transport import DocdataMockTransport, WSDL
+
+
+def test_wsdl_cache_stores_definitions(tmpdir, mocker):
+    url = get_wsdl_url(testing_mode=True)
+    wsdl_cache = WsdlCache(str(tmpdir))
+
+    client = create_suds_client(url, wsdl_cache=wsdl_cache, transport=DocdataMockTransport())
+    assert client.factory.create('ns0:merchant') is not None
+
+    stamp = wsdl_cache.get_stamp(url)
+    assert stamp['url'] == url
+    assert stamp['content_hash'] is not None
+
+    # A new process reads the parsed definitions, without fetching the WSDL and XSD.
+    open_spy = mocker.spy(DocdataMockTransport, 'open')
+    client = create_suds_client(url, wsdl_cache=WsdlCache(str(tmpdir)), transport=DocdataMockTransport())
+    assert client.factory.create('ns0:merchant') is not None
+    assert open_spy.call_count == 0
+
+
+def test_wsdl_cache_process_independent_key(tmpdir, mocker):
+    url = get_wsdl_url(testing_mode=True)
+
+    # Like suds-jurko, the cache key of suds differs in every process.
+    mocker.patch('suds.reader.Reader.mangle', lambda self, name, x: '{0}-{1}'.format(abs(hash((name, 'process1'))), x))
+    create_suds_client(url, wsdl_cache=WsdlCache(str(tmpdir)), transport=DocdataMockTransport())
+
+    mocker.patch('suds.reader.Reader.mangle', lambda self, name, x: '{0}-{1}'.format(abs(hash((name, 'process2'))), x))
+    open_spy = mocker.spy(DocdataMockTransport, 'open')
+    client = create_suds_client(url, wsdl_cache=WsdlCache(str(tmpdir)), transport=DocdataMockTransport())
+    assert client.factory.create('ns0:merchant') is not None
+    assert open_spy.call_count == 0
+
+
+def test_wsdl_cache_ignores_stale_entries(tmpdir, mocker):
+    url = get_wsdl_url(testing_mode=True)
+    create_suds_client(url, wsdl_cache=WsdlCache(str(tmpdir)), transport=DocdataMockTransport())
+
+    # Entries of another release are not used, the WSDL is fetched again.
+    mocker.patch('oscar_docdata.wsdl_cache.oscar_docdata_version', '0.0.0')
+    open_spy = mocker.spy(DocdataMockTransport, 'open')
+    create_suds_client(url, wsdl_cache=WsdlCache(str(tmpdir)), transport=DocdataMockTransport())
+    assert open_spy.call_count > 0
+    assert WsdlCache(str(tmpdir)).get_stamp(url)['version'] == '0.0.0'
+
+
+def test_wsdl_cache_ignores_corrupt_entries(tmpdir, mocker):
+    url = get_wsdl_url(testing_mode=True)
+    create_suds_client(url, wsdl_cache=WsdlCache(str(tmpdir)), transport=DocdataMockTransport())
+    for cache_file in tmpdir.listdir('suds-docdata-*'):
+        cache_file.write_binary(b'corrupt')
+
+    # The WSDL is fetched again, and the entry is replaced.
+    open_spy = mocker.spy(DocdataMockTransport, 'open')
+    client = create_suds_client(url, wsdl_cache=WsdlCache(str(tmpdir)), transport=DocdataMockTransport())
+    assert client.factory.create('ns0:merchant') is not None
+    assert open_spy.call_count > 0
+    assert WsdlCache(str(tmpdir)).get_stamp(url) is not None
+
+
+@pytest.fixture()
+def wsdl_cache_dir(tmpdir, mocker):
+    mocker.patch('oscar_docdata.appsettings.DOCDATA_WSDL_CACHE_DIR', str(tmpdir))
+    mocker.patch('oscar_docdata.gateway.get_transport', side_effect=DocdataMockTransport)
+    return tmpdir
+
+
+def test_manage_docdata_wsdl_cache_not_configured():
+    with pytest.raises(CommandError):
+        call_command("docdata_wsdl_cache")
+
+
+def test_manage_docdata_wsdl_cache(wsdl_cache_dir, mocker):
+    url = get_wsdl_url(testing_mode=True)
+
+    output = StringIO()
+    call_command("docdata_wsdl_cache", "--testing", stdout=output)
+    assert output.getvalue().startswith("Cached {0}".format(url))
+    content_hash = WsdlCache(str(wsdl_cache_dir)).get_stamp(url)['content_hash']
+
+    output = StringIO()
+    call_command("docdata_wsdl_cache", "--testing", stdout=output)
+    assert output.getvalue().startswith("Refreshed {0}, contents unchanged".format(url))
+
+    # The remote WSDL changed
+    mocker.patch('tests.suds_transport.WSDL', WSDL.replace('</definitions>', '</definitions>\n'))
+    output = StringIO()
+    call_command("docdata_wsdl_cache", "--testing", stdout=output)
+    assert output.getvalue().startswith("Updated {0}, contents changed".format(url))
+    assert WsdlCache(str(wsdl_cache_dir)).get_stamp(url)['content_hash'] != content_hash
+
+    call_command("docdata_wsdl_cache", "--testing", "--clear", stdout=StringIO())
+    assert WsdlCache(str(wsdl_cache_dir)).get_stamp(url) is None